@@ -0,0 +1,145 @@
+"""Per-model circuit breaker with a health memory.
+
+A model that keeps failing (wrong id, no access, provider outage) would
+otherwise cost a failed round trip on every call of every run before
+:mod:`llm` falls back.  Each model id gets a breaker:
+
+* **closed** — calls go through; ``breaker_failures`` failures in a row open it;
+* **open** — calls skip straight to the fallback model until the cool-down
+  (``breaker_cooldown`` seconds, doubled after every failed probe, capped at
+  six hours) has passed;
+* **half-open** — one call is let through as a probe: success closes the
+  breaker, failure opens it again.
+
+Only failures that are the provider's count (:func:`is_provider_fault`): a 5xx,
+a connection error, a 429 that outlived the SDK's retries, or a 403/404 for the
+model.  A timeout, a bad request or an exception from our own code (a streaming
+callback) doesn't open or close the breaker, but it does end a run of failures:
+"in a row" means with nothing else in between.
+
+The state lives in ``model_health.json`` so a bad model stays skipped across
+runs, and :func:`status` feeds ``/api/readiness``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from . import config
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+MAX_COOLDOWN = 6 * 3600.0
+PROBE_TIMEOUT = 180.0   # a probe that never reported back frees the slot after this
+
+_lock = threading.Lock()
+_models: Optional[Dict[str, dict]] = None
+
+
+def _load() -> Dict[str, dict]:
+    global _models
+    if _models is None:
+        _models = {}
+        if os.path.exists(config.MODEL_HEALTH_FILE):
+            try:
+                with open(config.MODEL_HEALTH_FILE, "r", encoding="utf-8") as fh:
+                    _models = json.load(fh)
+            except Exception:
+                _models = {}
+    return _models
+
+
+def _save() -> None:
+    tmp = config.MODEL_HEALTH_FILE + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(_models, fh, indent=2)
+        os.replace(tmp, config.MODEL_HEALTH_FILE)
+    except Exception:
+        pass
+
+
+def _entry(model: str) -> dict:
+    return _load().setdefault(model, {"state": CLOSED, "failures": 0})
+
+
+def allow(model: str) -> bool:
+    """Whether a call to ``model`` should be attempted right now."""
+    now = time.time()
+    with _lock:
+        e = _entry(model)
+        if e["state"] == CLOSED:
+            return True
+        if e["state"] == OPEN:
+            if now - e.get("opened_at", 0) < e.get("cooldown", config.settings.breaker_cooldown):
+                return False
+            e["state"] = HALF_OPEN
+        elif now - e.get("probe_at", 0) < PROBE_TIMEOUT:
+            return False   # a probe is already in flight
+        e["probe_at"] = now
+        _save()
+        return True
+
+
+def success(model: str) -> None:
+    with _lock:
+        e = _entry(model)
+        changed = e["state"] != CLOSED or e["failures"]
+        e.update(state=CLOSED, failures=0, last_ok=time.time())
+        e.pop("probe_at", None)
+        if changed:
+            _save()
+
+
+def is_provider_fault(exc: BaseException) -> bool:
+    """Whether ``exc`` says the model/provider is unusable (duck-typed on the
+    OpenAI / Anthropic SDK errors, so neither has to be installed).  The SDK
+    clients retry 429s and 5xx themselves; one reaching us has run out of them."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in (403, 404, 429)
+    name = type(exc).__name__
+    if "Timeout" in name:
+        return False
+    return name == "APIConnectionError" or isinstance(exc, ConnectionError)
+
+
+def failure(model: str, exc: BaseException) -> None:
+    s = config.settings
+    now = time.time()
+    with _lock:
+        e = _entry(model)
+        if not is_provider_fault(exc):
+            # Not the provider's fault, so it breaks a run of failures like a
+            # success would; a probe's slot is freed for the next call.
+            changed = e.pop("probe_at", None) is not None or e.get("failures", 0)
+            e["failures"] = 0
+            if changed:
+                _save()
+            return
+        e["failures"] = e.get("failures", 0) + 1
+        e["last_error"] = str(exc)[:200]
+        if e["state"] == HALF_OPEN:
+            e.update(state=OPEN, opened_at=now,
+                     cooldown=min(MAX_COOLDOWN, e.get("cooldown", s.breaker_cooldown) * 2))
+        elif e["state"] == CLOSED and e["failures"] >= max(1, s.breaker_failures):
+            e.update(state=OPEN, opened_at=now, cooldown=s.breaker_cooldown)
+        e.pop("probe_at", None)
+        _save()
+
+
+def status() -> List[dict]:
+    """Every model we have a memory of, with seconds until the next probe."""
+    now = time.time()
+    with _lock:
+        out = []
+        for model, e in sorted(_load().items()):
+            retry = None
+            if e["state"] == OPEN:
+                retry = max(0, round(e.get("opened_at", 0) + e.get("cooldown", 0) - now))
+            out.append({"model": model, "state": e["state"], "failures": e.get("failures", 0),
+                        "last_error": e.get("last_error"), "retry_in": retry})
+        return out
@@ -0,0 +1,123 @@
+"""A small size-bounded on-disk cache.
+
+One file per entry under ``cache/<name>/``, named after a hash of the key.  A
+read touches the file, so its mtime doubles as the LRU clock; once the folder
+grows past its byte budget the least recently used entries are deleted.  Used
+for paid API responses that are safe to replay (see :mod:`llm`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, Optional
+
+from . import config
+
+
+def digest(*parts) -> str:
+    """A stable key for JSON-able parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """``get``/``put`` bytes or whole files by key; thread-safe within a process."""
+
+    def __init__(self, name: str, max_bytes: int, suffix: str = "") -> None:
+        self.folder = os.path.join(config.CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._sizes: Optional[Dict[str, int]] = None   # file → size, scanned once
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, key + self.suffix)
+
+    def _scan(self) -> Dict[str, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.folder):
+                for name in os.listdir(self.folder):
+                    if name.endswith(".tmp"):
+                        continue
+                    try:
+                        self._sizes[name] = os.path.getsize(os.path.join(self.folder, name))
+                    except OSError:
+                        pass
+        return self._sizes
+
+    # --- reading ------------------------------------------------------------ #
+    def get_path(self, key: str) -> Optional[str]:
+        """Path of the cached entry (marked as recently used), or None."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    # --- writing ------------------------------------------------------------ #
+    def put(self, key: str, data: bytes) -> None:
+        self._store(key, lambda tmp: _write(tmp, data))
+
+    def put_file(self, key: str, src: str) -> None:
+        self._store(key, lambda tmp: shutil.copyfile(src, tmp))
+
+    def _store(self, key: str, fill) -> None:
+        if self.max_bytes <= 0:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(key)
+        tmp = f"{path}.{uuid.uuid4().hex[:6]}.tmp"
+        try:
+            fill(tmp)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._scan()[os.path.basename(path)] = size
+            self._evict()
+
+    def _evict(self) -> None:
+        sizes = self._scan()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        def mtime(name: str) -> float:
+            try:
+                return os.path.getmtime(os.path.join(self.folder, name))
+            except OSError:
+                return 0.0
+        for name in sorted(sizes, key=mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+            total -= sizes.pop(name)
+
+
+def _write(path: str, data: bytes) -> None:
+    with open(path, "wb") as fh:
+        fh.write(data)
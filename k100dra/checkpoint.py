@@ -0,0 +1,190 @@
+"""Content-addressed stage checkpoints.
+
+Every project folder keeps a ``manifest.json`` with one entry per finished
+pipeline step:
+
+* ``key``    — a hash over the step's settings and the *digests* of the steps it
+  consumed, so re-running anything upstream invalidates everything after it;
+* ``files``  — the sha256 of each file the step wrote (``speech.mp3``,
+  ``base.mp4``, …);
+* ``values`` — the small JSON results later steps need (the post, the script,
+  word timings, …).
+
+A resumed run (``main.py --resume <project>`` or the studio's Resume button)
+skips every step whose entry still checks out, so reworking a failed render
+costs the render — not another Reddit search, script, voiceover and Whisper
+pass.  When a later step rewrites a file in place the earlier step's claim on
+it is handed over, and it stays valid for as long as the later step does.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from . import config
+
+MANIFEST = "manifest.json"
+
+_hash_cache: Dict[Tuple[str, int, int], str] = {}
+_hash_lock = threading.Lock()
+
+
+def file_hash(path: str) -> Optional[str]:
+    """sha256 of a file (None if missing). Memoised on size + mtime, since the
+    rendered videos are large and get checked more than once per run."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    memo = (path, st.st_size, st.st_mtime_ns)
+    with _hash_lock:
+        if memo in _hash_cache:
+            return _hash_cache[memo]
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+    with _hash_lock:
+        _hash_cache[memo] = value
+    return value
+
+
+def key(*parts) -> str:
+    """Stable hash over JSON-able parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+class Manifest:
+    """The checkpoint record of one project folder (thread-safe)."""
+
+    def __init__(self, project: str) -> None:
+        self.project = project
+        self.dir = config.project_dir(project)
+        self.path = os.path.join(self.dir, MANIFEST)
+        self._lock = threading.RLock()
+        self.data: dict = {"project": project, "steps": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as fh:
+                    self.data = json.load(fh)
+                self.data.setdefault("steps", {})
+            except Exception:
+                pass
+
+    @property
+    def steps(self) -> Dict[str, dict]:
+        return self.data["steps"]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # --- writing ----------------------------------------------------------- #
+    def record(self, step: str, step_key: str, files: Iterable[str] = (), **values) -> None:
+        """Store a finished step. ``files`` are names inside the project folder."""
+        files = list(files)
+        with self._lock:
+            for other, entry in self.steps.items():
+                for name in files:
+                    if other != step and name in entry.get("files", {}):
+                        entry.setdefault("handed_to", {})[name] = step
+            self.steps[step] = {
+                "key": step_key,
+                "files": {name: file_hash(os.path.join(self.dir, name)) for name in files},
+                "values": values,
+                "at": time.time(),
+            }
+            self._save()
+
+    def forget(self, step: str) -> None:
+        with self._lock:
+            if self.steps.pop(step, None) is not None:
+                self._save()
+
+    def _save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.data, fh, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # --- reading ----------------------------------------------------------- #
+    def values(self, step: str) -> dict:
+        return dict(self.steps.get(step, {}).get("values", {}))
+
+    def digest(self, step: str) -> Optional[str]:
+        """What downstream keys hash: this step's key, files and values."""
+        entry = self.steps.get(step)
+        if entry is None:
+            return None
+        return key(entry["key"], entry.get("files", {}), entry.get("values", {}))
+
+    def _files_ok(self, step: str, seen: Tuple[str, ...] = ()) -> bool:
+        entry = self.steps.get(step)
+        if entry is None or step in seen:
+            return False
+        handed = entry.get("handed_to", {})
+        for name, sha in entry.get("files", {}).items():
+            if name in handed:
+                continue
+            if sha is None or file_hash(os.path.join(self.dir, name)) != sha:
+                return False
+        # Files a later step rewrote are fine while that step's copy is intact.
+        return all(self._files_ok(later, seen + (step,)) for later in set(handed.values()))
+
+    def plan(self, graph: Mapping[str, Tuple[Sequence[str], object]]) -> List[str]:
+        """Steps that can be skipped. ``graph`` maps each checkpointed step to
+        ``(upstream steps, settings it depends on)`` in topological order."""
+        valid: List[str] = []
+        with self._lock:
+            for step, (upstream, params) in graph.items():
+                entry = self.steps.get(step)
+                if entry is None or any(u not in valid for u in upstream):
+                    continue
+                expected = key(step, params, [self.digest(u) for u in upstream])
+                if entry.get("key") == expected and self._files_ok(step):
+                    valid.append(step)
+            # A step whose file a later step rewrote can only be skipped along
+            # with that step — re-running the later one needs the original.
+            changed = True
+            while changed:
+                changed = False
+                for step in list(valid):
+                    handed = self.steps[step].get("handed_to", {}).values()
+                    upstream = graph[step][0]
+                    if any(h not in valid for h in handed) or any(u not in valid for u in upstream):
+                        valid.remove(step)
+                        changed = True
+        return valid
+
+    def expected_key(self, step: str, upstream: Sequence[str], params: object) -> str:
+        with self._lock:
+            return key(step, params, [self.digest(u) for u in upstream])
+
+
+def summary(project: str) -> dict:
+    """A small description of a project's checkpoints for the studio."""
+    m = Manifest(project)
+    post = m.values("story").get("post") or {}
+    return {
+        "project": project,
+        "title": post.get("title"),
+        "steps": list(m.steps),
+        "published": bool(m.values("publish").get("youtube_url")),
+        "rendered": "video" in m.steps,
+    }
+
+
+def resumable(limit: int = 20) -> List[dict]:
+    """Most recent projects that have a manifest, newest first."""
+    if not os.path.isdir(config.PROJECTS_DIR):
+        return []
+    names = sorted((n for n in os.listdir(config.PROJECTS_DIR)
+                    if os.path.exists(os.path.join(config.PROJECTS_DIR, n, MANIFEST))),
+                   reverse=True)
+    return [summary(n) for n in names[:limit]]
@@ -11,7 +11,7 @@ from __future__ import annotations
 import os
 import shutil
 from dataclasses import dataclass, field, asdict
-from typing import Optional
+from typing import Dict, Optional
 
 
 # --------------------------------------------------------------------------- #
@@ -28,11 +28,15 @@ IMGS_DIR = os.path.join(ROOT, "imgs")
 # Small JSON state files kept at the repo root.
 LINKS_FILE = os.path.join(ROOT, "links.txt")
 BAD_LINKS_FILE = os.path.join(ROOT, "bad_links.txt")
+SEEN_INDEX_FILE = os.path.join(ROOT, "seen_index.bin")   # compact index of the two above
 BACKGROUNDS_FILE = os.path.join(ROOT, "backgrounds.txt")   # YouTube background links
 MUSIC_LINKS_FILE = os.path.join(ROOT, "music.txt")         # YouTube music links
 VIDEO_USAGE_FILE = os.path.join(ROOT, "video_usage.json")
 UPLOAD_TIME_FILE = os.path.join(ROOT, "upload_time.json")
+MODEL_HEALTH_FILE = os.path.join(ROOT, "model_health.json")   # per-model circuit breakers
 LOG_DIR = os.path.join(ROOT, "logs")
+CACHE_DIR = os.path.join(ROOT, "cache")   # replayable API responses (see cache.py)
+REDDIT_CACHE_DIR = os.path.join(CACHE_DIR, "reddit")   # cached hot listings, a file each
 LATEST_LOG = os.path.join(LOG_DIR, "latest.log")   # reset every run
 
 
@@ -65,6 +69,19 @@ def _env_bool(name: str, default: bool) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "on", "y"}
 
 
+def _env_numbers(name: str) -> Dict[str, float]:
+    """``"a=1,b=2.5"`` → ``{"a": 1.0, "b": 2.5}`` (keys lower-cased; bad pairs skipped)."""
+    out: Dict[str, float] = {}
+    for pair in (os.getenv(name) or "").split(","):
+        key, sep, value = pair.partition("=")
+        try:
+            if sep and key.strip():
+                out[key.strip().lower()] = float(value)
+        except ValueError:
+            pass
+    return out
+
+
 # --------------------------------------------------------------------------- #
 # Settings
 # --------------------------------------------------------------------------- #
@@ -132,8 +149,32 @@ class Settings:
     model_meta: str = field(default_factory=lambda: _env("K100DRA_MODEL_META", default="gpt-5.5"))
     model_rate: str = field(default_factory=lambda: _env("K100DRA_MODEL_RATE", default="gpt-4o-mini"))
     model_srt: str = field(default_factory=lambda: _env("K100DRA_MODEL_SRT", default="gpt-4o"))
+    # Subtitles are aligned to the script locally; with this on, runs of words
+    # the alignment is unsure about are also sent to model_srt.
+    subtitle_llm: bool = field(default_factory=lambda: _env_bool("K100DRA_SUBTITLE_LLM", False))
     model_transcribe: str = field(default_factory=lambda: _env("K100DRA_MODEL_TRANSCRIBE", default="whisper-1"))
     fallback_text_model: str = field(default_factory=lambda: _env("K100DRA_FALLBACK_MODEL", default="gpt-4o"))
+    # Deterministic completions (temperature 0) are replayed from an on-disk
+    # cache; creative ones only when K100DRA_LLM_CACHE_CREATIVE is on.
+    llm_cache: bool = field(default_factory=lambda: _env_bool("K100DRA_LLM_CACHE", True))
+    llm_cache_mb: float = field(default_factory=lambda: float(_env("K100DRA_LLM_CACHE_MB", default="64")))
+    llm_cache_creative: bool = field(default_factory=lambda: _env_bool("K100DRA_LLM_CACHE_CREATIVE", False))
+    # A model failing this many calls in a row is skipped (straight to the
+    # fallback) for the cool-down, then probed again.
+    breaker_failures: int = field(default_factory=lambda: int(_env("K100DRA_BREAKER_FAILURES", default="2")))
+    breaker_cooldown: float = field(default_factory=lambda: float(_env("K100DRA_BREAKER_COOLDOWN", default="600")))
+    # Text requests in flight at once per provider (across every run); also the
+    # size of each provider's keep-alive connection pool.
+    openai_concurrency: int = field(default_factory=lambda: int(_env("K100DRA_OPENAI_CONCURRENCY", default="8")))
+    anthropic_concurrency: int = field(default_factory=lambda: int(_env("K100DRA_ANTHROPIC_CONCURRENCY", default="4")))
+
+    # --- Service endpoints --------------------------------------------------- #
+    # Empty = the real services. Point them at `python -m k100dra.standin` to run
+    # the real pipeline offline (main.py --standin does it in-process).
+    openai_base_url: Optional[str] = field(default_factory=lambda: _env("K100DRA_OPENAI_BASE_URL"))
+    elevenlabs_base_url: str = field(default_factory=lambda: _env("K100DRA_ELEVENLABS_BASE_URL", default="https://api.elevenlabs.io"))
+    reddit_base_url: Optional[str] = field(default_factory=lambda: _env("K100DRA_REDDIT_BASE_URL"))
+    youtube_base_url: Optional[str] = field(default_factory=lambda: _env("K100DRA_YOUTUBE_BASE_URL"))
 
     # --- ElevenLabs (voice) ------------------------------------------------- #
     elevenlabs_key: Optional[str] = field(default_factory=lambda: _env("ELEVENLABS_API_KEY", "KEY_ELEVENLABS"))
@@ -142,6 +183,17 @@ class Settings:
     # v3 understands inline performance tags ([excited], [whispers], ...).
     elevenlabs_model: str = field(default_factory=lambda: _env("ELEVENLABS_MODEL", default="eleven_v3"))
     voice_tags: bool = field(default_factory=lambda: _env_bool("K100DRA_VOICE_TAGS", True))
+    # Record each sentence as soon as the script writer finishes it (instead of
+    # after the whole script), with this many TTS requests in flight.
+    voice_stream: bool = field(default_factory=lambda: _env_bool("K100DRA_VOICE_STREAM", True))
+    tts_concurrency: int = field(default_factory=lambda: int(_env("K100DRA_TTS_CONCURRENCY", default="3")))
+    # Recorded clips are kept in cache/tts (LRU) and replayed for the same text,
+    # voice and settings — recurring interjections and retried runs are free.
+    # Ask the TTS engines for raw PCM and keep the narration as WAV through the
+    # fit and the mix, so it is encoded once (by the render) instead of four times.
+    audio_wav: bool = field(default_factory=lambda: _env_bool("K100DRA_AUDIO_WAV", False))
+    tts_cache: bool = field(default_factory=lambda: _env_bool("K100DRA_TTS_CACHE", True))
+    tts_cache_mb: float = field(default_factory=lambda: float(_env("K100DRA_TTS_CACHE_MB", default="256")))
     # Lower stability + higher style = more dynamic, emphatic, "streamer"
     # delivery (lots of intonation) instead of a flat narrator read.
     voice_stability: float = field(default_factory=lambda: float(_env("ELEVENLABS_STABILITY", default="0.32")))
@@ -163,17 +215,34 @@ class Settings:
     reddit_client_id: Optional[str] = field(default_factory=lambda: _env("REDDIT_CLIENT_ID"))
     reddit_client_secret: Optional[str] = field(default_factory=lambda: _env("REDDIT_CLIENT_SECRET"))
     reddit_user_agent: Optional[str] = field(default_factory=lambda: _env("REDDIT_USER_AGENT", default="K100DRA"))
+    # Hot listings are reused for this long (seconds): per subreddit from
+    # ``reddit_listing_ttls`` ("worldnews=300,AmItheAsshole=3600"), else the
+    # default.  Past ``refresh_ahead`` of it a background refresh starts while
+    # the cached copy keeps serving.
+    reddit_listing_ttl: float = field(default_factory=lambda: float(_env("K100DRA_LISTING_TTL", default="900")))
+    reddit_listing_ttls: Dict[str, float] = field(default_factory=lambda: _env_numbers("K100DRA_LISTING_TTLS"))
+    reddit_refresh_ahead: float = field(default_factory=lambda: float(_env("K100DRA_LISTING_REFRESH", default="0.75")))
 
     # --- Story / pipeline tuning ------------------------------------------- #
     target_duration: float = field(default_factory=lambda: float(_env("K100DRA_TARGET_DURATION", default="59")))
     max_script_chars: int = field(default_factory=lambda: int(_env("K100DRA_MAX_CHARS", default="1200")))
     min_story_rating: int = field(default_factory=lambda: int(_env("K100DRA_MIN_RATING", default="8")))
     max_story_attempts: int = field(default_factory=lambda: int(_env("K100DRA_MAX_ATTEMPTS", default="30")))
+    # Candidates per round: fetched side by side (each from its own random
+    # subreddit) and scored together in one rating request.
+    story_batch: int = field(default_factory=lambda: int(_env("K100DRA_STORY_BATCH", default="5")))
     # Content mode: "auto" mixes drama + news; "drama" = personal stories;
     # "news" = current events / actuality she reacts to.
     content_mode: str = field(default_factory=lambda: _env("K100DRA_CONTENT_MODE", default="auto"))
     news_ratio: float = field(default_factory=lambda: float(_env("K100DRA_NEWS_RATIO", default="0.4")))
     music_volume_db: float = field(default_factory=lambda: float(_env("K100DRA_MUSIC_DB", default="-15")))
+    # The music dips under her voice (sidechain compression), and the final
+    # mix is normalized to this integrated loudness (LUFS; 0 = leave as is).
+    music_duck: bool = field(default_factory=lambda: _env_bool("K100DRA_MUSIC_DUCK", True))
+    loudness_lufs: float = field(default_factory=lambda: float(_env("K100DRA_LOUDNESS_LUFS", default="-14")))
+    # Independent pipeline steps (music/background fetching, transcription, …)
+    # run side by side on a pool this big.
+    pipeline_workers: int = field(default_factory=lambda: int(_env("K100DRA_PIPELINE_WORKERS", default="4")))
 
     # --- Publishing --------------------------------------------------------- #
     auto_upload: bool = field(default_factory=lambda: _env_bool("K100DRA_AUTO_UPLOAD", True))
@@ -186,6 +255,13 @@ class Settings:
     music_source: str = field(default_factory=lambda: _env("K100DRA_MUSIC_SOURCE", default="auto"))
     keep_bg_segments: bool = field(default_factory=lambda: _env_bool("K100DRA_KEEP_BG", False))
 
+    # --- Concurrency (studio) ---------------------------------------------- #
+    # How many pipelines the studio runs at once, and how many of their steps
+    # may render with ffmpeg / wait on an API at the same time across all runs.
+    max_parallel_runs: int = field(default_factory=lambda: int(_env("K100DRA_MAX_RUNS", default="3")))
+    max_renders: int = field(default_factory=lambda: int(_env("K100DRA_MAX_RENDERS", default="2")))
+    max_api_steps: int = field(default_factory=lambda: int(_env("K100DRA_MAX_API_STEPS", default="6")))
+
     # --- Encoding ----------------------------------------------------------- #
     use_gpu: bool = field(default_factory=lambda: _env_bool("K100DRA_USE_GPU", True))
 
@@ -303,15 +379,27 @@ def readiness(s: Optional[Settings] = None) -> dict:
             "hint": "Add YouTube links to backgrounds.txt, or clips to videos/",
         },
         "youtube": {
-            "ok": os.path.exists(os.path.join(ROOT, "youtube.json")),
+            "ok": os.path.exists(os.path.join(ROOT, "youtube.json")) or bool(s.youtube_base_url),
             "label": "YouTube upload",
             "hint": "Place youtube.json (OAuth client) at the repo root",
             "optional": True,
         },
     }
+    # Models whose circuit breaker is open are skipped for the fallback.
+    from . import breaker
+    models = breaker.status()
+    for m in models:
+        if m["state"] != "closed":
+            checks[f"model:{m['model']}"] = {
+                "ok": False,
+                "label": f"Model {m['model']}",
+                "hint": (f"failing ({m['last_error'] or 'error'}), using {s.fallback_text_model}"
+                         + (f"; retry in {m['retry_in']}s" if m["retry_in"] else "; probing")),
+                "optional": True,
+            }
     # Real (non-demo) runs require the non-optional pieces.
     can_run = all(c["ok"] for c in checks.values() if not c.get("optional"))
-    return {"checks": checks, "can_run_real": can_run}
+    return {"checks": checks, "can_run_real": can_run, "models": models}
 
 
 def _has_local_videos() -> bool:
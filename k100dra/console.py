@@ -10,21 +10,31 @@ import sys
 
 
 class ConsoleReporter:
-    """Pass ``ConsoleReporter().sink`` as the ProgressReporter sink."""
+    """Pass ``ConsoleReporter().sink`` as the ProgressReporter sink.
 
-    def __init__(self) -> None:
+    With several runs printing at once (``main.py --pipeline``) give each a
+    ``label`` and turn the live ``bar`` off, so their lines stay readable.
+    """
+
+    def __init__(self, label: str = "", bar: bool = True) -> None:
         self._last_line = ""
         self._seen_logs = 0
+        self._label = f"{label} " if label else ""
+        self._bar = bar
 
     def sink(self, event_type: str, state: dict) -> None:
+        if event_type == "delta":   # streamed script text: not shown here
+            return
         # Print any new log lines.
         logs = state.get("logs", [])
         for entry in logs[self._seen_logs:]:
             prefix = "  ✖" if entry.get("level") == "error" else "  ·"
             sys.stdout.write(f"\r{' ' * len(self._last_line)}\r")
-            print(f"{prefix} {entry['msg']}")
+            print(f"{prefix} {self._label}{entry['msg']}")
             self._last_line = ""
         self._seen_logs = len(logs)
+        if not self._bar:
+            return
 
         # Live overall bar.
         overall = state.get("overall", 0) or 0
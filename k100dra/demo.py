@@ -48,15 +48,13 @@ def run(reporter: ProgressReporter) -> dict:
         reporter.artifact("story", "subreddit", "TrueOffMyChest")
         reporter.artifact("story", "rating", 9)
         reporter.progress("story", 0.45, "K100DRA is writing the script…")
-        text = ""
         words = SAMPLE_SCRIPT.split(" ")
         for i, w in enumerate(words):
             reporter.check_stop()
-            text += w + " "
-            reporter.state.stages["story"].artifacts["text"] = text
+            reporter.stream("story", "text", w + " ")
             reporter.progress("story", 0.45 + 0.5 * (i + 1) / len(words))
             time.sleep(0.045)
-        reporter.done("story", f"{len(text)} characters")
+        reporter.done("story", f"{len(SAMPLE_SCRIPT)} characters")
 
         # VOICE
         reporter.start("voice", "Recording the voiceover (ElevenLabs)…")
@@ -118,3 +116,5 @@ def run(reporter: ProgressReporter) -> dict:
         reporter.log("Demo cancelled.", level="error")
         reporter.finish({"cancelled": True}, ok=False)
         return {"cancelled": True}
+    finally:
+        logs.close_run_log()
@@ -5,6 +5,11 @@ The pipeline never talks to the web layer directly.  It calls a
 pushes plain-dict events to a sink callback.  The web server turns those into
 WebSocket frames; the headless runner prints them.  This keeps the pipeline
 totally UI-agnostic and easy to test.
+
+Snapshots are coalesced in the reporter: a change that lands within
+:data:`EMIT_INTERVALS` of the last event of its kind only schedules a flush of
+that kind, and one snapshot carries everything when the interval is up.  Status changes
+(a stage starting, finishing, failing; the run ending) go out at once.
 """
 
 from __future__ import annotations
@@ -50,6 +55,7 @@ class Stage:
     started_at: Optional[float] = None
     ended_at: Optional[float] = None
     artifacts: Dict[str, Any] = field(default_factory=dict)
+    streams: Dict[str, List[str]] = field(default_factory=dict)   # text artifacts arriving in pieces
     error: Optional[str] = None
 
     def to_dict(self) -> dict:
@@ -63,7 +69,7 @@ class Stage:
             "progress": round(self.progress, 4),
             "message": self.message,
             "elapsed": round(elapsed, 1) if elapsed is not None else None,
-            "artifacts": self.artifacts,
+            "artifacts": {**self.artifacts, **{k: "".join(v) for k, v in self.streams.items()}},
             "error": self.error,
         }
 
@@ -84,6 +90,7 @@ class RunState:
         }
         self.logs: List[Dict[str, Any]] = []
         self.summary: Dict[str, Any] = {}
+        self.metrics: Dict[str, Any] = {}   # run-wide counters (see metrics.py)
         self._total_weight = sum(s.weight for s in self.stages.values())
 
     # --- derived values ---------------------------------------------------- #
@@ -112,21 +119,33 @@ class RunState:
             "stages": [self.stages[d["id"]].to_dict() for d in STAGE_DEFS],
             "logs": self.logs[-200:],
             "summary": self.summary,
+            "metrics": self.metrics,
         }
 
 
-# Sink receives (event_type, payload) for every change.
+# Minimum seconds between two snapshots of each event type ("state" covers
+# progress, artifacts and metrics).  Status changes bypass this.
+EMIT_INTERVALS: Dict[str, float] = {"state": 0.1, "log": 0.25}
+
+# Sink receives (event_type, payload) for every change: the whole RunState as a
+# dict, except for "delta" events — {"stage", "key", "text"} to append to a
+# streamed text artifact (see ProgressReporter.stream).
 Sink = Callable[[str, Dict[str, Any]], None]
 
 
 class ProgressReporter:
     """Thread-safe handle the pipeline uses to report progress."""
 
-    def __init__(self, state: RunState, sink: Optional[Sink] = None):
+    def __init__(self, state: RunState, sink: Optional[Sink] = None,
+                 intervals: Optional[Dict[str, float]] = None):
         self.state = state
         self._sink = sink
         self._lock = threading.RLock()
         self._stop = threading.Event()
+        self._intervals = EMIT_INTERVALS if intervals is None else intervals
+        self._last_emit: Dict[str, float] = {}
+        # Each event type is held back and flushed on its own clock.
+        self._timers: Dict[str, threading.Timer] = {}   # type → pending flush
 
     # cooperative cancellation -------------------------------------------- #
     def request_stop(self) -> None:
@@ -141,14 +160,45 @@ class ProgressReporter:
             raise RunCancelled()
 
     # internal emit -------------------------------------------------------- #
-    def _emit(self, event_type: str = "state") -> None:
+    def _emit(self, event_type: str = "state", now: bool = False) -> None:
+        """Send a snapshot, or hold it back if one of this type just went out
+        (``now`` for status changes, which always go straight through).  Once
+        the run has finished, "done" was the last word: nothing else goes out."""
         if self._sink is None:
             return
+        # Under the lock, so a snapshot and the deltas reach the sink in order.
+        with self._lock:
+            if event_type != "done" and self.state.status != Status.RUNNING:
+                return
+            wait = self._intervals.get(event_type, 0.0) - (
+                time.monotonic() - self._last_emit.get(event_type, float("-inf")))
+            if now or wait <= 0:
+                self._send(event_type)
+                return
+            if event_type not in self._timers:
+                timer = self._timers[event_type] = threading.Timer(wait, self._flush, (event_type,))
+                timer.daemon = True
+                timer.start()
+
+    def _send(self, event_type: str) -> None:
+        timer = self._timers.pop(event_type, None)
+        if timer is not None:
+            timer.cancel()   # this snapshot is the one it was holding back
+        self._last_emit[event_type] = time.monotonic()
         try:
             self._sink(event_type, self.state.to_dict())
         except Exception:
             pass
 
+    def _flush(self, event_type: str) -> None:
+        with self._lock:
+            if event_type not in self._timers or self.state.status != Status.RUNNING:
+                return
+            wait = self._intervals.get(event_type, 0.0) - (
+                time.monotonic() - self._last_emit.get(event_type, float("-inf")))
+            if wait <= 0:   # else a snapshot went out meanwhile and a newer timer is due
+                self._send(event_type)
+
     # logging -------------------------------------------------------------- #
     def log(self, message: str, level: str = "info") -> None:
         with self._lock:
@@ -167,7 +217,7 @@ class ProgressReporter:
             st.progress = 0.0
             st.message = message
         self.log(f"▶ {self.state.stages[stage_id].label}: {message}".rstrip(": "))
-        self._emit()
+        self._emit(now=True)
 
     def progress(self, stage_id: str, fraction: float, message: Optional[str] = None) -> None:
         with self._lock:
@@ -179,9 +229,34 @@ class ProgressReporter:
 
     def artifact(self, stage_id: str, key: str, value: Any) -> None:
         with self._lock:
-            self.state.stages[stage_id].artifacts[key] = value
+            st = self.state.stages[stage_id]
+            st.streams.pop(key, None)
+            st.artifacts[key] = value
         self._emit()
 
+    def stream(self, stage_id: str, key: str, text: str, replace: bool = False) -> None:
+        """Append ``text`` to a text artifact that is still being written (the
+        script).  Only the piece goes to the sink, not a whole snapshot; a
+        later :meth:`artifact` for the same key replaces the streamed text.
+        ``replace`` throws away what was streamed so far (the text starts over)."""
+        if not text and not replace:
+            return
+        with self._lock:
+            st = self.state.stages[stage_id]
+            if replace:
+                st.artifacts.pop(key, None)
+                st.streams[key] = []
+            st.streams.setdefault(key, []).append(text)
+            if self._sink is None:
+                return
+            delta = {"stage": stage_id, "key": key, "text": text}
+            if replace:
+                delta["replace"] = True
+            try:
+                self._sink("delta", delta)
+            except Exception:
+                pass
+
     def done(self, stage_id: str, message: str = "") -> None:
         with self._lock:
             st = self.state.stages[stage_id]
@@ -190,7 +265,7 @@ class ProgressReporter:
             st.ended_at = time.time()
             if message:
                 st.message = message
-        self._emit()
+        self._emit(now=True)
 
     def skip(self, stage_id: str, message: str = "skipped") -> None:
         with self._lock:
@@ -199,7 +274,7 @@ class ProgressReporter:
             st.progress = 1.0
             st.ended_at = time.time()
             st.message = message
-        self._emit()
+        self._emit(now=True)
 
     def error(self, stage_id: str, message: str) -> None:
         with self._lock:
@@ -208,6 +283,14 @@ class ProgressReporter:
             st.ended_at = time.time()
             st.error = message
         self.log(f"✖ {self.state.stages[stage_id].label}: {message}", level="error")
+        self._emit(now=True)
+
+    def metrics(self, values: Dict[str, Any]) -> None:
+        """Publish the run-wide counters (cache hits, …)."""
+        with self._lock:
+            if values == self.state.metrics:
+                return
+            self.state.metrics = dict(values)
         self._emit()
 
     # run lifecycle -------------------------------------------------------- #
@@ -217,7 +300,10 @@ class ProgressReporter:
             self.state.ended_at = time.time()
             if summary:
                 self.state.summary.update(summary)
-        self._emit("done")
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+        self._emit("done", now=True)
 
 
 class RunCancelled(Exception):
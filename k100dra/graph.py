@@ -0,0 +1,124 @@
+"""A tiny dependency-graph executor for pipeline steps.
+
+Each :class:`Step` declares the context keys it ``needs`` and the keys it
+``provides``.  :func:`run_steps` starts every step whose inputs are ready on a
+bounded thread pool, so independent work (fetching music while the voice is
+recorded, transcribing while the music is mixed, …) overlaps instead of queueing
+behind the slowest network call.  The executor knows nothing about stages or the
+UI — steps report progress themselves through the reporter they close over.
+"""
+
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+StepFn = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+@dataclass
+class Step:
+    """One unit of work in the graph.
+
+    ``fn`` receives the shared context and returns a dict with (at least) every
+    key in ``provides``.  ``when`` lets a step opt out at run time; a skipped
+    step still "provides" its keys as ``None`` so dependants can run.
+    """
+
+    name: str
+    fn: StepFn
+    needs: Tuple[str, ...] = ()
+    provides: Tuple[str, ...] = ()
+    when: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+def _check(steps: List[Step], ctx: Dict[str, Any]) -> None:
+    """Reject graphs with unknown inputs, duplicate outputs or cycles."""
+    producers: Dict[str, str] = {}
+    for step in steps:
+        for key in step.provides:
+            if key in producers:
+                raise ValueError(f"{key!r} is provided by both {producers[key]!r} and {step.name!r}")
+            producers[key] = step.name
+    for step in steps:
+        for key in step.needs:
+            if key not in producers and key not in ctx:
+                raise ValueError(f"step {step.name!r} needs {key!r}, which nothing provides")
+
+    # Kahn's algorithm — if anything is left over, the graph has a cycle.
+    available = set(ctx)
+    remaining = list(steps)
+    while remaining:
+        ready = [s for s in remaining if all(k in available for k in s.needs)]
+        if not ready:
+            raise ValueError("step graph has a cycle: " + ", ".join(s.name for s in remaining))
+        for s in ready:
+            available.update(s.provides)
+            remaining.remove(s)
+
+
+def run_steps(steps: Iterable[Step], ctx: Dict[str, Any], max_workers: int = 4,
+              check_stop: Optional[Callable[[], None]] = None,
+              on_error: Optional[Callable[[Step, BaseException], None]] = None) -> Dict[str, Any]:
+    """Run ``steps`` as soon as their inputs exist; returns the filled context.
+
+    The first exception raised by a step (or by ``check_stop``) stops new steps
+    from being scheduled; steps already running are allowed to finish and the
+    exception is re-raised (``on_error`` is told which step failed).  Steps run
+    with a copy of the caller's ``contextvars`` context so per-run logging and
+    metrics follow them into the pool.
+    """
+    steps = list(steps)
+    _check(steps, ctx)
+    pending = list(steps)
+    running: Dict[Future, Step] = {}
+    failure: Optional[BaseException] = None
+
+    def launch(pool: ThreadPoolExecutor) -> None:
+        progressed = True
+        while progressed:
+            progressed = False
+            for step in [s for s in pending if all(k in ctx for k in s.needs)]:
+                pending.remove(step)
+                if step.when is not None and not step.when(ctx):
+                    ctx.update({k: None for k in step.provides})
+                    progressed = True   # its (empty) outputs may unblock others
+                    continue
+                running[pool.submit(contextvars.copy_context().run, step.fn, ctx)] = step
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers),
+                            thread_name_prefix="k100dra-step") as pool:
+        try:
+            if check_stop:
+                check_stop()
+            launch(pool)
+        except BaseException as exc:
+            failure = exc
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                step = running.pop(fut)
+                try:
+                    out = fut.result() or {}
+                    missing = [k for k in step.provides if k not in out]
+                    if missing:
+                        raise RuntimeError(f"step {step.name!r} did not provide {missing}")
+                    ctx.update(out)
+                except BaseException as exc:
+                    if on_error:
+                        on_error(step, exc)
+                    failure = failure or exc
+            if failure is None:
+                try:
+                    if check_stop:
+                        check_stop()
+                    launch(pool)
+                except BaseException as exc:
+                    failure = exc
+    if failure is not None:
+        raise failure
+    if pending:
+        raise RuntimeError("steps never became ready: " + ", ".join(s.name for s in pending))
+    return ctx
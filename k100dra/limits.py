@@ -0,0 +1,58 @@
+"""Process-wide admission control.
+
+When the studio runs several pipelines at once they share one machine and one
+set of API quotas.  Steps ask for a named slot before doing their heavy part:
+
+* ``render`` — an ffmpeg render (``max_renders``, CPU/GPU bound)
+* ``api``    — a step waiting on OpenAI / ElevenLabs / Reddit / YouTube
+  (``max_api_steps``)
+
+Waiting is cooperative: the caller's ``check_stop`` is polled so a cancelled
+run never hangs in the queue.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from . import config
+
+_lock = threading.Lock()
+_sems: Dict[str, Tuple[int, threading.BoundedSemaphore]] = {}
+
+
+def capacity(name: str) -> int:
+    s = config.settings
+    value = {"render": s.max_renders, "api": s.max_api_steps}.get(name, 0)
+    return max(1, int(value or 1))
+
+
+def _semaphore(name: str) -> threading.BoundedSemaphore:
+    size = capacity(name)
+    with _lock:
+        current = _sems.get(name)
+        # A changed setting takes effect for new acquirers; holders of the old
+        # semaphore release into it, which is harmless.
+        if current is None or current[0] != size:
+            current = (size, threading.BoundedSemaphore(size))
+            _sems[name] = current
+        return current[1]
+
+
+@contextmanager
+def slot(name: str, check_stop: Optional[Callable[[], None]] = None,
+         on_wait: Optional[Callable[[str], None]] = None) -> Iterator[None]:
+    """Hold one ``name`` slot for the duration of the ``with`` block."""
+    sem = _semaphore(name)
+    if not sem.acquire(blocking=False):
+        if on_wait:
+            on_wait(f"Waiting for a free {name} slot ({capacity(name)} in use)…")
+        while not sem.acquire(timeout=0.25):
+            if check_stop:
+                check_stop()
+    try:
+        yield
+    finally:
+        sem.release()
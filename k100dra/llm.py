@@ -3,21 +3,24 @@
 Provider-agnostic: a model id starting with ``claude`` routes to Anthropic,
 anything else to OpenAI. If a configured model fails (wrong id / no access) the
 call transparently falls back to ``fallback_text_model`` so a run never dies on
-a model name. Prompts all come from the :mod:`persona`. SDKs are imported lazily.
+a model name. Prompts all come from the :mod:`persona`.
+
+Requests run on the async provider layer (:mod:`providers`: pooled
+``AsyncOpenAI``/``AsyncAnthropic`` clients, per-provider concurrency caps); the
+task functions below are sync wrappers over it, with ``a``-prefixed coroutine
+versions where callers fan out.
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
 import re
-from typing import Callable, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from . import config, logs
+from . import breaker, cache, config, logs, metrics, providers
 from .persona import persona
 
-_openai_client = None
-_anthropic_client = None
-
 _TAG_RE = re.compile(r"\[[^\]]*\]")
 _DASH_RE = re.compile(r"\s*[—–]\s*")
 _SP_HYPHEN_RE = re.compile(r"\s+-\s+")
@@ -59,6 +62,85 @@ def display_script(text: str) -> str:
     return re.sub(r"\n{3,}", "\n\n", text).strip()
 
 
+class DisplayStream:
+    """:func:`display_script`, one streamed delta at a time.
+
+    Each :meth:`feed` looks only at the new text and returns what to append to
+    the display, so showing a script while it streams costs O(tokens) instead of
+    a rescan of the whole buffer per token.  The result matches
+    :func:`display_script`, which still gives the final text.
+    """
+
+    _MARKER = "{chat:"
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over, for a script that is being written again."""
+        self._tag = False       # inside [a performance tag]
+        self._chat = False      # inside {chat: ...}
+        self._brace = ""        # a "{" that may be opening a marker
+        self._space = ""        # whitespace held until the next visible char
+        self._fresh = True      # nothing visible yet (in the text, or in a marker)
+        self._newlines = 0      # newlines at the end of what was emitted
+
+    def feed(self, delta: str) -> str:
+        out: List[str] = []
+        for ch in delta:
+            self._char(ch, out)
+        return "".join(out)
+
+    def _char(self, ch: str, out: List[str]) -> None:
+        if self._brace:
+            self._brace += ch
+            if not self._MARKER.startswith(self._brace.lower()):
+                pending, self._brace = self._brace, ""
+                self._visible("{", out)
+                for c in pending[1:]:
+                    self._char(c, out)
+            elif len(self._brace) == len(self._MARKER):
+                self._brace, self._chat = "", True
+                self._flush_space(out)
+                self._emit("\n💬 ", out)
+                self._fresh = True
+        elif self._tag:
+            self._tag = ch != "]"
+        elif ch == "[":
+            self._tag = True
+        elif ch == "{" and not self._chat:
+            self._brace = ch
+        elif ch == "}" and self._chat:
+            self._chat, self._space, self._fresh = False, "", False
+            self._emit("\n", out)
+        elif ch.isspace():
+            if not self._fresh:
+                self._space += ch
+        else:
+            self._visible(ch, out)
+
+    def _visible(self, ch: str, out: List[str]) -> None:
+        self._flush_space(out)
+        self._fresh = False
+        self._emit(ch, out)
+
+    def _flush_space(self, out: List[str]) -> None:
+        # strip_tags folds any run of 2+ whitespace characters into one space.
+        if self._space:
+            self._emit(" " if len(self._space) > 1 else self._space, out)
+            self._space = ""
+
+    def _emit(self, text: str, out: List[str]) -> None:
+        for c in text:
+            if c == "\n":
+                if self._newlines >= 2:
+                    continue
+                self._newlines += 1
+            else:
+                self._newlines = 0
+            out.append(c)
+
+
 def voice_segments(text: str):
     """Split a script into (speaker, text) segments: 'k' = K100DRA, 'chat' = a
     chat member's voiced interjection."""
@@ -77,91 +159,260 @@ def voice_segments(text: str):
     return segments or [("k", text.strip())]
 
 
+# A sentence ends at . ! ? (optionally closed by a quote / bracket) + a space;
+# an ellipsis is a pause, not an end — and so is the period of "Mr." or "J.".
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])(?<!\.\.)\s+|(?<=[.!?][\"'”’)\]])(?<!\.\.[\"'”’)\]])\s+")
+_ABBREV_RE = re.compile(r"(?:^|[\s(\"'“‘])(?:[A-Z]|Mr|Mrs|Ms|Mx|Dr|Prof|Sr|Jr|St|Mt|Lt|Sgt|Capt|Gen|Col|vs|approx)\.$")
+
+
+def _sentence_ends(text: str, pos: int = 0, endpos: Optional[int] = None) -> Iterator[int]:
+    """Where the sentences of ``text[pos:endpos]`` end (after the space).
+
+    >>> [text[:i] for text in ["Mr. Smith met J. Doe. Then he left."] for i in _sentence_ends(text)]
+    ['Mr. Smith met J. Doe. ']
+    """
+    for m in _SENTENCE_END_RE.finditer(text, pos, len(text) if endpos is None else endpos):
+        if not _ABBREV_RE.search(text, max(0, m.start() - 10), m.start()):
+            yield m.end()
+
+
+def split_sentences(text: str) -> List[str]:
+    """``text`` cut at its sentence ends (see :func:`_sentence_ends`)."""
+    out, last = [], 0
+    for end in _sentence_ends(text):
+        out.append(text[last:end])
+        last = end
+    out.append(text[last:])
+    return [s.strip() for s in out if s.strip()]
+
+
+def speech_units(text: str, chat_voice: bool = True) -> List[Tuple[str, str]]:
+    """:func:`voice_segments` with her narration further cut into sentences —
+    the pieces sent to TTS while the script is still streaming.  Without
+    ``chat_voice`` the interjections are read by her, inline."""
+    segments = voice_segments(text) if chat_voice else [("k", flatten_markers(text).strip())]
+    units = []
+    for speaker, seg in segments:
+        if speaker == "chat":
+            units.append((speaker, seg))
+        else:
+            units.extend(("k", s) for s in split_sentences(seg))
+    return units
+
+
+def complete_prefix(raw: str, start: int = 0) -> int:
+    """Length of the part of a partially streamed script whose speech units are
+    final: up to the last sentence end or closed ``{chat: ...}`` that is not
+    inside a marker still being written.  ``start`` is a cut found earlier, so
+    only the text after it is looked at."""
+    open_at = raw.rfind("{", start)
+    limit = open_at if open_at > raw.rfind("}", start) else len(raw)
+    cut = start
+    for m in _CHAT_RE.finditer(raw, start, limit):
+        cut = m.end()
+    for end in _sentence_ends(raw, cut, limit):
+        cut = end
+    return cut
+
+
+class PrefixStream:
+    """:func:`complete_prefix`, one streamed delta at a time.
+
+    Remembers the last cut and whether a ``{chat: ...}`` is still open, so a
+    delta with no braces in it is only searched (with a few characters before
+    it) for a sentence end — streaming a script stays O(tokens).
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.text = ""
+        self.cut = 0
+        self._open = False   # a "{" after the cut that has no "}" yet
+
+    def feed(self, delta: str) -> int:
+        """Add ``delta``; returns the new :attr:`cut`."""
+        seen = len(self.text)
+        self.text += delta
+        if "{" in delta or "}" in delta:
+            self.cut = complete_prefix(self.text, self.cut)
+            self._open = self.text.rfind("{", self.cut) > self.text.rfind("}", self.cut)
+        elif not self._open:
+            # An end can start a little before the delta ("Mr." + " Smith").
+            for end in _sentence_ends(self.text, max(self.cut, seen - 3)):
+                self.cut = end
+        return self.cut
+
+
 # --------------------------------------------------------------------------- #
-# Provider clients
+# Providers (async — see :mod:`providers`)
 # --------------------------------------------------------------------------- #
-def _get_openai():
-    global _openai_client
-    if _openai_client is None:
-        import openai  # lazy
-        if not config.settings.openai_key:
-            raise RuntimeError("KEY_OPENAI is not set — cannot reach OpenAI.")
-        _openai_client = openai.OpenAI(api_key=config.settings.openai_key)
-    return _openai_client
+def _provider(model: str) -> str:
+    return "anthropic" if model.lower().startswith("claude") else "openai"
 
 
-def _get_anthropic():
-    global _anthropic_client
-    if _anthropic_client is None:
-        import anthropic  # lazy
-        if not config.settings.anthropic_key:
-            raise RuntimeError("ANTHROPIC_API_KEY is not set — cannot reach Anthropic.")
-        _anthropic_client = anthropic.Anthropic(api_key=config.settings.anthropic_key)
-    return _anthropic_client
+async def _aroute(model: str, system: str, user: str, temperature: float,
+                  max_tokens: int, on_token: Optional[Callable[[str], None]]) -> str:
+    provider = _provider(model)
+    async with providers.semaphore(provider):
+        # Timed from the moment the request is sent (the semaphore wait is ours).
+        with metrics.call("llm", provider, model) as call:
+            if provider == "anthropic":
+                return await _anthropic_complete(model, system, user, temperature, max_tokens,
+                                                 on_token, call)
+            return await _openai_complete(model, system, user, temperature, max_tokens,
+                                          on_token, call)
 
 
-def _route(model: str, system: str, user: str, temperature: float,
-           max_tokens: int, on_token: Optional[Callable[[str], None]]) -> str:
-    if model.lower().startswith("claude"):
-        return _anthropic_complete(model, system, user, temperature, max_tokens, on_token)
-    return _openai_complete(model, system, user, temperature, max_tokens, on_token)
+# --------------------------------------------------------------------------- #
+# Response cache
+# --------------------------------------------------------------------------- #
+_response_cache: Optional[cache.DiskCache] = None
+
+
+def _get_cache() -> cache.DiskCache:
+    global _response_cache
+    budget = int(config.settings.llm_cache_mb * 1024 * 1024)
+    if _response_cache is None or _response_cache.max_bytes != budget:
+        _response_cache = cache.DiskCache("llm", budget, suffix=".txt")
+    return _response_cache
+
+
+async def _cached_route(model: str, system: str, user: str, temperature: float, max_tokens: int,
+                        on_token: Optional[Callable[[str], None]], use_cache: bool) -> str:
+    """:func:`_aroute` behind the response cache. A hit is replayed through
+    ``on_token`` in one piece so streaming callers still see the text.  The
+    cache's file reads and writes (and evictions) run on a worker thread, not
+    on the provider loop every other request shares."""
+    if not use_cache:
+        return await _aroute(model, system, user, temperature, max_tokens, on_token)
+    key = cache.digest(_provider(model), model, system, user, temperature, max_tokens)
+    store = _get_cache()
+    hit = await asyncio.to_thread(store.get, key)
+    if hit is not None:
+        metrics.count("llm_cache_hits")
+        text = hit.decode("utf-8")
+        if on_token is not None and text:
+            on_token(text)
+        return text
+    metrics.count("llm_cache_misses")
+    text = await _aroute(model, system, user, temperature, max_tokens, on_token)
+    if text:
+        await asyncio.to_thread(store.put, key, text.encode("utf-8"))
+    return text
 
 
-def _complete(model: str, system: str, user: str, temperature: float = 0.7,
-              max_tokens: int = 1024, on_token: Optional[Callable[[str], None]] = None) -> str:
-    """Run a chat completion, falling back to a known-good model on failure."""
+async def _acomplete(model: str, system: str, user: str, temperature: float = 0.7,
+                     max_tokens: int = 1024, on_token: Optional[Callable[[str], None]] = None,
+                     cache_creative: Optional[bool] = None,
+                     on_restart: Optional[Callable[[], None]] = None) -> str:
+    """Run a chat completion, falling back to a known-good model on failure —
+    or right away while the model's circuit breaker (:mod:`breaker`) is open.
+
+    Deterministic calls (``temperature == 0``) go through the on-disk response
+    cache; ``cache_creative`` (default: the ``llm_cache_creative`` setting) lets
+    sampled ones use it too.  A failed attempt may already have streamed part of
+    its text to ``on_token``; ``on_restart`` is called before the fallback starts
+    over, so the caller can drop it.
+    """
+    s = config.settings
+    creative = s.llm_cache_creative if cache_creative is None else cache_creative
+    use_cache = s.llm_cache and (temperature <= 0 or creative)
+    fb = s.fallback_text_model
+
+    async def attempt(name: str) -> str:
+        try:
+            text = await _cached_route(name, system, user, temperature, max_tokens, on_token, use_cache)
+        except Exception as exc:
+            breaker.failure(name, exc)
+            raise
+        breaker.success(name)
+        return text
+
+    if model == fb:
+        return await attempt(model)
+    if not breaker.allow(model):   # known bad: don't pay for another failed round trip
+        logs.get("llm").info("model %r is cooling down; using %s", model, fb)
+        return await attempt(fb)
     try:
-        return _route(model, system, user, temperature, max_tokens, on_token)
+        return await attempt(model)
     except Exception as exc:
-        fb = config.settings.fallback_text_model
-        if model != fb:
-            logs.get("llm").warning("model %r failed (%s); falling back to %s",
-                                    model, str(exc)[:160], fb)
-            return _route(fb, system, user, temperature, max_tokens, on_token)
-        raise
+        logs.get("llm").warning("model %r failed (%s); falling back to %s",
+                                model, str(exc)[:160], fb)
+        if on_restart is not None:
+            on_restart()
+        return await attempt(fb)
 
 
-def _openai_complete(model, system, user, temperature, max_tokens, on_token) -> str:
-    client = _get_openai()
+def _complete(model: str, system: str, user: str, temperature: float = 0.7,
+              max_tokens: int = 1024, on_token: Optional[Callable[[str], None]] = None,
+              cache_creative: Optional[bool] = None,
+              on_restart: Optional[Callable[[], None]] = None) -> str:
+    """Blocking :func:`_acomplete` for sync callers; ``on_token`` and
+    ``on_restart`` are called on this thread, not on the provider loop."""
+    relay = providers.Relay(on_token) if on_token is not None else None
+    if relay is not None and on_restart is not None:
+        on_restart = relay.bind(on_restart)
+    return providers.run(_acomplete(model, system, user, temperature, max_tokens,
+                                    relay, cache_creative, on_restart), relay=relay)
+
+
+async def _openai_complete(model, system, user, temperature, max_tokens, on_token,
+                           call: metrics.Call) -> str:
+    client = providers.openai_client()
     messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
     if on_token is not None:
         text = ""
-        stream = client.chat.completions.create(
-            model=model, messages=messages, stream=True, temperature=temperature)
-        for chunk in stream:
+        stream = await client.chat.completions.create(
+            model=model, messages=messages, stream=True, temperature=temperature,
+            stream_options={"include_usage": True})
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                call.usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
             delta = chunk.choices[0].delta.content if chunk.choices else None
             if delta:
+                call.first()
                 text += delta
                 on_token(delta)
         return text
-    resp = client.chat.completions.create(model=model, messages=messages, temperature=temperature)
+    resp = await client.chat.completions.create(model=model, messages=messages, temperature=temperature)
+    call.first()
+    if getattr(resp, "usage", None):
+        call.usage(resp.usage.prompt_tokens, resp.usage.completion_tokens)
     return resp.choices[0].message.content or ""
 
 
-def _anthropic_complete(model, system, user, temperature, max_tokens, on_token) -> str:
-    client = _get_anthropic()
+async def _anthropic_complete(model, system, user, temperature, max_tokens, on_token,
+                              call: metrics.Call) -> str:
+    client = providers.anthropic_client()
     if on_token is not None:
         text = ""
-        with client.messages.stream(model=model, system=system, max_tokens=max_tokens,
-                                    temperature=temperature,
-                                    messages=[{"role": "user", "content": user}]) as stream:
-            for delta in stream.text_stream:
+        async with client.messages.stream(model=model, system=system, max_tokens=max_tokens,
+                                          temperature=temperature,
+                                          messages=[{"role": "user", "content": user}]) as stream:
+            async for delta in stream.text_stream:
+                call.first()
                 text += delta
                 on_token(delta)
+            final = await stream.get_final_message()
+        call.usage(final.usage.input_tokens, final.usage.output_tokens)
         return text
-    resp = client.messages.create(model=model, system=system, max_tokens=max_tokens,
-                                  temperature=temperature,
-                                  messages=[{"role": "user", "content": user}])
+    resp = await client.messages.create(model=model, system=system, max_tokens=max_tokens,
+                                        temperature=temperature,
+                                        messages=[{"role": "user", "content": user}])
+    call.first()
+    call.usage(resp.usage.input_tokens, resp.usage.output_tokens)
     return "".join(getattr(b, "text", "") for b in resp.content)
 
 
 # --------------------------------------------------------------------------- #
 # Tasks
 # --------------------------------------------------------------------------- #
-def rate_story(text: str) -> int:
+async def arate_story(text: str) -> int:
     """Return a 0-10 viral-potential score for a raw story."""
-    content = _complete(config.settings.model_rate, persona.rating_system_prompt(),
-                        text[:6000], temperature=0.0, max_tokens=8)
+    content = await _acomplete(config.settings.model_rate, persona.rating_system_prompt(),
+                               text[:6000], temperature=0.0, max_tokens=8)
     for token in re.findall(r"\d+", content):
         value = int(token)
         if 0 <= value <= 10:
@@ -169,10 +420,53 @@ def rate_story(text: str) -> int:
     return 0
 
 
+def rate_story(text: str) -> int:
+    return providers.run(arate_story(text))
+
+
+_SCORE_LINE_RE = re.compile(r"^[\s#*\-]*([A-Za-z0-9_]+)\s*[:=\-]\s*(\d{1,2})\b")
+
+
+def rate_stories(posts: Sequence[Tuple[str, str]], max_chars: int = 2500) -> Dict[str, int]:
+    """Score several raw stories in one request: ``{post id: 0-10}``.
+
+    ``posts`` are ``(id, text)`` pairs.  The reply must hold one ``id: score``
+    line per post; ids it leaves out, invents or scores outside 0-10 are rated
+    one by one with :func:`rate_story` instead.
+    """
+    posts = list(posts)
+    if len(posts) == 1:
+        return {posts[0][0]: rate_story(posts[0][1])}
+    wanted = {pid for pid, _ in posts}
+    scores: Dict[str, int] = {}
+    if posts:
+        user = "\n\n".join(f"### {pid}\n{text[:max_chars]}" for pid, text in posts)
+        try:
+            content = _complete(config.settings.model_rate, persona.batch_rating_system_prompt(),
+                                user, temperature=0.0, max_tokens=12 * len(posts) + 16)
+        except Exception as exc:
+            logs.get("llm").warning("batch rating failed (%s); rating one by one", str(exc)[:160])
+            content = ""
+        for line in content.splitlines():
+            m = _SCORE_LINE_RE.match(line)
+            if m and m.group(1) in wanted and m.group(1) not in scores and int(m.group(2)) <= 10:
+                scores[m.group(1)] = int(m.group(2))
+    missing = [(pid, text) for pid, text in posts if pid not in scores]
+    if missing and len(missing) < len(posts):
+        logs.get("llm").info("batch rating skipped %d of %d posts; rating them one by one",
+                             len(missing), len(posts))
+    # The stragglers are rated concurrently on the provider loop.
+    results = providers.run_all(arate_story(text) for _, text in missing)
+    for (pid, _), value in zip(missing, results):
+        scores[pid] = value if isinstance(value, int) else 0
+    return scores
+
+
 def storyfy(title: str, body: str, project: str,
             on_token: Optional[Callable[[str], None]] = None, chat=None,
-            kind: str = "story") -> str:
-    """Rewrite a story/news item into a K100DRA script (streamed if ``on_token``)."""
+            kind: str = "story", on_restart: Optional[Callable[[], None]] = None) -> str:
+    """Rewrite a story/news item into a K100DRA script (streamed if ``on_token``;
+    ``on_restart`` means the stream so far is void and starts over)."""
     s = config.settings
     system = persona.story_system_prompt(s.target_duration, s.max_script_chars,
                                          chat_samples=chat, kind=kind,
@@ -181,7 +475,8 @@ def storyfy(title: str, body: str, project: str,
         user = f"HEADLINE: {title}\n\nWHAT PEOPLE ARE SAYING:\n{body}"[:8000]
     else:
         user = f"{title}\n\n{body}"[:8000]
-    text = _complete(s.model_story, system, user, temperature=0.9, max_tokens=1100, on_token=on_token)
+    text = _complete(s.model_story, system, user, temperature=0.9, max_tokens=1100,
+                     on_token=on_token, on_restart=on_restart)
 
     # Remove dashes (AI tell), keep performance tags + {chat:} markers for voice.
     text = humanize(text.strip().strip('"'))
@@ -232,7 +527,7 @@ def metadata(script: str, subreddit: str, source_title: str, link: str) -> Tuple
 
 
 def correct_srt(srt_text: str, script_text: str) -> str:
-    """Fix spelling/missing words in an SRT against the original script."""
+    """Fix spelling/missing words in an SRT (excerpt) against the original script."""
     system = (
         "Correct the SRT so its words match the reference script: fix misspellings and "
         "obvious transcription errors only. Keep the same number of cues and the exact same "
@@ -1,52 +1,114 @@
 """Per-run logging.
 
-Each run truncates ``logs/latest.log`` and also writes a kept copy at
-``projects/<project>/run.log``. Everything funnels through the ``k100dra``
-logger — reporter activity, pipeline steps, and (most usefully) the **full**
-ffmpeg stderr — so when a render fails you can see exactly why.
+Each run writes a kept copy at ``projects/<project>/run.log``, and every active
+run also writes to ``logs/latest.log`` (truncated whenever a run starts while no
+other run is active).  Everything funnels through the ``k100dra`` logger —
+reporter activity, pipeline steps, and (most usefully) the **full** ffmpeg
+stderr — so when a render fails you can see exactly why.
+
+The studio can run several pipelines at once, so a run is tracked with a
+context variable: records only reach the ``run.log`` of the run that emitted
+them, including from the pipeline's step threads.
 """
 
 from __future__ import annotations
 
+import contextvars
 import logging
 import os
+import threading
+from typing import Dict, Optional
 
 from . import config
 
 _PKG = "k100dra"
 
+_current: contextvars.ContextVar[Optional[object]] = contextvars.ContextVar("k100dra_run", default=None)
+_labels: Dict[object, str] = {}
+_handlers: Dict[object, logging.Handler] = {}
+_latest: Optional[logging.Handler] = None
+_lock = threading.Lock()
+
+
+class _RunFilter(logging.Filter):
+    """Pass only records emitted inside one run."""
+
+    def __init__(self, token: object) -> None:
+        super().__init__()
+        self.token = token
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return _current.get() is self.token
+
+
+class _LabelFilter(logging.Filter):
+    """Tag records with the project they came from (for the shared latest.log)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run = _labels.get(_current.get(), "-")
+        return True
+
+
+def _close(handler: Optional[logging.Handler]) -> None:
+    if handler is None:
+        return
+    logging.getLogger(_PKG).removeHandler(handler)
+    try:
+        handler.close()
+    except Exception:
+        pass
+
 
-def init_run_log(project: str) -> logging.Logger:
-    """(Re)configure the package logger for a fresh run. Resets latest.log."""
+def init_run_log(project: str, append: bool = False) -> logging.Logger:
+    """Start logging a run in the current context (``append`` continues the
+    project's ``run.log`` instead of starting it over)."""
+    global _latest
     logger = logging.getLogger(_PKG)
     logger.setLevel(logging.DEBUG)
     logger.propagate = False
-    for handler in list(logger.handlers):
-        logger.removeHandler(handler)
-        try:
-            handler.close()
-        except Exception:
-            pass
 
+    close_run_log()
+    token = object()
+    _current.set(token)
     fmt = logging.Formatter("%(asctime)s %(levelname)-7s %(name)s | %(message)s", "%H:%M:%S")
-    try:
-        os.makedirs(config.LOG_DIR, exist_ok=True)
-        latest = logging.FileHandler(config.LATEST_LOG, mode="w", encoding="utf-8")
-        latest.setFormatter(fmt)
-        logger.addHandler(latest)
-    except Exception:
-        pass
-    try:
-        kept = logging.FileHandler(os.path.join(config.project_dir(project), "run.log"),
-                                   mode="w", encoding="utf-8")
-        kept.setFormatter(fmt)
-        logger.addHandler(kept)
-    except Exception:
-        pass
+    with _lock:
+        _labels[token] = project
+        if not _handlers:   # first active run → reset latest.log
+            _close(_latest)
+            _latest = None
+            try:
+                os.makedirs(config.LOG_DIR, exist_ok=True)
+                _latest = logging.FileHandler(config.LATEST_LOG, mode="w", encoding="utf-8")
+                _latest.setFormatter(logging.Formatter(
+                    "%(asctime)s %(levelname)-7s %(name)s [%(run)s] | %(message)s", "%H:%M:%S"))
+                _latest.addFilter(_LabelFilter())
+                logger.addHandler(_latest)
+            except Exception:
+                _latest = None
+        try:
+            kept = logging.FileHandler(os.path.join(config.project_dir(project), "run.log"),
+                                       mode="a" if append else "w", encoding="utf-8")
+            kept.setFormatter(fmt)
+            kept.addFilter(_RunFilter(token))
+            logger.addHandler(kept)
+            _handlers[token] = kept
+        except Exception:
+            _handlers[token] = logging.NullHandler()
 
-    logger.info("===== K100DRA run: %s =====", project)
+    logger.info("===== K100DRA run: %s%s =====", project, " (continued)" if append else "")
     return logger
 
 
+def close_run_log() -> None:
+    """Detach the current context's ``run.log`` (latest.log stays open)."""
+    token = _current.get()
+    if token is None:
+        return
+    with _lock:
+        _close(_handlers.pop(token, None))
+        _labels.pop(token, None)
+    _current.set(None)
+
+
 def get(name: str = "run") -> logging.Logger:
     return logging.getLogger(f"{_PKG}.{name}")
@@ -0,0 +1,190 @@
+"""Per-run counters and per-call instrumentation.
+
+Modules deep in the pipeline (the LLM cache, the provider calls, …) call
+:func:`count` and :func:`call` without knowing which run they serve: the
+collector lives in a context variable that the pipeline sets up for each run and
+that follows its steps into their threads (and onto the provider loop).  The
+pipeline publishes :func:`snapshot` on the run state, attaches each stage's
+calls as a ``calls`` artifact, and appends the whole record to the project's
+``metrics.json`` when the run ends.
+
+Costs are estimates from :data:`PRICES` (USD, list prices); unknown models are
+recorded without one.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from . import config
+
+# (unit, USD per unit in, USD per unit out). Units: tokens priced per million,
+# characters per thousand, audio per minute. Longest matching prefix wins.
+PRICES: Dict[str, tuple] = {
+    "gpt-4o-mini": ("tokens", 0.15, 0.60),
+    "gpt-4o": ("tokens", 2.50, 10.00),
+    "gpt-4.1-mini": ("tokens", 0.40, 1.60),
+    "gpt-4.1": ("tokens", 2.00, 8.00),
+    "gpt-5": ("tokens", 1.25, 10.00),
+    "claude-3-5-haiku": ("tokens", 0.80, 4.00),
+    "claude-haiku": ("tokens", 1.00, 5.00),
+    "claude-sonnet": ("tokens", 3.00, 15.00),
+    "claude-opus": ("tokens", 15.00, 75.00),
+    "tts-1-hd": ("chars", 0.030, 0.0),
+    "tts-1": ("chars", 0.015, 0.0),
+    "eleven_": ("chars", 0.30, 0.0),
+    "whisper-1": ("minutes", 0.006, 0.0),
+    "gpt-4o-transcribe": ("minutes", 0.006, 0.0),
+    "gpt-4o-mini-transcribe": ("minutes", 0.003, 0.0),
+}
+_PER = {"tokens": 1_000_000, "chars": 1_000, "minutes": 1}
+
+
+def _price(model: str) -> Optional[tuple]:
+    match = max((k for k in PRICES if model.startswith(k)), key=len, default=None)
+    return PRICES[match] if match is not None else None
+
+
+def estimate_cost(model: str, units_in: float, units_out: float = 0) -> Optional[float]:
+    price = _price(model)
+    if price is None:
+        return None
+    unit, p_in, p_out = price
+    return round((units_in * p_in + units_out * p_out) / _PER[unit], 6)
+
+
+class Call:
+    """One timed provider call; fill in what the response tells you."""
+
+    def __init__(self, kind: str, provider: str, model: str) -> None:
+        self.kind, self.provider, self.model = kind, provider, model
+        self.started = time.time()
+        self.first_at: Optional[float] = None
+        self.units_in: float = 0
+        self.units_out: float = 0
+        self.ok = False
+
+    def first(self) -> None:
+        """Mark the first token / byte of the response."""
+        if self.first_at is None:
+            self.first_at = time.time()
+
+    def usage(self, units_in: float = 0, units_out: float = 0) -> None:
+        self.units_in, self.units_out = units_in or 0, units_out or 0
+
+    def record(self, stage: Optional[str]) -> dict:
+        end = time.time()
+        unit = (_price(self.model) or ("tokens",))[0]
+        return {
+            "kind": self.kind, "provider": self.provider, "model": self.model,
+            "stage": stage, "at": round(self.started, 3), "ok": self.ok,
+            "wall_s": round(end - self.started, 3),
+            "ttfb_s": round(self.first_at - self.started, 3) if self.first_at else None,
+            "unit": unit, "in": self.units_in, "out": self.units_out,
+            "cost_usd": estimate_cost(self.model, self.units_in, self.units_out) if self.ok else 0.0,
+        }
+
+
+class RunMetrics:
+    """Counters and call records for one run (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.calls: List[dict] = []
+
+    def add_call(self, record: dict) -> None:
+        with self._lock:
+            self.calls.append(record)
+            self.counters["calls"] = self.counters.get("calls", 0) + 1
+            if record.get("cost_usd"):
+                self.counters["cost_usd"] = round(self.counters.get("cost_usd", 0) + record["cost_usd"], 6)
+
+    def stage_calls(self, stage: str) -> List[dict]:
+        with self._lock:
+            return [c for c in self.calls if c.get("stage") == stage]
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.counters)
+
+
+_current: contextvars.ContextVar[Optional[RunMetrics]] = contextvars.ContextVar(
+    "k100dra_metrics", default=None)
+_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "k100dra_metrics_stage", default=None)
+
+
+def start(existing: Optional[RunMetrics] = None) -> RunMetrics:
+    """Collect into ``existing`` (or a fresh collector) in the current context."""
+    collector = existing or RunMetrics()
+    _current.set(collector)
+    return collector
+
+
+def current() -> Optional[RunMetrics]:
+    return _current.get()
+
+
+def count(name: str, n: float = 1) -> None:
+    """Add to a counter of the current run (no-op outside a run)."""
+    collector = _current.get()
+    if collector is not None:
+        collector.count(name, n)
+
+
+def snapshot() -> Dict[str, float]:
+    collector = _current.get()
+    return collector.snapshot() if collector is not None else {}
+
+
+def set_stage(stage: Optional[str]) -> None:
+    """Attribute the calls made from here on (in this context) to ``stage``."""
+    _stage.set(stage)
+
+
+@contextmanager
+def call(kind: str, provider: str, model: str) -> Iterator[Call]:
+    """Time a provider call and record it on the current run (if any)."""
+    c = Call(kind, provider, model)
+    try:
+        yield c
+        c.ok = True
+    finally:
+        collector = _current.get()
+        if collector is not None:
+            collector.add_call(c.record(_stage.get()))
+
+
+def append_to_project(project: str, run_id: str, collector: RunMetrics) -> None:
+    """Append this run's counters and calls to ``projects/<project>/metrics.json``."""
+    path = os.path.join(config.project_dir(project), "metrics.json")
+    data: dict = {"runs": []}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except Exception:
+            data = {"runs": []}
+    with collector._lock:
+        data.setdefault("runs", []).append({
+            "run_id": run_id, "at": time.time(),
+            "counters": dict(collector.counters), "calls": list(collector.calls),
+        })
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=2)
+        os.replace(tmp, path)
+    except Exception:
+        pass
@@ -0,0 +1,116 @@
+"""MP3 frame headers, read and written without decoding any audio.
+
+Enough of MPEG audio to tell how long a stream is by walking its frame headers
+(each frame holds a fixed number of samples) and to produce silence as ready-made
+frames.  Used to stitch voice clips without decoding them (:mod:`voice`) and by
+the offline stand-ins (:mod:`standin`).
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple
+
+# kbit/s by [version is MPEG-1][layer][index]; index 0 ("free") and 15 are invalid.
+_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+_TAGS = (b"Xing", b"Info", b"VBRI")   # an encoder's header frame, not audio
+
+
+def parse_header(b: bytes) -> Optional[Tuple[int, int, int]]:
+    """``(frame bytes, samples, sample rate)`` for a 4-byte frame header, or None."""
+    if len(b) < 4 or b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    version = (b[1] >> 3) & 0x03          # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = 4 - ((b[1] >> 1) & 0x03)      # 1, 2, 3 (4 = reserved)
+    index, rate_index, padding = b[2] >> 4, (b[2] >> 2) & 0x03, (b[2] >> 1) & 0x01
+    if version == 1 or layer == 4 or index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][index] * 1000
+    rate = _SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        return (12 * bitrate // rate + padding) * 4, 384, rate
+    samples = 1152 if (layer == 2 or mpeg1) else 576
+    return samples // 8 * bitrate // rate + padding, samples, rate
+
+
+def _skip_id3(data: bytes) -> int:
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size + (10 if data[5] & 0x10 else 0)
+    return 0
+
+
+def frames(data: bytes) -> Iterator[Tuple[int, int, int, int]]:
+    """``(offset, frame bytes, samples, sample rate)`` of every frame in ``data``
+    (an ID3v2 tag in front is skipped, junk between frames is resynced over)."""
+    pos, end = _skip_id3(data), len(data)
+    while pos + 4 <= end:
+        info = parse_header(data[pos:pos + 4])
+        if info is None or pos + info[0] > end:
+            pos += 1
+            continue
+        yield (pos,) + info
+        pos += info[0]
+
+
+def _is_tag(data: bytes, offset: int) -> bool:
+    head = data[offset + 4:offset + 40]
+    return any(tag in head for tag in _TAGS)
+
+
+def duration(data: bytes) -> float:
+    """Playing time of an MP3 stream, from its frame headers alone (a leading
+    Xing/Info/VBRI frame is metadata and does not count)."""
+    total = 0.0
+    for n, (offset, _, samples, rate) in enumerate(frames(data)):
+        if n or not _is_tag(data, offset):
+            total += samples / rate
+    return total
+
+
+def stream_format(data: bytes) -> Optional[Tuple[int, int, bool]]:
+    """``(sample rate, kbit/s, mono)`` of the first Layer III audio frame, or
+    None — the arguments :func:`silence` needs to produce matching frames."""
+    for offset, _, _, rate in frames(data):
+        b = data[offset:offset + 4]
+        if (b[1] >> 1) & 0x03 != 1 or _is_tag(data, offset):
+            continue
+        mpeg1 = (b[1] >> 3) & 0x03 == 3
+        return rate, _BITRATES[(mpeg1, 3)][b[2] >> 4], b[3] >> 6 == 3
+    return None
+
+
+def silence(seconds: float, rate: int = 44100, kbps: int = 128, mono: bool = True) -> bytes:
+    """Layer III frames that decode to ``seconds`` of silence (rounded to whole
+    frames), in any MPEG-1/2/2.5 sample rate.
+
+    Every frame is a header, an all-zero side info block (no main data, so the
+    decoder outputs zeros) and zero padding up to the frame size.
+    """
+    version = next(v for v, rates in _SAMPLE_RATES.items() if rate in rates)
+    mpeg1 = version == 3
+    index = _BITRATES[(mpeg1, 3)].index(kbps)
+    rate_index = _SAMPLE_RATES[version].index(rate)
+    samples = 1152 if mpeg1 else 576
+    per_frame = samples // 8 * kbps * 1000        # frame bytes × sample rate
+    count = max(0, round(seconds * rate / samples))
+    out = bytearray()
+    acc = 0
+    for _ in range(count):
+        # Pad the occasional frame so the byte rate matches the bitrate exactly.
+        acc += per_frame % rate
+        padding = 1 if acc >= rate else 0
+        acc -= rate * padding
+        header = bytes((0xFF, 0xE3 | (version << 3),
+                        (index << 4) | (rate_index << 2) | (padding << 1), 0xC0 if mono else 0x00))
+        size = per_frame // rate + padding
+        out += header + bytes(size - 4)
+    return bytes(out)
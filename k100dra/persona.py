@@ -185,7 +185,7 @@ class Persona:
             "emojis, no hashtags, and absolutely no dashes."
         )
 
-    def rating_system_prompt(self) -> str:
+    def _rating_rubric(self) -> str:
         return (
             f"You are {self.name}'s RUTHLESS producer. Most stories are skippable, so be "
             "harsh and stingy. Rate 0-10 on whether a vertical clip of this would (a) STOP "
@@ -199,7 +199,16 @@ class Persona:
             "explain why anyone should care. A merely mildly-annoying story is a 3, not a 7.\n"
             "Score 0 for real tragedy, death, graphic violence, war casualties, or partisan "
             "political fights, those are not brand-safe for this channel.\n"
-            "Respond with ONLY one integer from 0 to 10."
+        )
+
+    def rating_system_prompt(self) -> str:
+        return self._rating_rubric() + "Respond with ONLY one integer from 0 to 10."
+
+    def batch_rating_system_prompt(self) -> str:
+        return self._rating_rubric() + (
+            "You get several posts, each starting with a line '### <id>'. Judge each one on "
+            "its own, not against the others. Respond with ONLY one line per post, in the "
+            "same order: '<id>: <integer 0-10>'. No other text."
         )
 
     def chat_system_prompt(self, count: int) -> str:
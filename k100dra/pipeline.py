@@ -7,13 +7,17 @@ the terminal, which keeps it easy to drive from either.
 
 from __future__ import annotations
 
+import contextvars
 import datetime
 import os
 import random
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import List, Optional, Set
 
-from . import config, llm, logs, reddit_source, selector, subtitles, video, voice, youtube
+from . import checkpoint, config, graph, limits, llm, logs, metrics, reddit_source, selector, subtitles, video, voice, youtube
 from .events import ProgressReporter, RunCancelled
 
 
@@ -27,177 +31,588 @@ def _resolve_mode(mode: Optional[str]) -> str:
     return "news" if random.random() < config.settings.news_ratio else "story"
 
 
+_project_lock = threading.Lock()
+
+
 def new_project_id() -> str:
-    return datetime.datetime.now().strftime("%Y_%m_%d-%H_%M_%S")
+    """A timestamped project id, unique even when runs start in the same second."""
+    base = datetime.datetime.now().strftime("%Y_%m_%d-%H_%M_%S")
+    with _project_lock:
+        project, n = base, 1
+        while os.path.exists(os.path.join(config.PROJECTS_DIR, project)):
+            n += 1
+            project = f"{base}-{n}"
+        config.project_dir(project)   # claim it before releasing the lock
+    return project
 
 
 def _artifact_url(project: str, filename: str) -> str:
     return f"/artifacts/{project}/{filename}"
 
 
+# Narration speed used to size media fetched before the voice exists.  Kept on
+# the slow side: over-estimating only costs a few extra seconds of download.
+_EST_CHARS_PER_SEC = 12.0
+
+# Which stage a failing step is reported on.
+_STEP_STAGE = {
+    "story": "story", "chat": "story", "script": "story",
+    "voice": "voice",
+    "fit": "audio", "music": "audio", "mix": "audio",
+    "subtitles": "subtitles",
+    "background": "video", "base": "video", "video": "video",
+    "metadata": "publish", "publish": "publish",
+}
+
+
+# The render/publish end of a run; everything before it waits on the network.
+RENDER_STEPS = ("base", "video", "publish")
+
+
+def estimate_duration(script: str) -> float:
+    """Upper-bound guess of the narration length from the script alone."""
+    s = config.settings
+    return min(s.target_duration, len(script) / _EST_CHARS_PER_SEC) + 2.0
+
+
+def _checkpoints() -> dict:
+    """Checkpointed steps → (steps they consume, settings their output depends
+    on), in dependency order. Changing a setting here invalidates that step and
+    everything downstream of it on resume."""
+    s = config.settings
+    vis = asdict(s.visuals)
+    return {
+        "story": ((), None),
+        "chat": (("story",), s.visuals.chat_overlay),
+        "script": (("story", "chat"), (s.model_story, s.target_duration, s.max_script_chars, s.chat_voice)),
+        "voice": (("script",), (bool(s.elevenlabs_key), s.elevenlabs_model, s.elevenlabs_voice_id,
+                                s.elevenlabs_chat_voice_id, s.voice_stability, s.voice_similarity,
+                                s.voice_style, s.voice_speaker_boost, s.voice_tags, s.chat_voice,
+                                s.audio_wav)),
+        "fit": (("voice",), s.target_duration),
+        "mix": (("fit",), (s.music_volume_db, s.music_duck, s.loudness_lufs)),
+        "subtitles": (("fit", "script"), (s.model_transcribe, s.subtitle_llm, s.model_srt)),
+        "base": (("script",), (vis["motion_zoom"], vis["color_grade"])),
+        "video": (("base", "mix", "subtitles", "chat"), vis),
+        "publish": (("video", "script"), s.upload_privacy),
+    }
+
+
 def run(reporter: ProgressReporter, project: Optional[str] = None,
-        upload: Optional[bool] = None, mode: Optional[str] = None) -> dict:
+        upload: Optional[bool] = None, mode: Optional[str] = None,
+        resume: bool = False, half: Optional[str] = None,
+        handoff: Optional[dict] = None) -> dict:
     """Run the whole pipeline. Returns a summary dict; never raises for a normal
-    stage failure (it records the error on the stage instead)."""
+    stage failure (it records the error on the stage instead).
+
+    The steps form a dependency graph (see :func:`_steps`), so work that only
+    needs part of an earlier result — fetching music and the background once the
+    script exists, transcribing while the music is mixed, writing the upload
+    metadata — runs alongside the slow network calls instead of after them.
+
+    Every step records a checkpoint in the project's ``manifest.json``; with
+    ``resume=True`` the steps whose outputs are still valid are restored from it
+    instead of being paid for again.
+
+    ``half="gather"`` runs only the network-bound steps and, on success, returns
+    ``{"handoff": ...}`` without finishing the run; ``half="render"`` finishes it
+    from that handoff (styling, render, publish).  ``main.py --pipeline`` uses
+    this to render one video while the next one is being gathered.
+    """
     config.ensure_dirs()
     project = project or reporter.state.project
     config.project_dir(project)
-    logs.init_run_log(project)
+    logs.init_run_log(project, append=half == "render")
     s = config.settings
     upload = s.auto_upload if upload is None else upload
     summary: dict = {"project": project}
+    ctx: dict = {}
+    failed: dict = {}
+
+    manifest = checkpoint.Manifest(project)
+    reuse: List[str] = []
+    collector = metrics.start(handoff["metrics"] if handoff is not None else None)
+    if handoff is not None:
+        summary, ctx, reuse = handoff["summary"], dict(handoff["ctx"]), handoff["reuse"]
+    elif resume:
+        if manifest.exists():
+            reuse = manifest.plan(_checkpoints())
+            reporter.log(f"Resuming {project}: reusing {', '.join(reuse) or 'nothing'}")
+        else:
+            reporter.log(f"No checkpoints in {project} — starting it from scratch")
+
+    def on_error(step: graph.Step, exc: BaseException) -> None:
+        if not isinstance(exc, RunCancelled) and not failed:
+            failed["stage"] = _STEP_STAGE.get(step.name, "story")
+
+    steps = _steps(reporter, project, upload, mode, summary, manifest, reuse, collector)
+    if half == "gather":
+        steps = [st for st in steps if st.name not in RENDER_STEPS]
+    elif half == "render":
+        steps = [st for st in steps if st.name in RENDER_STEPS]
+    handed_off = False
+
+    def finish(result: dict, ok: bool) -> None:
+        reporter.metrics(collector.snapshot())   # before "done", the run's last event
+        reporter.finish(result, ok=ok)
 
     try:
-        # 1 — STORY ---------------------------------------------------------- #
-        run_mode = _resolve_mode(mode)
-        reporter.start("story", f"Finding a {'news topic' if run_mode == 'news' else 'story'} worth telling…")
-        post, rating = _find_story(reporter, run_mode)
-        reddit_source.mark_used(post.id)
+        graph.run_steps(steps, ctx, max_workers=s.pipeline_workers,
+                        check_stop=reporter.check_stop, on_error=on_error)
+        if half == "gather":
+            handed_off = True
+            return {"project": project, "handoff": {"summary": summary, "ctx": ctx, "reuse": reuse,
+                                                     "metrics": collector}}
+        finish(summary, ok=True)
+        return summary
+
+    except RunCancelled:
+        reporter.log("Run cancelled.", level="error")
+        finish({"cancelled": True}, ok=False)
+        return {"cancelled": True}
+    except Exception as exc:  # surface on the stage that failed
+        logs.get("pipeline").exception("run failed")
+        active = failed.get("stage") or next(
+            (st.id for st in reporter.state.stages.values() if st.status.value == "running"), "story")
+        reporter.error(active, str(exc))
+        finish({"error": str(exc)}, ok=False)
+        return {"error": str(exc)}
+    finally:
+        # Fetched YouTube segments are normally removed right after use; this
+        # catches the ones a failed run never got to.
+        if not handed_off:
+            selector.cleanup(ctx.get("music"))
+            selector.cleanup(ctx.get("background"))
+            if ctx.get("voice_stream") is not None:   # e.g. the script finished, the voice never ran
+                ctx["voice_stream"].close()
+            metrics.append_to_project(project, reporter.state.run_id, collector)
+        else:
+            reporter.metrics(collector.snapshot())
+        logs.close_run_log()
+
+
+def _steps(reporter: ProgressReporter, project: str, upload: bool, mode: Optional[str],
+           summary: dict, manifest: checkpoint.Manifest, reuse: List[str],
+           collector: metrics.RunMetrics) -> List[graph.Step]:
+    """The pipeline as a graph of steps over a shared context dict."""
+    s = config.settings
+    pdir = config.project_dir(project)
+    deps = _checkpoints()
+
+    def saved(step: str) -> Optional[dict]:
+        """The checkpointed values of ``step`` if this run may reuse them."""
+        return manifest.values(step) if step in reuse else None
+
+    def remember(step: str, files=(), **values) -> None:
+        upstream, params = deps[step]
+        manifest.record(step, manifest.expected_key(step, upstream, params), files, **values)
+
+    def reused(stage: str, message: str = "") -> None:
+        if reporter.state.stages[stage].status.value != "running":
+            reporter.start(stage, "Restoring from checkpoint…")
+        reporter.done(stage, f"{message} (checkpoint)".strip())
+
+    def show_audio(stage: str, name: str) -> None:
+        """Point the stage's player at ``name``.  A WAV (audio_wav mode) gets a
+        small mp3 preview first, encoded in the background so no step waits."""
+        if not name.endswith(".wav"):
+            reporter.artifact(stage, "audio_url", _artifact_url(project, name))
+            return
+        src = os.path.join(pdir, name)
+        preview = name[:-len(".wav")] + ".preview.mp3"
+        dst = os.path.join(pdir, preview)
+
+        def encode() -> None:
+            if not (os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src)):
+                try:
+                    video.mp3_preview(src, dst)
+                except Exception as exc:
+                    reporter.log(f"No {stage} preview: {str(exc)[:80]}")
+                    return
+            reporter.artifact(stage, "audio_url", _artifact_url(project, preview))
+
+        threading.Thread(target=contextvars.copy_context().run, args=(encode,),
+                         name="k100dra-preview", daemon=True).start()
+
+    # 1 — STORY -------------------------------------------------------------- #
+    def find(ctx: dict) -> dict:
+        old = saved("story")
+        if old:
+            post, rating = reddit_source.Post(**old["post"]), old["rating"]
+        else:
+            run_mode = _resolve_mode(mode)
+            reporter.start("story", f"Finding a {'news topic' if run_mode == 'news' else 'story'} worth telling…")
+            post, rating = _find_story(reporter, run_mode)
+            reddit_source.mark_used(post.id)
+            remember("story", post=asdict(post), rating=rating)
         reporter.artifact("story", "title", post.title)
         reporter.artifact("story", "subreddit", post.subreddit)
         reporter.artifact("story", "rating", rating)
         reporter.artifact("story", "kind", post.kind)
         reporter.log(f"[{post.kind}] r/{post.subreddit} · “{post.title[:60]}” · {rating}/10")
+        summary["title"] = post.title
+        return {"post": post, "rating": rating}
 
+    def read_chat(ctx: dict) -> dict:
         # Generate the live chat FIRST so the script can read it back by name
         # (keeps her words and the on-screen chat coherent). Reused for the overlay.
+        old = saved("chat")
+        if old:
+            return {"chat": [tuple(line) for line in old["chat"]]}
+        post = ctx["post"]
         chat = []
-        if config.settings.visuals.chat_overlay:
+        if s.visuals.chat_overlay:
             reporter.progress("story", 0.42, "Reading the chat…")
             chat = llm.generate_chat(f"{post.title}\n{post.text}")
+        remember("chat", chat=chat)
+        return {"chat": chat}
+
+    def write_script(ctx: dict) -> dict:
+        old = saved("script")
+        stream = None
+        if old:
+            raw_script = old["raw_script"]
+        else:
+            post = ctx["post"]
+            reporter.progress("story", 0.45, "K100DRA is writing the script…")
+            display = llm.DisplayStream()
+            written = {"chars": 0, "pct": 45}
+            if s.voice_stream:
+                reporter.start("voice", "Recording while she writes…")
+                stream = voice.VoiceStream(project,
+                                           on_progress=lambda f, m: reporter.progress("voice", f, m))
 
-        reporter.progress("story", 0.45, "K100DRA is writing the script…")
-        buf = {"t": ""}
+            def on_token(delta: str):
+                # Only the new piece is processed and sent; a full snapshot goes
+                # out when the bar moves a whole percent.
+                if stream is not None:
+                    stream.feed(delta)
+                reporter.stream("story", "text", display.feed(delta))
+                written["chars"] += len(delta)
+                pct = 45 + int(min(50, written["chars"] / max(1, s.max_script_chars) * 50))
+                if pct != written["pct"]:
+                    written["pct"] = pct
+                    reporter.progress("story", pct / 100)
 
-        def on_token(delta: str):
-            buf["t"] += delta
-            reporter.state.stages["story"].artifacts["text"] = llm.display_script(buf["t"])
-            frac = 0.45 + min(0.5, len(buf["t"]) / max(1, s.max_script_chars) * 0.5)
-            reporter.progress("story", frac)
+            def on_restart():
+                # The model failed mid-script and the fallback starts over: drop
+                # what it wrote, on screen and in the voice, so neither has both.
+                display.reset()
+                if stream is not None:
+                    stream.reset()
+                written.update(chars=0, pct=45)
+                reporter.stream("story", "text", "", replace=True)
+                reporter.progress("story", 0.45, "Starting the script over…")
 
-        raw_script = llm.storyfy(post.title, post.text, project, on_token=on_token,
-                                 chat=chat, kind=post.kind)
+            try:
+                raw_script = llm.storyfy(post.title, post.text, project, on_token=on_token,
+                                         chat=ctx["chat"], kind=post.kind, on_restart=on_restart)
+            except BaseException:
+                if stream is not None:
+                    stream.close()
+                raise
         script = llm.clean_for_display(raw_script)  # plain words for subtitles + metadata
         reporter.artifact("story", "text", llm.display_script(raw_script))  # show chat lines
-        reporter.done("story", f"{len(script)} characters")
-        summary["title"] = post.title
+        if old:
+            reused("story", f"{len(script)} characters")
+        else:
+            remember("script", ["generated.txt"], raw_script=raw_script)
+            reporter.done("story", f"{len(script)} characters")
+        return {"raw_script": raw_script, "script": script, "voice_stream": stream}
 
-        # 2 — VOICE ---------------------------------------------------------- #
-        reporter.check_stop()
-        reporter.start("voice", "Recording the voiceover…")
-        info = voice.synthesize(raw_script, project,
-                                on_progress=lambda f, m: reporter.progress("voice", f, m))
+    # 2 — VOICE -------------------------------------------------------------- #
+    def record_voice(ctx: dict) -> dict:
+        name = voice.speech_file()
+        old = saved("voice")
+        if old:
+            info = old["voice_info"]
+        elif ctx["voice_stream"] is not None:
+            info = ctx["voice_stream"].finish(ctx["raw_script"])
+            remember("voice", [name], voice_info=info)
+        else:
+            reporter.start("voice", "Recording the voiceover…")
+            info = voice.synthesize(ctx["raw_script"], project,
+                                    on_progress=lambda f, m: reporter.progress("voice", f, m))
+            remember("voice", [name], voice_info=info)
         reporter.artifact("voice", "engine", info["engine"])
         reporter.artifact("voice", "voice", info["voice"])
-        reporter.artifact("voice", "audio_url", _artifact_url(project, "speech.mp3"))
-        chat_intervals = info.get("chat_intervals") or []
-        reporter.done("voice", f"via {info['engine']}")
+        show_audio("voice", name)
+        if old:
+            reused("voice", f"via {info['engine']}")
+        else:
+            reporter.done("voice", f"via {info['engine']}")
+        return {"speech": os.path.join(pdir, name), "voice_info": info}
 
-        # 3 — AUDIO MIX ------------------------------------------------------ #
-        reporter.check_stop()
+    # 3 — AUDIO MIX ---------------------------------------------------------- #
+    def fit(ctx: dict) -> dict:
+        # Only decides the speedup (from the file's headers); the mix applies
+        # it, and the transcription scales its timings by it.
         reporter.start("audio", "Fitting length + mixing music…")
-        speech = os.path.join(config.project_dir(project), "speech.mp3")
-        duration = video.audio_duration(speech)
+        old = saved("fit")
+        if old:   # checkpoints from before the single-pass mix sped the file up in place
+            return {"duration": old["duration"], "chat_intervals": old["chat_intervals"],
+                    "scale": old.get("scale", 1.0)}
+        chat_intervals = ctx["voice_info"].get("chat_intervals") or []
+        duration = video.audio_duration(ctx["speech"])
+        scale = 1.0
         if duration > s.target_duration:
-            reporter.progress("audio", 0.3, f"Trimming {duration:.0f}s → {s.target_duration:.0f}s")
-            new_dur = video.speedup_audio(speech, s.target_duration)
-            if chat_intervals and duration > 0:   # speedup shifts the interjection times
-                scale = new_dur / duration
-                chat_intervals = [[a * scale, b * scale] for a, b in chat_intervals]
-            duration = new_dur
-        music = selector.select_music(duration=duration, log=reporter.log)
-        mixed = os.path.join(config.project_dir(project), "speech_with_music.mp3")
-        reporter.progress("audio", 0.7, "Adding background music" if music else "No music found")
-        try:
-            video.mix_music(speech, music.path if music else None, mixed, s.music_volume_db)
-        finally:
-            selector.cleanup(music)  # remove any fetched YouTube music segment
-        duration = video.audio_duration(mixed)
+            reporter.progress("audio", 0.2, f"Trimming {duration:.0f}s → {s.target_duration:.0f}s")
+            # The speedup moves every moment by the same exact scale.
+            scale = s.target_duration / duration
+            chat_intervals = [[a * scale, b * scale] for a, b in chat_intervals]
+            duration = s.target_duration
+        remember("fit", duration=duration, chat_intervals=chat_intervals, scale=scale)
+        return {"duration": duration, "chat_intervals": chat_intervals, "scale": scale}
+
+    def pick_music(ctx: dict) -> dict:
+        # Only needs a length estimate, so it is fetched while the voice records.
+        return {"music": selector.select_music(duration=estimate_duration(ctx["script"]),
+                                               log=reporter.log)}
+
+    def mix(ctx: dict) -> dict:
+        old = saved("mix")
+        name = "speech_with_music" + voice.audio_ext()
+        mixed = os.path.join(pdir, name)
+        if old:
+            duration = old["duration"]
+        else:
+            music = ctx["music"]
+            reporter.progress("audio", 0.3, "Adding background music" if music else "No music found")
+            try:
+                missing = video.build_audio(ctx["speech"], music.path if music else None, mixed,
+                                            ctx["scale"], ctx["duration"], s.music_volume_db,
+                                            duck=s.music_duck, lufs=s.loudness_lufs, lo=0.3, hi=0.98,
+                                            on_progress=lambda f, m: reporter.progress("audio", f, m),
+                                            log=reporter.log)
+            finally:
+                selector.cleanup(music)  # remove any fetched YouTube music segment
+            duration = ctx["duration"]   # written to exactly this length
+            if not missing:   # a mix without ducking/loudnorm is redone on resume
+                remember("mix", [name], duration=duration)
         reporter.artifact("audio", "duration", round(duration, 1))
-        reporter.artifact("audio", "audio_url", _artifact_url(project, "speech_with_music.mp3"))
-        reporter.done("audio", f"{duration:.1f}s")
+        show_audio("audio", name)
+        if old:
+            reused("audio", f"{duration:.1f}s")
+        else:
+            reporter.done("audio", f"{duration:.1f}s")
+        return {"mixed": mixed, "mixed_duration": duration}
 
-        # 4 — SUBTITLES ------------------------------------------------------ #
-        reporter.check_stop()
+    # 4 — SUBTITLES ---------------------------------------------------------- #
+    def transcribe(ctx: dict) -> dict:
+        # Reads the narration as recorded and scales the timings to the fitted
+        # length, so it overlaps the mix.
+        old = saved("subtitles")
+        if old:
+            words = [subtitles.Word(*w) for w in old["words"]]
+            reporter.artifact("subtitles", "word_count", len(words))
+            reused("subtitles", f"{len(words)} words")
+            return {"words": words}
         reporter.start("subtitles", "Timing every word…")
-        words = subtitles.transcribe(project, on_progress=lambda f, m: reporter.progress("subtitles", f * 0.7, m))
-        reporter.progress("subtitles", 0.8, "Polishing spelling…")
-        words = subtitles.apply_correction(project, words, script)
+        words = subtitles.transcribe(project, on_progress=lambda f, m: reporter.progress("subtitles", f * 0.7, m),
+                                     scale=ctx["scale"])
+        reporter.progress("subtitles", 0.8, "Matching the words to the script…")
+        words = subtitles.apply_correction(project, words, ctx["script"])
+        remember("subtitles", ["speech.srt"], words=[[w.text, w.start, w.end] for w in words])
         reporter.artifact("subtitles", "word_count", len(words))
         reporter.done("subtitles", f"{len(words)} words")
+        return {"words": words}
 
-        # 5 — VIDEO ---------------------------------------------------------- #
-        reporter.check_stop()
-        reporter.start("video", "Choosing a fresh background…")
-        background = selector.select_background(duration, log=reporter.log)
+    # 5 — VIDEO -------------------------------------------------------------- #
+    def pick_background(ctx: dict) -> dict:
+        # Sized from the script so the (often slow) download overlaps the voice;
+        # the render trims it to the real narration length.
+        background = selector.select_background(estimate_duration(ctx["script"]), log=reporter.log)
         reporter.artifact("video", "background", background.name)
+        return {"background": background}
+
+    def stylize(ctx: dict) -> dict:
+        # Speculative: styled as soon as the background exists, at the script's
+        # estimated length, so it runs alongside the voice and the transcription.
+        # The captions pass cuts it to the real narration length.
+        old = saved("base")
+        base = os.path.join(pdir, "base.mp4")
+        if old:
+            reporter.artifact("video", "background", old["background"])
+            return {"base": base, "background_name": old["background"]}
+        background = ctx["background"]
+        reporter.start("video", f"Styling background ({background.name})…")
+        video.stylize_background(
+            project, background, estimate_duration(ctx["script"]), s.use_gpu,
+            on_progress=lambda f, m: reporter.progress("video", f if f is not None else reporter.state.stages["video"].progress, m))
+        remember("base", ["base.mp4"], background=background.name)
+        return {"base": base, "background_name": background.name}
+
+    def render(ctx: dict) -> dict:
+        chat, chat_intervals = ctx["chat"], ctx["chat_intervals"]
+        final = os.path.join(pdir, "video_final.mp4")
+        summary["video"] = final
+        preview = "video_styled.mp4" if os.path.exists(
+            os.path.join(pdir, "video_styled.mp4")) else "video_final.mp4"
+        if saved("video") is not None:
+            reporter.artifact("video", "video_url", _artifact_url(project, preview))
+            reporter.artifact("video", "final_url", _artifact_url(project, "video_final.mp4"))
+            reused("video", ctx["background_name"])
+            return {"video": final}
+        if reporter.state.stages["video"].status.value != "running":
+            reporter.start("video", "Burning captions + stream overlay…")
 
         # Reuse the chat generated in the story stage (same messages she read).
         if chat:
             reporter.artifact("video", "chat", [f"{u}: {m}" for u, m in chat][:8])
             reporter.log(f"Chat overlay: {len(chat)} reactions")
         if chat_intervals:
-            if os.path.exists(config.settings.chat_avatar_path()):
+            if os.path.exists(s.chat_avatar_path()):
                 reporter.log(f"Chat avatar swap: {len(chat_intervals)} interjection(s)")
             else:
                 reporter.log("No chat avatar yet — add one (Sources → Avatars) to swap the picture when chat speaks")
 
-        srt_path = os.path.join(config.project_dir(project), "speech.srt")
+        # The background was fetched at the script's estimated length; a
+        # narration that came out longer gets fresh footage rather than a cut.
+        background, base, name = ctx["background"], ctx["base"], ctx["background_name"]
+        narration = ctx["mixed_duration"]
+        if background is not None and background.duration + 0.05 < narration:
+            reporter.log(f"Background is {background.duration:.0f}s but the narration runs "
+                         f"{narration:.0f}s — fetching a longer one")
+            try:
+                longer = selector.select_background(narration, log=reporter.log)
+            except Exception as exc:
+                reporter.log(f"No longer background ({str(exc)[:80]}); looping this one")
+            else:
+                selector.cleanup(background)
+                background, base, name = longer, None, longer.name
+                reporter.artifact("video", "background", name)
+
+        srt_path = os.path.join(pdir, "speech.srt")
         try:
             video.render_video(
-                project, words, background, mixed, srt_path, s.use_gpu,
+                project, ctx["words"], background, ctx["mixed"], srt_path, s.use_gpu,
                 on_progress=lambda f, m: reporter.progress("video", f if f is not None else reporter.state.stages["video"].progress, m),
-                chat=chat, chat_intervals=chat_intervals,
+                chat=chat, chat_intervals=chat_intervals, duration=narration,
+                base=base,
             )
         finally:
             selector.cleanup(background)  # remove any fetched YouTube segment
+        if name != ctx["background_name"]:   # base.mp4 was styled again from it
+            remember("base", ["base.mp4"], background=name)
         preview = "video_styled.mp4" if os.path.exists(
-            os.path.join(config.project_dir(project), "video_styled.mp4")) else "video_final.mp4"
+            os.path.join(pdir, "video_styled.mp4")) else "video_final.mp4"
+        remember("video", [preview, "video_final.mp4"] if preview != "video_final.mp4" else [preview])
         reporter.artifact("video", "video_url", _artifact_url(project, preview))
         reporter.artifact("video", "final_url", _artifact_url(project, "video_final.mp4"))
-        reporter.done("video", background.name)
-        summary["video"] = os.path.join(config.project_dir(project), "video_final.mp4")
+        reporter.done("video", name)
+        return {"video": final}
+
+    # 6 — PUBLISH ------------------------------------------------------------ #
+    def will_publish(ctx: dict) -> bool:
+        return bool(upload) and youtube.available()
 
-        # 6 — PUBLISH -------------------------------------------------------- #
-        reporter.check_stop()
-        if not upload or not os.path.exists(youtube.CREDENTIALS_PATH):
+    def write_metadata(ctx: dict) -> dict:
+        # Only needs the script, so it is written while the video renders. A
+        # failure is held back and raised by the publish step, where it belongs.
+        post = ctx["post"]
+        try:
+            return {"meta": llm.metadata(ctx["script"], post.subreddit, post.title, post.url)}
+        except Exception as exc:
+            return {"meta": exc}
+
+    def publish(ctx: dict) -> dict:
+        old = saved("publish")
+        earlier = manifest.values("publish")
+        if not old and earlier.get("youtube_url"):
+            # Never upload the same project twice — even when a resume changed
+            # the video or script, which voids the publish checkpoint's key.
+            reporter.log(f"{project} is already on YouTube ({earlier['youtube_url']}); not uploading again")
+            old = earlier
+        if old:
+            reporter.artifact("publish", "youtube_url", old["youtube_url"])
+            reporter.artifact("publish", "scheduled", old["scheduled"])
+            reused("publish", f"scheduled {old['scheduled']}")
+            summary.update(old)
+            return {"youtube": old["youtube_url"]}
+        if not will_publish(ctx):
             reporter.skip("publish", "auto-upload off" if not upload else "no youtube.json")
-        else:
-            reporter.start("publish", "Writing metadata…")
-            title, description, tags = llm.metadata(script, post.subreddit, post.title, post.url)
-            reporter.artifact("publish", "title", title)
-            reporter.progress("publish", 0.25, "Uploading to YouTube…")
-            url, scheduled = youtube.publish(
-                summary["video"], title, description, tags,
-                on_progress=lambda f, m: reporter.progress("publish", 0.25 + f * 0.75, m))
-            reporter.artifact("publish", "youtube_url", url)
-            reporter.artifact("publish", "scheduled", scheduled)
-            reporter.done("publish", f"scheduled {scheduled}")
-            summary.update({"youtube_url": url, "scheduled": scheduled})
-
-        reporter.finish(summary, ok=True)
-        return summary
+            return {"youtube": None}
+        reporter.start("publish", "Writing metadata…")
+        if isinstance(ctx["meta"], Exception):
+            raise ctx["meta"]
+        title, description, tags = ctx["meta"]
+        reporter.artifact("publish", "title", title)
+        reporter.progress("publish", 0.25, "Uploading to YouTube…")
+        url, scheduled = youtube.publish(
+            ctx["video"], title, description, tags,
+            on_progress=lambda f, m: reporter.progress("publish", 0.25 + f * 0.75, m))
+        remember("publish", youtube_url=url, scheduled=scheduled)
+        reporter.artifact("publish", "youtube_url", url)
+        reporter.artifact("publish", "scheduled", scheduled)
+        reporter.done("publish", f"scheduled {scheduled}")
+        summary.update({"youtube_url": url, "scheduled": scheduled})
+        return {"youtube": url}
 
-    except RunCancelled:
-        reporter.log("Run cancelled.", level="error")
-        reporter.finish({"cancelled": True}, ok=False)
-        return {"cancelled": True}
-    except Exception as exc:  # surface on the active stage
-        logs.get("pipeline").exception("run failed")
-        active = next((st.id for st in reporter.state.stages.values()
-                       if st.status.value == "running"), "story")
-        reporter.error(active, str(exc))
-        reporter.finish({"error": str(exc)}, ok=False)
-        return {"error": str(exc)}
+    def step(name: str, fn: graph.StepFn, needs=(), provides=(), slot: Optional[str] = None,
+             when=None) -> graph.Step:
+        """A graph step, optionally holding a shared admission slot (see
+        :mod:`limits`) — unless it is only being restored from a checkpoint.
+        The run's counters, and the provider calls of the step's stage, are
+        published after every step."""
+        work = fn
+        if slot and name not in reuse:
+            def work(ctx: dict):
+                with limits.slot(slot, check_stop=reporter.check_stop, on_wait=reporter.log):
+                    return fn(ctx)
+
+        stage = _STEP_STAGE.get(name, "story")
+
+        def run_step(ctx: dict):
+            metrics.set_stage(stage)
+            try:
+                return work(ctx)
+            finally:
+                reporter.metrics(metrics.snapshot())
+                calls = collector.stage_calls(stage)
+                if calls:
+                    reporter.artifact(stage, "calls", calls)
+        return graph.Step(name, run_step, needs=tuple(needs), provides=tuple(provides), when=when)
+
+    return [
+        step("story", find, provides=("post", "rating"), slot="api"),
+        step("chat", read_chat, ("post",), ("chat",), slot="api"),
+        step("script", write_script, ("post", "chat"), ("raw_script", "script", "voice_stream"),
+             slot="api"),
+        step("voice", record_voice, ("raw_script", "voice_stream"), ("speech", "voice_info"),
+             slot="api"),
+        step("fit", fit, ("speech", "voice_info"), ("duration", "chat_intervals", "scale")),
+        step("music", pick_music, ("script",), ("music",), when=lambda ctx: "mix" not in reuse),
+        step("mix", mix, ("duration", "scale", "music"), ("mixed", "mixed_duration")),
+        step("subtitles", transcribe, ("duration", "scale", "script"), ("words",), slot="api"),
+        step("background", pick_background, ("script",), ("background",),
+             when=lambda ctx: "base" not in reuse),
+        step("base", stylize, ("background", "script"), ("base", "background_name"), slot="render"),
+        step("video", render, ("words", "mixed", "mixed_duration", "base", "background_name",
+                               "background", "chat", "chat_intervals"), ("video",), slot="render"),
+        step("metadata", write_metadata, ("script", "post"), ("meta",), slot="api",
+             when=lambda ctx: will_publish(ctx) and "publish" not in reuse),
+        step("publish", publish, ("video", "meta"), ("youtube",), slot="api"),
+    ]
 
 
 def _find_story(reporter: ProgressReporter, mode: str = "story"):
-    """Pull and rate posts (drama or news) until one clears the bar."""
+    """Pull and rate posts (drama or news) until one clears the bar.
+
+    Each round draws ``story_batch`` candidates, each from its own random
+    subreddit (fetched side by side — the listings are mostly cached), and
+    scores them all in one :func:`llm.rate_stories` request.  The best one that
+    clears ``min_story_rating`` wins; the others that cleared it are released
+    for later runs and the rest are marked bad.
+    """
     s = config.settings
     exclude = reddit_source.seen_ids()
+    lock = threading.Lock()
     best = None
-    for attempt in range(1, s.max_story_attempts + 1):
-        reporter.check_stop()
+    attempts = 0
+    batch = max(1, s.story_batch)
+    held: Set[str] = set()   # claimed here; all but the winner are given back at the end
+
+    def candidate():
         if mode == "news":
             sub = reddit_source.random_news_subreddit()
             post = reddit_source.random_news_post(sub, exclude=exclude)
@@ -205,16 +620,47 @@ def _find_story(reporter: ProgressReporter, mode: str = "story"):
             sub = reddit_source.random_subreddit()
             post = reddit_source.random_post(sub, exclude=exclude)
         if post is None:
-            continue
-        exclude.add(post.id)
-        rating = llm.rate_story(f"{post.title}\n{post.text}")
-        reporter.progress("story", min(0.4, attempt / s.max_story_attempts * 0.4),
-                          f"r/{sub} scored {rating}/10 (try {attempt})")
-        if rating >= s.min_story_rating:
-            return post, rating
-        reddit_source.mark_bad(post.id)
-        if best is None or rating > best[1]:
-            best = (post, rating)
-    if best is not None:
-        return best  # take the best we saw rather than failing the run
-    raise RuntimeError(f"No usable story after {s.max_story_attempts} attempts.")
+            return None
+        with lock:
+            if post.id in exclude:
+                return None   # a sibling in this round drew the same post
+            exclude.add(post.id)
+        if not reddit_source.claim(post.id):
+            return None   # another run in this process already took it
+        with lock:
+            held.add(post.id)
+        return post
+
+    try:
+        with ThreadPoolExecutor(max_workers=batch, thread_name_prefix="k100dra-fetch") as pool:
+            while attempts < s.max_story_attempts:
+                reporter.check_stop()
+                size = min(batch, s.max_story_attempts - attempts)
+                futures = [pool.submit(contextvars.copy_context().run, candidate) for _ in range(size)]
+                posts = [p for p in (f.result() for f in futures) if p is not None]
+                attempts += size
+                if not posts:
+                    continue
+                reporter.check_stop()
+                scores = llm.rate_stories([(p.id, f"{p.title}\n{p.text}") for p in posts])
+                ranked = sorted(posts, key=lambda p: scores[p.id], reverse=True)
+                top, rating = ranked[0], scores[ranked[0].id]
+                reporter.progress("story", min(0.4, attempts / s.max_story_attempts * 0.4),
+                                  f"Rated {len(posts)} posts, best r/{top.subreddit} {rating}/10 (try {attempts})")
+                winner = rating >= s.min_story_rating
+                for post in ranked[1:] if winner else ranked:
+                    if scores[post.id] >= s.min_story_rating:
+                        reddit_source.release(post.id)
+                    else:
+                        reddit_source.mark_bad(post.id)
+                if winner:
+                    held.discard(top.id)   # stays claimed until find() marks it used
+                    return top, rating
+                if best is None or rating > best[1]:
+                    best = (top, rating)
+        if best is not None:
+            return best  # take the best we saw rather than failing the run
+        raise RuntimeError(f"No usable story after {s.max_story_attempts} attempts.")
+    finally:
+        for post_id in held:   # judged ones are released already; this covers a stop mid-round
+            reddit_source.release(post_id)
@@ -0,0 +1,172 @@
+"""Async provider layer for the text models.
+
+One background thread runs an asyncio event loop that owns an ``AsyncOpenAI``
+and an ``AsyncAnthropic`` client.  Each client keeps a pool of keep-alive
+connections, and a per-provider semaphore caps how many requests are in flight
+across every run in the process (``openai_concurrency`` /
+``anthropic_concurrency``).  Sync code — the pipeline steps, the studio — calls
+:func:`run`, which schedules a coroutine on that loop and waits for it; several
+calls can be fanned out at once with :func:`run_all` instead of a thread each.
+
+Coroutines run with a copy of the caller's ``contextvars`` context, so per-run
+logging and metrics still see the run that made the call.  Callbacks the caller
+hands in (streamed tokens) never run on the loop: the coroutine posts to a
+:class:`Relay` and :func:`run` calls them on the waiting thread, so a slow
+callback holds up its own run only.  SDKs are imported lazily.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from . import config
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+_clients: Dict[str, Any] = {}
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever,
+                                            name="k100dra-providers", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+_FINISHED = object()
+
+
+class Relay:
+    """A callback for code on the provider loop that only queues its calls;
+    :func:`run` makes them, in order, on the thread waiting for the result."""
+
+    def __init__(self, fn: Callable[..., Any]) -> None:
+        self.fn = fn
+        self.inbox: queue.SimpleQueue = queue.SimpleQueue()
+
+    def __call__(self, *args: Any) -> None:
+        self.inbox.put((self.fn, args))
+
+    def bind(self, fn: Callable[..., Any]) -> Callable[..., None]:
+        """Relay ``fn`` too, in order with this relay's own calls."""
+        return lambda *args: self.inbox.put((fn, args))
+
+
+def run(coro: Awaitable[Any], relay: Optional[Relay] = None) -> Any:
+    """Run ``coro`` on the provider loop and wait for its result, meanwhile
+    making the calls it posts to ``relay``.  An exception from the callback
+    cancels the coroutine and is raised here."""
+    if threading.current_thread() is _loop_thread:
+        raise RuntimeError("providers.run() called from the provider loop; await instead")
+    loop = _get_loop()
+    ctx = contextvars.copy_context()
+    done: concurrent.futures.Future = concurrent.futures.Future()
+    tasks: List[asyncio.Task] = []
+
+    def start() -> None:
+        task = ctx.run(loop.create_task, coro)   # the task inherits the caller's context
+        tasks.append(task)
+
+        def finish(t: asyncio.Task) -> None:
+            if t.cancelled():
+                done.cancel()
+            elif t.exception() is not None:
+                done.set_exception(t.exception())
+            else:
+                done.set_result(t.result())
+            if relay is not None:
+                relay.inbox.put(_FINISHED)
+
+        task.add_done_callback(finish)
+
+    loop.call_soon_threadsafe(start)
+    if relay is None:
+        return done.result()
+    error: Optional[BaseException] = None
+    while True:
+        item = relay.inbox.get()
+        if item is _FINISHED:
+            break
+        if error is None:
+            fn, args = item
+            try:
+                fn(*args)
+            except BaseException as exc:   # ours, not the provider's: stop the request
+                error = exc
+                loop.call_soon_threadsafe(lambda: [t.cancel() for t in tasks])
+    if error is not None:
+        raise error
+    return done.result()
+
+
+def run_all(coros: Iterable[Awaitable[Any]]) -> List[Any]:
+    """Run several coroutines concurrently; results in order, exceptions as values."""
+    async def gather() -> List[Any]:
+        return await asyncio.gather(*coros, return_exceptions=True)
+    return run(gather())
+
+
+# --------------------------------------------------------------------------- #
+# Clients (created on, and only used from, the provider loop)
+# --------------------------------------------------------------------------- #
+def _limit(provider: str) -> int:
+    s = config.settings
+    value = s.anthropic_concurrency if provider == "anthropic" else s.openai_concurrency
+    return max(1, int(value or 1))
+
+
+def semaphore(provider: str) -> asyncio.Semaphore:
+    """The in-flight request cap for ``provider`` (call from the loop)."""
+    if provider not in _semaphores:
+        _semaphores[provider] = asyncio.Semaphore(_limit(provider))
+    return _semaphores[provider]
+
+
+def _http_client(sdk, provider: str):
+    """A keep-alive pool sized to the provider's concurrency (SDK default if
+    the installed SDK predates ``DefaultAsyncHttpxClient``)."""
+    factory = getattr(sdk, "DefaultAsyncHttpxClient", None)
+    if factory is None:
+        return None
+    import httpx  # installed with either SDK
+    size = _limit(provider)
+    return factory(limits=httpx.Limits(max_connections=size, max_keepalive_connections=size,
+                                       keepalive_expiry=60.0))
+
+
+def openai_client():
+    if "openai" not in _clients:
+        import openai  # lazy
+        if not config.settings.openai_key:
+            raise RuntimeError("KEY_OPENAI is not set — cannot reach OpenAI.")
+        kwargs = {"api_key": config.settings.openai_key, "base_url": config.settings.openai_base_url}
+        http = _http_client(openai, "openai")
+        if http is not None:
+            kwargs["http_client"] = http
+        _clients["openai"] = openai.AsyncOpenAI(**kwargs)
+    return _clients["openai"]
+
+
+def anthropic_client():
+    if "anthropic" not in _clients:
+        import anthropic  # lazy
+        if not config.settings.anthropic_key:
+            raise RuntimeError("ANTHROPIC_API_KEY is not set — cannot reach Anthropic.")
+        kwargs = {"api_key": config.settings.anthropic_key}
+        http = _http_client(anthropic, "anthropic")
+        if http is not None:
+            kwargs["http_client"] = http
+        _clients["anthropic"] = anthropic.AsyncAnthropic(**kwargs)
+    return _clients["anthropic"]
@@ -6,12 +6,15 @@ rejected) so the channel never repeats itself.  ``praw`` is imported lazily.
 
 from __future__ import annotations
 
+import json
 import os
 import random
+import threading
+import time
 from dataclasses import dataclass
-from typing import List, Optional, Set
+from typing import Dict, List, Optional, Set
 
-from . import config
+from . import config, seen
 
 # High-investment, high-drama storytelling subs. The whole point is stories
 # people get invested in — betrayal, scandal, revenge, secrets, "who's right".
@@ -40,10 +43,16 @@ def _client():
         s = config.settings
         if not (s.reddit_client_id and s.reddit_client_secret):
             raise RuntimeError("Reddit credentials are not configured.")
+        endpoints = {}
+        if s.reddit_base_url:   # e.g. the offline stand-in (see standin.py)
+            base = s.reddit_base_url.rstrip("/")
+            endpoints = {"oauth_url": base, "reddit_url": base, "short_url": base,
+                         "check_for_updates": False}
         _reddit = praw.Reddit(
             client_id=s.reddit_client_id,
             client_secret=s.reddit_client_secret,
             user_agent=s.reddit_user_agent or "K100DRA",
+            **endpoints,
         )
     return _reddit
 
@@ -59,43 +68,154 @@ class Post:
 
 
 # --- usage memory ---------------------------------------------------------- #
-def _read_ids(path: str) -> Set[str]:
-    if not os.path.exists(path):
-        return set()
-    with open(path, "r", encoding="utf-8") as fh:
-        return {line.strip() for line in fh if line.strip()}
+def seen_ids() -> seen.Exclusion:
+    """Used + rejected posts (see :mod:`k100dra.seen`), as a set-like a search
+    can add its own draws to."""
+    index = seen.index()
+    index.refresh()   # pick up ids another process appended
+    return seen.Exclusion(index)
 
 
-def seen_ids() -> Set[str]:
-    return _read_ids(config.LINKS_FILE) | _read_ids(config.BAD_LINKS_FILE)
+_claimed: Set[str] = set()
+_claim_lock = threading.Lock()
+
+
+def claim(post_id: str) -> bool:
+    """Reserve a post for this process; False if a concurrent run already has it."""
+    with _claim_lock:
+        if post_id in _claimed:
+            return False
+        _claimed.add(post_id)
+        return True
+
+
+def release(post_id: str) -> None:
+    """Give back a claimed post that was never judged (e.g. a cancelled rating)."""
+    with _claim_lock:
+        _claimed.discard(post_id)
 
 
 def mark_used(post_id: str) -> None:
-    with open(config.LINKS_FILE, "a", encoding="utf-8") as fh:
-        fh.write(f"{post_id}\n")
+    _judge(config.LINKS_FILE, post_id)
 
 
 def mark_bad(post_id: str) -> None:
-    with open(config.BAD_LINKS_FILE, "a", encoding="utf-8") as fh:
-        fh.write(f"{post_id}\n")
+    _judge(config.BAD_LINKS_FILE, post_id)
+
+
+def _judge(path: str, post_id: str) -> None:
+    # Under the claim lock, so no claim() sees the post unclaimed before it is
+    # in the index; from then on every search skips it and the claim can go.
+    with _claim_lock:
+        seen.index().append(path, post_id)
+        _claimed.discard(post_id)
+
+
+# --- listing cache --------------------------------------------------------- #
+# ``subreddit.hot()`` is the same list for minutes at a time, so each listing is
+# kept (in memory and in its own file under ``cache/reddit``) for its
+# subreddit's TTL (:func:`listing_ttl`) and shared by every attempt and every
+# run; storing one listing rewrites only that file.  Once an entry is past
+# ``reddit_refresh_ahead`` of its TTL, a background refresh replaces it while the
+# cached copy keeps serving, so a search rarely waits on praw at all.
+_listings: Dict[str, Optional[dict]] = {}
+_listing_lock = threading.Lock()
+_refreshing: Set[str] = set()
+
+
+def listing_ttl(subreddit_name: str) -> float:
+    """How long (seconds) a hot listing of ``subreddit_name`` stays fresh."""
+    s = config.settings
+    return s.reddit_listing_ttls.get(subreddit_name.lower(), s.reddit_listing_ttl)
+
+
+def _listing_path(key: str) -> str:
+    return os.path.join(config.REDDIT_CACHE_DIR, key.replace(":", "-") + ".json")
+
+
+def _load_listing(key: str) -> Optional[dict]:
+    """The cached entry for ``key`` (call with ``_listing_lock`` held)."""
+    if key not in _listings:
+        try:
+            with open(_listing_path(key), "r", encoding="utf-8") as fh:
+                _listings[key] = json.load(fh)
+        except Exception:
+            _listings[key] = None
+    return _listings[key]
+
+
+def _fetch_listing(subreddit_name: str, limit: int) -> List[dict]:
+    """The hot posts we could ever use, as plain dicts (no NSFW / stickied)."""
+    subreddit = _client().subreddit(subreddit_name)
+    return [
+        {"id": p.id, "title": p.title, "selftext": getattr(p, "selftext", "") or "",
+         "permalink": p.permalink, "url": getattr(p, "url", "") or ""}
+        for p in subreddit.hot(limit=limit) if not p.over_18 and not p.stickied
+    ]
+
+
+def _store_listing(key: str, posts: List[dict]) -> None:
+    entry = {"at": time.time(), "posts": posts}
+    path = _listing_path(key)
+    with _listing_lock:
+        _listings[key] = entry
+        try:
+            os.makedirs(config.REDDIT_CACHE_DIR, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as fh:
+                json.dump(entry, fh)
+            os.replace(path + ".tmp", path)
+        except Exception:
+            pass
+
+
+def _refresh_in_background(key: str, subreddit_name: str, limit: int) -> None:
+    with _listing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def work() -> None:
+        try:
+            _store_listing(key, _fetch_listing(subreddit_name, limit))
+        except Exception:
+            pass   # keep serving the cached copy; the TTL forces a real fetch
+        finally:
+            with _listing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=work, name=f"k100dra-reddit-{subreddit_name}", daemon=True).start()
+
+
+def hot_listing(subreddit_name: str, limit: int) -> List[dict]:
+    """A subreddit's hot listing, from the cache when it is fresh enough."""
+    ttl = listing_ttl(subreddit_name)
+    key = f"{subreddit_name.lower()}:{limit}"
+    with _listing_lock:
+        entry = _load_listing(key)
+    age = time.time() - entry["at"] if entry else None
+    if entry is None or age >= ttl:
+        posts = _fetch_listing(subreddit_name, limit)
+        _store_listing(key, posts)
+        return posts
+    if age >= ttl * config.settings.reddit_refresh_ahead:
+        _refresh_in_background(key, subreddit_name, limit)
+    return entry["posts"]
 
 
 # --- fetching -------------------------------------------------------------- #
 def random_post(subreddit_name: str, exclude: Optional[Set[str]] = None) -> Optional[Post]:
     exclude = exclude or set()
-    subreddit = _client().subreddit(subreddit_name)
-    posts = [p for p in subreddit.hot(limit=100)
-             if p.id not in exclude and getattr(p, "selftext", "").strip()
-             and not p.over_18 and not p.stickied]
+    posts = [p for p in hot_listing(subreddit_name, 100)
+             if p["id"] not in exclude and p["selftext"].strip()]
     if not posts:
         return None
     chosen = random.choice(posts)
     return Post(
-        id=chosen.id,
+        id=chosen["id"],
         subreddit=subreddit_name,
-        title=chosen.title,
-        text=chosen.selftext,
-        url=f"https://www.reddit.com{chosen.permalink}",
+        title=chosen["title"],
+        text=chosen["selftext"],
+        url=f"https://www.reddit.com{chosen['permalink']}",
     )
 
 
@@ -110,15 +230,15 @@ def random_news_subreddit() -> str:
 def random_news_post(subreddit_name: str, exclude: Optional[Set[str]] = None) -> Optional[Post]:
     """A current news post (link post) + its top comments as context/public takes."""
     exclude = exclude or set()
-    subreddit = _client().subreddit(subreddit_name)
-    posts = [p for p in subreddit.hot(limit=75)
-             if p.id not in exclude and not p.over_18 and not p.stickied]
+    posts = [p for p in hot_listing(subreddit_name, 75) if p["id"] not in exclude]
     if not posts:
         return None
-    chosen = random.choice(posts)
+    picked = random.choice(posts)
 
     comments = []
     try:
+        # Comments change by the minute, so they are always fetched live.
+        chosen = _client().submission(id=picked["id"])
         chosen.comment_sort = "top"
         chosen.comments.replace_more(limit=0)
         for c in chosen.comments:
@@ -131,6 +251,6 @@ def random_news_post(subreddit_name: str, exclude: Optional[Set[str]] = None) ->
         pass
 
     text = "\n".join(f"- {c}" for c in comments)
-    url = getattr(chosen, "url", "") or f"https://www.reddit.com{chosen.permalink}"
-    return Post(id=chosen.id, subreddit=subreddit_name, title=chosen.title,
+    url = picked["url"] or f"https://www.reddit.com{picked['permalink']}"
+    return Post(id=picked["id"], subreddit=subreddit_name, title=picked["title"],
                 text=text, url=url, kind="news")
@@ -0,0 +1,180 @@
+"""A compact index of the Reddit posts the channel has already used or rejected.
+
+``links.txt`` and ``bad_links.txt`` stay the exact, human-readable record (one
+post id per line, append-only).  Re-parsing them into Python sets on every story
+search gets slow once they hold tens of thousands of ids, so this module keeps:
+
+* a sorted ``array`` of the ids as base-36 integers (8 bytes each, bisect
+  lookups), persisted in ``seen_index.bin`` together with how far into each text
+  file it has read;
+* a small set of ids added since the last compaction.
+
+The index loads once per process, only reads the text files' new tails (lines a
+``mark_used``/``mark_bad`` — or another process — appended), and folds the
+recent ids into the sorted array every ``COMPACT_EVERY`` additions.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Set
+
+from . import config
+
+COMPACT_EVERY = 256
+_MAX_ID = 1 << 64
+
+
+def _as_int(post_id: str) -> Optional[int]:
+    try:
+        value = int(post_id, 36)
+    except ValueError:
+        return None
+    return value if 0 <= value < _MAX_ID else None
+
+
+class SeenIndex:
+    """Every id in ``files``; thread-safe (updates and lookups share one lock)."""
+
+    def __init__(self, files: Iterable[str], path: str) -> None:
+        self.files = list(files)
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids = array("Q")
+        self._recent: Set[int] = set()
+        self._odd: Set[str] = set()      # ids that are not base-36 numbers
+        self._offsets: Dict[str, int] = {}
+        self._load()
+
+    # --- persistence -------------------------------------------------------- #
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as fh:
+                header = json.loads(fh.readline())
+                ids = array("Q")
+                ids.frombytes(fh.read(header["count"] * ids.itemsize))
+            if header.get("byteorder") != sys.byteorder or len(ids) != header["count"]:
+                raise ValueError("stale index")
+            self._ids = ids
+            self._odd = set(header.get("odd", []))
+            self._offsets = {k: int(v) for k, v in header.get("offsets", {}).items()}
+        except Exception:
+            self._ids, self._odd, self._offsets = array("Q"), set(), {}
+        self.refresh()
+
+    def _save(self) -> None:
+        header = {"count": len(self._ids), "byteorder": sys.byteorder,
+                  "odd": sorted(self._odd), "offsets": self._offsets}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                fh.write(json.dumps(header).encode("utf-8") + b"\n")
+                self._ids.tofile(fh)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+    # --- updates ------------------------------------------------------------ #
+    def refresh(self) -> None:
+        """Read whatever was appended to the text files since last time."""
+        with self._lock:
+            for path in self.files:
+                name = os.path.basename(path)
+                offset = self._offsets.get(name, 0)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                if size < offset:   # the file was rewritten: start over
+                    self._ids, self._recent, self._odd, self._offsets = array("Q"), set(), set(), {}
+                    return self.refresh()
+                if size == offset:
+                    continue
+                with open(path, "rb") as fh:
+                    fh.seek(offset)
+                    tail = fh.read()
+                # Only consume whole lines; a half-written one is read next time.
+                end = tail.rfind(b"\n") + 1
+                for line in tail[:end].decode("utf-8", "ignore").splitlines():
+                    self._remember(line.strip())
+                self._offsets[name] = offset + end
+            if len(self._recent) >= COMPACT_EVERY:
+                self.compact()
+
+    def _remember(self, post_id: str) -> None:
+        if not post_id or post_id in self:
+            return
+        value = _as_int(post_id)
+        if value is None:
+            self._odd.add(post_id)
+        else:
+            self._recent.add(value)
+
+    def append(self, path: str, post_id: str) -> None:
+        """Record ``post_id`` in the text file ``path`` and in the index."""
+        with self._lock:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(f"{post_id}\n")
+            self.refresh()
+
+    def compact(self) -> None:
+        """Fold the recent ids into the sorted array and persist it."""
+        with self._lock:
+            if self._recent:
+                merged = sorted(set(self._ids).union(self._recent))
+                self._ids = array("Q", merged)
+                self._recent = set()
+            self._save()
+
+    # --- lookups ------------------------------------------------------------ #
+    def __contains__(self, post_id: object) -> bool:
+        if not isinstance(post_id, str):
+            return False
+        value = _as_int(post_id)
+        with self._lock:   # not halfway through a refresh or compaction
+            if value is None:
+                return post_id in self._odd
+            if value in self._recent:
+                return True
+            i = bisect_left(self._ids, value)
+            return i < len(self._ids) and self._ids[i] == value
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids) + len(self._recent) + len(self._odd)
+
+
+class Exclusion:
+    """What one story search must skip: the shared index plus the posts this
+    search has already drawn (kept locally so searches don't leak into each other)."""
+
+    def __init__(self, index: SeenIndex) -> None:
+        self.index = index
+        self.local: Set[str] = set()
+
+    def add(self, post_id: str) -> None:
+        self.local.add(post_id)
+
+    def __contains__(self, post_id: object) -> bool:
+        return post_id in self.local or post_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index) + len(self.local)
+
+
+_index: Optional[SeenIndex] = None
+_index_lock = threading.Lock()
+
+
+def index() -> SeenIndex:
+    """The process-wide index over ``links.txt`` + ``bad_links.txt``."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SeenIndex([config.LINKS_FILE, config.BAD_LINKS_FILE], config.SEEN_INDEX_FILE)
+        return _index
@@ -14,6 +14,7 @@ from __future__ import annotations
 import json
 import os
 import random
+import threading
 import time
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
@@ -60,6 +61,21 @@ def _save_usage(data: Dict) -> None:
         pass
 
 
+_usage_lock = threading.Lock()
+
+
+def _update_usage(apply) -> None:
+    """Re-read, modify and save the usage memory under a lock.
+
+    Music and backgrounds are picked concurrently, so every writer re-reads the
+    file right before saving instead of overwriting it with a stale copy.
+    """
+    with _usage_lock:
+        data = _load_usage()
+        apply(data)
+        _save_usage(data)
+
+
 def _list_media(folder: str, exts) -> List[str]:
     if not os.path.isdir(folder):
         return []
@@ -154,11 +170,14 @@ def _select_youtube(duration: float, links: List[str], log=None) -> Background:
                 log(f"Fetching {clip:.0f}s background from YouTube ({vid}) @ {start:.0f}s")
             path = youtube_bg.fetch_segment(url, start, clip)
 
-            used.append([start, start + clip])
-            s.update({"segments": used[-12:], "times_used": s.get("times_used", 0) + 1,
-                      "last_used": time.time()})
-            usage["last_video"] = url
-            _save_usage(usage)
+            def record(data: Dict, url=url, total=total, seg=[start, start + clip]) -> None:
+                st = data.setdefault("files", {}).setdefault(url, {})
+                used = st.get("segments", []) + [seg]
+                st.update({"segments": used[-12:], "times_used": st.get("times_used", 0) + 1,
+                           "last_used": time.time(), "duration": total})
+                data["last_video"] = url
+
+            _update_usage(record)
             return Background(path=path, start=0.0, duration=clip, name=vid, temporary=True)
         except Exception as exc:
             last_exc = exc
@@ -199,15 +218,22 @@ def _select_local(duration: float) -> Background:
     start = _pick_segment(total, clip, used_segments)
 
     # Record usage.
-    used_segments.append([start, start + clip])
-    file_stats[name].update({
-        "segments": used_segments[-12:],  # keep memory bounded
-        "times_used": file_stats[name].get("times_used", 0) + 1,
-        "last_used": time.time(),
-        "duration": total,
-    })
-    usage["last_video"] = name
-    _save_usage(usage)
+    def record(data: Dict) -> None:
+        stats = data.setdefault("files", {})
+        for other in files:   # keep the probed durations so we don't re-probe
+            if file_stats.get(other, {}).get("duration"):
+                stats.setdefault(other, {}).setdefault("duration", file_stats[other]["duration"])
+        st = stats.setdefault(name, {})
+        used = st.get("segments", []) + [[start, start + clip]]
+        st.update({
+            "segments": used[-12:],  # keep memory bounded
+            "times_used": st.get("times_used", 0) + 1,
+            "last_used": time.time(),
+            "duration": total,
+        })
+        data["last_video"] = name
+
+    _update_usage(record)
 
     return Background(path=full, start=start, duration=clip, name=name)
 
@@ -254,8 +280,7 @@ def _select_music_local() -> Optional[Music]:
     last = usage.get("last_music")
     choices = [f for f in files if f != last] or files
     chosen = random.choice(choices)
-    usage["last_music"] = chosen
-    _save_usage(usage)
+    _update_usage(lambda data: data.update(last_music=chosen))
     return Music(path=os.path.join(config.MUSICS_DIR, chosen), name=chosen)
 
 
@@ -285,12 +310,14 @@ def _select_music_youtube(duration: float, links: List[str], log=None) -> Music:
             if log:
                 log(f"Fetching music from YouTube ({vid}) @ {start:.0f}s")
             path = youtube_bg.fetch_audio(url, start, clip)
-            seg = s.get("segments", [])
-            seg.append([start, start + clip])
-            s.update({"segments": seg[-12:], "times_used": s.get("times_used", 0) + 1,
-                      "last_used": time.time()})
-            usage["last_music_link"] = url
-            _save_usage(usage)
+            def record(data: Dict, url=url, total=total, seg=[start, start + clip]) -> None:
+                st = data.setdefault("music", {}).setdefault(url, {})
+                used = st.get("segments", []) + [seg]
+                st.update({"segments": used[-12:], "times_used": st.get("times_used", 0) + 1,
+                           "last_used": time.time(), "duration": total})
+                data["last_music_link"] = url
+
+            _update_usage(record)
             return Music(path=path, name=vid, temporary=True)
         except Exception as exc:
             last_exc = exc
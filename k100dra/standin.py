@@ -0,0 +1,475 @@
+"""Local stand-ins for the remote APIs, for offline end-to-end runs.
+
+One threaded HTTP server (standard library only) answers every call the real
+pipeline makes, at the same paths as the real services:
+
+* OpenAI — ``/v1/chat/completions`` (plain and streamed), ``/v1/audio/speech``
+  and ``/v1/audio/transcriptions``;
+* ElevenLabs — ``/v1/voices`` and ``/v1/text-to-speech/<voice>/stream``;
+* Reddit, as praw asks for it — ``/api/v1/access_token``, ``/r/<sub>/hot`` and
+  ``/comments/<id>``;
+* YouTube — the resumable upload (``/upload/youtube/v3/videos``).
+
+Replies are deterministic: text is derived from a hash of the request, audio is
+silent MP3 sized to the text (:func:`mp3.silence`).  Every service can be slowed
+down (``latency`` before the reply, ``token_delay`` between streamed pieces) or
+made to fail (``error_rate`` of 500s and 429s), so :func:`pipeline.run` can be
+benchmarked and load-tested on a machine with no network access::
+
+    python -m k100dra.standin --port 8765 --latency 0.3 --error-rate 0.02
+    python main.py --standin -n 3 --no-upload   # in-process, config pointed at it
+
+Background footage and music still come from ``videos/`` and ``musics/``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from dataclasses import dataclass, replace
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from . import config, mp3
+
+SERVICES = ("openai", "elevenlabs", "reddit", "youtube")
+CHARS_PER_SECOND = 15.0   # how fast the stand-in voices "speak"
+
+_WORDS = ("so", "okay", "listen", "this", "is", "where", "it", "gets", "wild", "he", "she",
+          "told", "me", "never", "again", "the", "whole", "family", "found", "out", "and",
+          "then", "everyone", "stopped", "talking", "honestly", "I", "can't", "believe", "that",
+          "happened", "at", "dinner", "last", "week", "right", "before", "wedding")
+
+
+@dataclass
+class Faults:
+    """How a service misbehaves: seconds before replying (± ``jitter`` of it),
+    seconds between streamed pieces, and the share of requests that fail."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    token_delay: float = 0.0
+    error_rate: float = 0.0
+
+
+def _digest(*parts) -> int:
+    raw = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(raw).digest()[:8], "big")
+
+
+def _sentence(seed: int, words: int) -> str:
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[:1].upper() + text[1:] + "."
+
+
+# --------------------------------------------------------------------------- #
+# Canned replies
+# --------------------------------------------------------------------------- #
+def chat_reply(system: str, user: str, max_tokens: int) -> str:
+    """A reply in the shape the calling task parses (see :mod:`llm`)."""
+    seed = _digest(system, user)
+    ids = re.findall(r"^###\s*(\S+)", user, re.M)
+    if ids:                                           # batch rating
+        return "\n".join(f"{pid}: {6 + _digest(pid) % 5}" for pid in ids)
+    if user.startswith("SRT:"):                       # subtitle fix: keep it as is
+        return user[4:].split("\n\nREFERENCE SCRIPT:", 1)[0].strip()
+    if max_tokens <= 16:                              # single rating
+        return str(6 + seed % 5)
+    if "<!>" in system:                               # upload metadata
+        return (f"{_sentence(seed, 6)[:-1]} <!> {_sentence(seed + 1, 24)} <!> "
+                "story time, reddit, drama, storytime")
+    if "username: message" in system:                 # live chat
+        return "\n".join(f"user{(seed + i) % 997}: {_sentence(seed + i, 4)}" for i in range(12))
+    sentences = [_sentence(seed + i, 8 + (seed + i) % 9) for i in range(14)]   # a script
+    if "{chat:" in system:
+        sentences.insert(5, "{chat: " + _sentence(seed, 4) + "}")
+        sentences.insert(11, "{chat: " + _sentence(seed + 7, 3) + "}")
+    return " ".join(sentences)
+
+
+def speech(text: str, pcm_rate: Optional[int] = None) -> bytes:
+    """Silence as long as ``text`` takes to read: MP3, or raw 16-bit mono PCM
+    at ``pcm_rate`` when the client asked for PCM."""
+    seconds = max(0.5, len(text) / CHARS_PER_SECOND)
+    if pcm_rate:
+        return bytes(2 * int(seconds * pcm_rate))
+    return mp3.silence(seconds)
+
+
+def _audio_seconds(audio: bytes) -> float:
+    if audio[:4] == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(audio), "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError):
+            pass
+    return mp3.duration(audio) or len(audio) / 16000.0
+
+
+def transcript(seconds: float) -> dict:
+    """Whisper's verbose_json with word timings for ``seconds`` of audio."""
+    count = max(1, int(seconds * 2.5))
+    text = _sentence(int(seconds * 1000), count)
+    step = seconds / count
+    words = [{"word": w.strip(".,"), "start": round(i * step, 3), "end": round((i + 0.8) * step, 3)}
+             for i, w in enumerate(text.split())]
+    return {"task": "transcribe", "language": "english", "duration": round(seconds, 3),
+            "text": text, "words": words, "segments": []}
+
+
+def listing(subreddit: str, limit: int) -> dict:
+    children = []
+    for i in range(min(limit, 40)):
+        seed = _digest(subreddit, i)
+        pid = format(seed % 36 ** 6, "x")[:7]
+        body = " ".join(_sentence(seed + k, 12) for k in range(10))
+        children.append({"kind": "t3", "data": {
+            "id": pid, "name": f"t3_{pid}", "title": _sentence(seed, 9)[:-1],
+            "selftext": body, "permalink": f"/r/{subreddit}/comments/{pid}/standin/",
+            "url": f"https://www.reddit.com/r/{subreddit}/comments/{pid}/standin/",
+            "subreddit": subreddit, "author": f"user{seed % 997}", "over_18": False,
+            "stickied": False, "created_utc": 1.7e9, "score": seed % 5000, "num_comments": 8,
+        }})
+    return {"kind": "Listing", "data": {"children": children, "after": None, "before": None}}
+
+
+def comments(post_id: str) -> list:
+    post = {"kind": "t3", "data": {"id": post_id, "name": f"t3_{post_id}", "title": "stand-in",
+                                   "selftext": "", "over_18": False, "stickied": False}}
+    replies = [{"kind": "t1", "data": {"id": f"c{post_id}{i}", "name": f"t1_c{post_id}{i}",
+                                       "body": _sentence(_digest(post_id, i), 14), "replies": "",
+                                       "author": f"user{i}", "parent_id": f"t3_{post_id}"}}
+               for i in range(8)]
+    return [{"kind": "Listing", "data": {"children": [post]}},
+            {"kind": "Listing", "data": {"children": replies}}]
+
+
+# --------------------------------------------------------------------------- #
+# Server
+# --------------------------------------------------------------------------- #
+class StandIn(ThreadingHTTPServer):
+    """The stand-in server; ``faults`` maps a service name to its :class:`Faults`."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 faults: Optional[Dict[str, Faults]] = None, seed: int = 0) -> None:
+        super().__init__((host, port), _Handler)
+        self.faults = {name: Faults() for name in SERVICES}
+        self.faults.update(faults or {})
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads: Dict[str, dict] = {}
+        self.hits: Dict[str, int] = {name: 0 for name in SERVICES}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandIn":
+        threading.Thread(target=self.serve_forever, name="k100dra-standin", daemon=True).start()
+        return self
+
+    def roll(self, service: str) -> tuple:
+        """(seconds to wait, HTTP error or None) for one request."""
+        f = self.faults[service]
+        with self.lock:
+            self.hits[service] += 1
+            wait = f.latency * (1 + f.jitter * (2 * self.rng.random() - 1))
+            error = None
+            if self.rng.random() < f.error_rate:
+                error = self.rng.choice((500, 429))
+        return max(0.0, wait), error
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandIn
+
+    def log_message(self, *args) -> None:   # quiet
+        pass
+
+    # --- plumbing ----------------------------------------------------------- #
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status: int, body: bytes = b"", ctype: str = "application/json",
+              headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, status: int = 200, headers: Optional[dict] = None) -> None:
+        self._send(status, json.dumps(data).encode("utf-8"), headers=headers)
+
+    def _stream(self, pieces, ctype: str, delay: float) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in pieces:
+            if delay:
+                time.sleep(delay)
+            self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _enter(self, service: str) -> bool:
+        """Apply the service's faults; False if this request was failed."""
+        wait, error = self.server.roll(service)
+        if wait:
+            time.sleep(wait)
+        if error is not None:
+            self._json({"error": {"message": f"stand-in injected {error}", "type": "standin"}},
+                       status=error, headers={"Retry-After": "1"} if error == 429 else None)
+            return False
+        return True
+
+    # --- routing ------------------------------------------------------------ #
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        m = re.fullmatch(r"/r/([^/]+)/hot(?:\.json)?", path)
+        if m:
+            if self._enter("reddit"):
+                self._json(listing(m.group(1), int(query.get("limit", 25))))
+            return
+        m = re.fullmatch(r"/comments/([^/]+)(?:/.*)?", path)
+        if m:
+            if self._enter("reddit"):
+                self._json(comments(m.group(1)))
+            return
+        if path == "/v1/voices":
+            if self._enter("elevenlabs"):
+                self._json({"voices": [{"voice_id": "standin-k", "name": "Stand-in", "category": "premade"},
+                                       {"voice_id": "standin-chat", "name": "Stand-in chat",
+                                        "category": "premade"}]})
+            return
+        self._json({"error": f"no stand-in for GET {path}"}, status=404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        if path == "/v1/chat/completions":
+            return self._chat(json.loads(self._body() or b"{}"))
+        if path == "/v1/audio/speech":
+            data = json.loads(self._body() or b"{}")
+            if self._enter("openai"):
+                if data.get("response_format") == "pcm":
+                    self._send(200, speech(data.get("input", ""), 24000), ctype="audio/pcm")
+                else:
+                    self._send(200, speech(data.get("input", "")), ctype="audio/mpeg")
+            return
+        if path == "/v1/audio/transcriptions":
+            return self._transcribe()
+        m = re.fullmatch(r"/v1/text-to-speech/([^/]+)/stream", path)
+        if m:
+            data = json.loads(self._body() or b"{}")
+            if self._enter("elevenlabs"):
+                fmt = parse_qs(url.query).get("output_format", ["mp3_44100_128"])[-1]
+                pcm_rate = int(fmt[4:]) if fmt.startswith("pcm_") else None
+                audio = speech(data.get("text", ""), pcm_rate)
+                pieces = [audio[i:i + 16384] for i in range(0, len(audio), 16384)]
+                self._stream(pieces, "audio/pcm" if pcm_rate else "audio/mpeg",
+                             self.server.faults["elevenlabs"].token_delay)
+            return
+        if path == "/api/v1/access_token":
+            self._body()
+            if self._enter("reddit"):
+                self._json({"access_token": "standin", "token_type": "bearer",
+                            "expires_in": 86400, "scope": "*"})
+            return
+        if path == "/upload/youtube/v3/videos":
+            return self._upload_start(self._body())
+        self._body()
+        self._json({"error": f"no stand-in for POST {path}"}, status=404)
+
+    def do_PUT(self) -> None:
+        m = re.fullmatch(r"/upload/session/([0-9a-f]+)", urlparse(self.path).path)
+        if not m:
+            self._body()
+            return self._json({"error": "unknown upload session"}, status=404)
+        self._upload_chunk(m.group(1), self._body())
+
+    # --- OpenAI ------------------------------------------------------------- #
+    def _chat(self, data: dict) -> None:
+        if not self._enter("openai"):
+            return
+        messages = data.get("messages") or []
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        text = chat_reply(system, user, int(data.get("max_tokens") or data.get("max_completion_tokens") or 1024))
+        model = data.get("model", "standin")
+        usage = {"prompt_tokens": (len(system) + len(user)) // 4, "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": model}
+        if not data.get("stream"):
+            return self._json({**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": text}}]})
+
+        def chunk(delta: dict, finish=None, **extra) -> bytes:
+            body = {**base, "object": "chat.completion.chunk", **extra,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            return b"data: " + json.dumps(body).encode("utf-8") + b"\n\n"
+
+        words = re.findall(r"\S+\s*", text)
+        pieces = [chunk({"role": "assistant", "content": ""})]
+        pieces += [chunk({"content": w}) for w in words]
+        pieces.append(chunk({}, "stop"))
+        if (data.get("stream_options") or {}).get("include_usage"):
+            pieces.append(b"data: " + json.dumps({**base, "object": "chat.completion.chunk",
+                                                  "choices": [], "usage": usage}).encode() + b"\n\n")
+        pieces.append(b"data: [DONE]\n\n")
+        self._stream(pieces, "text/event-stream", self.server.faults["openai"].token_delay)
+
+    def _transcribe(self) -> None:
+        body = self._body()
+        if not self._enter("openai"):
+            return
+        msg = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + self.headers.get("Content-Type", "").encode() + b"\r\n\r\n" + body)
+        audio = b""
+        for part in msg.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                audio = part.get_payload(decode=True) or b""
+        seconds = _audio_seconds(audio)
+        self._json(transcript(seconds))
+
+    # --- YouTube ------------------------------------------------------------ #
+    def _upload_start(self, body: bytes) -> None:
+        if not self._enter("youtube"):
+            return
+        session = uuid.uuid4().hex
+        total = int(self.headers.get("X-Upload-Content-Length") or 0)
+        with self.server.lock:
+            self.server.uploads[session] = {"meta": json.loads(body or b"{}"), "received": 0,
+                                            "total": total}
+        self._send(200, b"", headers={"Location": f"{self.server.url}/upload/session/{session}"})
+
+    def _upload_chunk(self, session: str, body: bytes) -> None:
+        with self.server.lock:
+            up = self.server.uploads.get(session)
+        if up is None:
+            return self._json({"error": "unknown upload session"}, status=404)
+        if not self._enter("youtube"):
+            return
+        m = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", self.headers.get("Content-Range", ""))
+        if m:
+            up["received"] = int(m.group(2)) + 1
+            if m.group(3) != "*":
+                up["total"] = int(m.group(3))
+        else:
+            up["received"] += len(body)
+        if up["total"] and up["received"] < up["total"]:
+            return self._send(308, b"", headers={"Range": f"bytes=0-{up['received'] - 1}"})
+        video_id = format(_digest(session) % 36 ** 11, "x")[:11]
+        self._json({"kind": "youtube#video", "id": video_id, **up["meta"]})
+
+
+# --------------------------------------------------------------------------- #
+# Pointing the app at it
+# --------------------------------------------------------------------------- #
+_scratch: Optional[str] = None   # where configure() moved the caches + breakers
+
+
+def configure(url: str) -> None:
+    """Send every provider call of this process to the stand-in at ``url``
+    (filling in placeholder keys where none are set).
+
+    The response caches and the model breakers move to a scratch directory
+    too: the stand-in's fake replies must never be replayed in a real run, and
+    the errors it injects must not open the breakers of real model ids."""
+    global _scratch
+    from . import breaker, llm, providers, reddit_source, voice
+    s = config.settings
+    if _scratch is None:
+        scratch = _scratch = tempfile.mkdtemp(prefix="k100dra-standin-")
+        config.CACHE_DIR = os.path.join(scratch, "cache")
+        config.REDDIT_CACHE_DIR = os.path.join(config.CACHE_DIR, "reddit")
+        config.MODEL_HEALTH_FILE = os.path.join(scratch, "model_health.json")
+        with breaker._lock:
+            breaker._models = None
+        llm._response_cache = None
+        voice._tts_caches.clear()
+        reddit_source._listings.clear()
+    url = url.rstrip("/")
+    s.openai_base_url = f"{url}/v1"
+    s.elevenlabs_base_url = url
+    s.reddit_base_url = url
+    s.youtube_base_url = f"{url}/"
+    s.openai_key = s.openai_key or "standin"
+    s.elevenlabs_key = s.elevenlabs_key or "standin"
+    s.reddit_client_id = s.reddit_client_id or "standin"
+    s.reddit_client_secret = s.reddit_client_secret or "standin"
+    providers._clients.clear()   # rebuilt against the new base URL on next use
+    reddit_source._reddit = None
+
+
+def start(port: int = 0, faults: Optional[Dict[str, Faults]] = None, seed: int = 0) -> StandIn:
+    """Start a stand-in in this process and point the config at it."""
+    server = StandIn(port=port, faults=faults, seed=seed).start()
+    configure(server.url)
+    return server
+
+
+def _parse_faults(args) -> Dict[str, Faults]:
+    base = Faults(latency=args.latency, jitter=args.jitter, token_delay=args.token_delay,
+                  error_rate=args.error_rate)
+    faults = {name: replace(base) for name in SERVICES}
+    for spec in args.service or []:
+        name, _, rest = spec.partition(":")
+        if name not in faults:
+            raise SystemExit(f"unknown service {name!r} (one of {', '.join(SERVICES)})")
+        for item in filter(None, rest.split(",")):
+            key, _, value = item.partition("=")
+            setattr(faults[name], key.replace("-", "_"), float(value))
+    return faults
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline stand-ins for OpenAI, ElevenLabs, Reddit and YouTube.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before every reply.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± share of the latency, at random.")
+    parser.add_argument("--token-delay", type=float, default=0.0,
+                        help="Seconds between streamed pieces (chat tokens, audio chunks).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500/429.")
+    parser.add_argument("--service", action="append", metavar="NAME:key=value,...",
+                        help="Per-service override, e.g. openai:latency=0.8,error_rate=0.1")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    server = StandIn(args.host, args.port, faults=_parse_faults(args), seed=args.seed)
+    url = server.url
+    print(f"Stand-in APIs on {url} — point K100DRA at them with:\n"
+          f"  K100DRA_OPENAI_BASE_URL={url}/v1\n  K100DRA_ELEVENLABS_BASE_URL={url}\n"
+          f"  K100DRA_REDDIT_BASE_URL={url}\n  K100DRA_YOUTUBE_BASE_URL={url}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
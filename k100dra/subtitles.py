@@ -2,7 +2,8 @@
 
 Word-level timing is what makes the new captions feel alive (each word pops as
 it is spoken), so the transcriber keeps the per-word timestamps around instead
-of collapsing them into lines.  ``openai`` is imported lazily.
+of collapsing them into lines, then respells them against the script locally.
+``openai`` is imported lazily.
 """
 
 from __future__ import annotations
@@ -12,7 +13,7 @@ import re
 from dataclasses import dataclass
 from typing import Callable, List, Optional
 
-from . import config
+from . import config, metrics, voice
 
 ProgressCb = Optional[Callable[[float, str], None]]
 
@@ -28,7 +29,7 @@ def _client():
     import openai  # lazy
     if not config.settings.openai_key:
         raise RuntimeError("KEY_OPENAI is not set — cannot transcribe.")
-    return openai.OpenAI(api_key=config.settings.openai_key)
+    return openai.OpenAI(api_key=config.settings.openai_key, base_url=config.settings.openai_base_url)
 
 
 def _attach_punctuation(words, full_text: str) -> List[Word]:
@@ -48,18 +49,25 @@ def _attach_punctuation(words, full_text: str) -> List[Word]:
     return out
 
 
-def transcribe(project: str, on_progress: ProgressCb = None) -> List[Word]:
-    audio_path = os.path.join(config.project_dir(project), "speech.mp3")
+def transcribe(project: str, on_progress: ProgressCb = None, scale: float = 1.0) -> List[Word]:
+    """Word timings of the project's narration, multiplied by ``scale`` (the
+    speedup the mix will apply, see :func:`video.build_audio`)."""
+    audio_path = os.path.join(config.project_dir(project), voice.speech_file())
     if on_progress:
         on_progress(0.2, "Transcribing with Whisper…")
-    with open(audio_path, "rb") as fh:
+    model = config.settings.model_transcribe
+    with metrics.call("stt", "openai", model) as call, open(audio_path, "rb") as fh:
         result = _client().audio.transcriptions.create(
-            model=config.settings.model_transcribe,
+            model=model,
             file=fh,
             response_format="verbose_json",
             timestamp_granularities=["word"],
         )
+        call.first()   # not streamed: the whole response is the first byte
+        call.usage((getattr(result, "duration", 0) or 0) / 60.0)   # billed per audio minute
     words = _attach_punctuation(result.words, result.text)
+    if scale != 1.0:
+        words = [Word(w.text, w.start * scale, w.end * scale) for w in words]
     if on_progress:
         on_progress(0.8, f"{len(words)} words timed")
     _write_srt(project, words)
@@ -75,7 +83,7 @@ def _fmt(seconds: float) -> str:
 
 
 def _write_srt(project: str, words: List[Word]) -> str:
-    """Write a one-word-per-cue SRT (used for upload captions + GPT cleanup)."""
+    """Write a one-word-per-cue SRT (used for upload captions)."""
     lines = []
     for i, w in enumerate(words, start=1):
         end = max(w.end, w.start + 0.05)
@@ -107,20 +115,174 @@ def parse_srt_words(srt_text: str) -> List[Word]:
     return out
 
 
+# --------------------------------------------------------------------------- #
+# Alignment against the script
+# --------------------------------------------------------------------------- #
+# We know exactly what was said, so Whisper's words are matched to the script's
+# words by edit-distance dynamic programming: each script word takes the timing
+# of the Whisper word(s) it lines up with, with the script's own spelling and
+# punctuation.  Only runs of poorly matched words ("low confidence") can be sent
+# to ``model_srt`` as a fallback.
+
+_GAP_COST = 1.0            # a word only one side has
+_LOW_CONFIDENCE = 0.5      # substitutions costlier than this are doubtful
+_MIN_LOW_SPAN = 3          # doubtful words in a row before the LLM is asked
+_MIN_MATCHED = 0.5         # below this share of good matches the script is ignored
+
+
+def _norm(token: str) -> str:
+    return re.sub(r"[^\w]", "", token.lower())
+
+
+def _char_distance(a: str, b: str) -> float:
+    """Levenshtein distance between two words, scaled to 0..1."""
+    if a == b:
+        return 0.0
+    if not a or not b:
+        return 1.0
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1] / max(len(a), len(b))
+
+
+def _align(heard: List[str], script: List[str]) -> List[tuple]:
+    """Optimal alignment of two normalized token lists as ``(i, j, cost)``
+    steps; ``i`` or ``j`` is None for a word only one side has."""
+    n, m = len(heard), len(script)
+    sub: dict = {}
+    cost = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        cost[i][0] = i * _GAP_COST
+    for j in range(1, m + 1):
+        cost[0][j] = j * _GAP_COST
+    for i in range(1, n + 1):
+        row, above, a = cost[i], cost[i - 1], heard[i - 1]
+        for j in range(1, m + 1):
+            b = script[j - 1]
+            if (a, b) not in sub:
+                sub[(a, b)] = _char_distance(a, b)
+            row[j] = min(above[j - 1] + sub[(a, b)], above[j] + _GAP_COST, row[j - 1] + _GAP_COST)
+
+    steps, i, j = [], n, m
+    while i or j:
+        if i and j and cost[i][j] == cost[i - 1][j - 1] + sub[(heard[i - 1], script[j - 1])]:
+            steps.append((i - 1, j - 1, sub[(heard[i - 1], script[j - 1])]))
+            i, j = i - 1, j - 1
+        elif i and cost[i][j] == cost[i - 1][j] + _GAP_COST:
+            steps.append((i - 1, None, _GAP_COST))
+            i -= 1
+        else:
+            steps.append((None, j - 1, _GAP_COST))
+            j -= 1
+    return steps[::-1]
+
+
+def align_words(words: List[Word], script_text: str):
+    """Respell ``words`` with the script's words, keeping Whisper's timings.
+
+    Returns ``(aligned, doubtful)``: one :class:`Word` per script word, and the
+    ``(start, end)`` index ranges of ``aligned`` where the match was poor.  If
+    the script does not fit the audio at all, ``words`` comes back unchanged.
+    """
+    tokens = script_text.split()
+    if not words or not tokens:
+        return words, []
+    steps = _align([_norm(w.text) for w in words], [_norm(t) for t in tokens])
+    good = sum(1 for i, j, c in steps if i is not None and j is not None and c <= _LOW_CONFIDENCE)
+    if good < _MIN_MATCHED * len(tokens):
+        return words, []
+
+    timed: List[Optional[list]] = [None] * len(tokens)
+    doubtful = [False] * len(tokens)
+    last = None      # the script word the previous Whisper word went to
+    early = None     # start of extra words that belong to the next script word
+    for k, (i, j, c) in enumerate(steps):
+        if j is None:
+            # Whisper heard an extra word (often one script word split in two,
+            # "3 am" for "3am"): it lengthens the script word it is part of.
+            nxt = next((jj for _, jj, _ in steps[k + 1:] if jj is not None), None)
+            if nxt is not None and _norm(words[i].text) in _norm(tokens[nxt]):
+                early = words[i].start if early is None else early
+            elif last is not None and timed[last] is not None:
+                timed[last][1] = max(timed[last][1], words[i].end)
+            continue
+        if i is not None:
+            timed[j] = [words[i].start if early is None else early, words[i].end]
+            last, early = j, None
+        doubtful[j] = c > _LOW_CONFIDENCE
+    _fill_gaps(timed, tokens, words[-1].end)
+
+    aligned = [Word(text=t, start=round(a, 3), end=round(b, 3)) for t, (a, b) in zip(tokens, timed)]
+    spans, start = [], None
+    for k, bad in enumerate(doubtful + [False]):
+        if bad and start is None:
+            start = k
+        elif not bad and start is not None:
+            if k - start >= _MIN_LOW_SPAN:
+                spans.append((start, k))
+            start = None
+    return aligned, spans
+
+
+def _fill_gaps(timed: List[Optional[list]], tokens: List[str], audio_end: float) -> None:
+    """Give the script words Whisper missed a share of the time around them:
+    the silence before the next timed word if there is any, else a slice of
+    the word before (split by length)."""
+    k = 0
+    while k < len(timed):
+        if timed[k] is not None:
+            k += 1
+            continue
+        end = k
+        while end < len(timed) and timed[end] is None:
+            end += 1
+        prev = timed[k - 1] if k else None
+        lo = prev[1] if prev else 0.0
+        hi = timed[end][0] if end < len(timed) else audio_end
+        share = [len(t) for t in tokens[k:end]]
+        if hi - lo < 0.05 * (end - k) and prev is not None:
+            # No silence to use: the previous word is split with the missing ones.
+            share = [len(tokens[k - 1])] + share
+            lo = prev[0]
+            k -= 1
+        total, t = float(sum(share)) or 1.0, lo
+        for off, size in enumerate(share):
+            span = (hi - lo) * size / total
+            timed[k + off] = [t, t + span]
+            t += span
+        k = end
+
+
 def apply_correction(project: str, words: List[Word], script_text: str) -> List[Word]:
-    """Optionally clean spelling against the script. Never breaks the run."""
-    from . import llm
-    srt_path = os.path.join(config.project_dir(project), "speech.srt")
+    """Respell the words against the script (see :func:`align_words`) and rewrite
+    ``speech.srt``; doubtful runs go to ``model_srt`` when ``subtitle_llm`` is on.
+    Never breaks the run."""
     try:
-        with open(srt_path, "r", encoding="utf-8") as fh:
-            original = fh.read()
-        corrected = llm.correct_srt(original, script_text)
-        fixed_words = parse_srt_words(corrected)
-        # Only trust the correction if it kept roughly the same words.
-        if abs(len(fixed_words) - len(words)) <= max(3, len(words) * 0.15):
-            with open(srt_path, "w", encoding="utf-8") as fh:
-                fh.write(corrected)
-            return fixed_words
+        fixed, doubtful = align_words(words, script_text)
+        if doubtful and config.settings.subtitle_llm:
+            _llm_respell(fixed, doubtful, script_text)
+        _write_srt(project, fixed)
+        return fixed
     except Exception:
-        pass
-    return words
+        return words
+
+
+def _llm_respell(words: List[Word], spans, script_text: str) -> None:
+    """Ask the LLM about the doubtful runs only; keep its spelling where it
+    returned the same number of cues (timings are always ours)."""
+    from . import llm
+    for start, end in spans:
+        part = words[start:end]
+        srt = "\n".join(f"{i}\n{_fmt(w.start)} --> {_fmt(max(w.end, w.start + 0.05))}\n{w.text}\n"
+                        for i, w in enumerate(part, start=1))
+        try:
+            fixed = parse_srt_words(llm.correct_srt(srt, script_text))
+        except Exception:
+            continue
+        if len(fixed) == len(part):
+            for w, f in zip(part, fixed):
+                w.text = f.text
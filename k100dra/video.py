@@ -18,11 +18,14 @@ battle-tested fallback render still produces a watchable video.
 
 from __future__ import annotations
 
+import functools
 import logging
 import os
+import shutil
 import struct
 import subprocess
-from typing import Callable, List, Optional
+import wave
+from typing import Callable, FrozenSet, List, Optional
 
 from . import config
 
@@ -48,6 +51,20 @@ def supports_nvenc() -> bool:
         return False
 
 
+@functools.lru_cache(maxsize=None)
+def ffmpeg_filters() -> FrozenSet[str]:
+    """The filters this ffmpeg was built with (asked once; empty if it can't say)."""
+    try:
+        out = subprocess.run(["ffmpeg", "-hide_banner", "-filters"],
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             text=True, check=True).stdout
+    except Exception:
+        return frozenset()
+    # " T.C atempo   A->A   Adjust audio tempo." (the header lines have no "->")
+    return frozenset(parts[1] for parts in (line.split() for line in out.splitlines())
+                     if len(parts) > 2 and "->" in parts[2])
+
+
 def _codec(use_gpu: bool) -> str:
     return "h264_nvenc" if use_gpu and supports_nvenc() else "libx264"
 
@@ -439,6 +456,20 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 # Audio helpers (pydub)
 # --------------------------------------------------------------------------- #
 def audio_duration(path: str) -> float:
+    """Length of an audio file: from its headers for mp3/wav (no decode, no
+    process), else ffprobe, else pydub."""
+    try:
+        if path.endswith(".wav"):
+            with wave.open(path, "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        if path.endswith(".mp3"):
+            from . import mp3
+            with open(path, "rb") as fh:
+                dur = mp3.duration(fh.read())
+            if dur > 0:
+                return dur
+    except (OSError, EOFError, wave.Error):
+        pass
     dur = probe_duration(path)
     if dur > 0:
         return dur
@@ -446,31 +477,209 @@ def audio_duration(path: str) -> float:
     return len(AudioSegment.from_file(path)) / 1000.0
 
 
+def _audio_format(path: str) -> str:
+    return os.path.splitext(path)[1].lstrip(".").lower() or "mp3"
+
+
+def _atempo_chain(factor: float) -> str:
+    """``atempo`` filters whose product is ``factor`` (each stage within the
+    0.5–2.0 range every ffmpeg version accepts)."""
+    stages = []
+    while factor > 2.0:
+        stages.append(2.0)
+        factor /= 2.0
+    while factor < 0.5:
+        stages.append(0.5)
+        factor /= 0.5
+    stages.append(factor)
+    return ",".join(f"atempo={f:.9f}" for f in stages)
+
+
 def speedup_audio(path: str, target_seconds: float) -> float:
-    """Gently speed up over-long narration to fit ``target_seconds``."""
-    from pydub import AudioSegment
-    audio = AudioSegment.from_file(path)
-    current = len(audio) / 1000.0
-    if current <= target_seconds:
-        return current
-    factor = current / target_seconds
-    sped = audio.speedup(playback_speed=factor)
-    sped.export(path, format="mp3")
-    return len(sped) / 1000.0
+    """Speed over-long narration up to last exactly ``target_seconds``, pitch
+    kept (ffmpeg ``atempo``, streamed — many times faster than real time).
+
+    Returns the time scale applied — a moment at ``t`` in the old file is at
+    ``t * scale`` in the new one — or 1.0 if it already fit.  The file is
+    replaced atomically, in its own format (mp3 or wav), so a reader that
+    already opened it (a studio preview) keeps the old version.
+    """
+    current = audio_duration(path)
+    if current <= target_seconds or target_seconds <= 0:
+        return 1.0
+    fmt = _audio_format(path)
+    codec = ["-c:a", "pcm_s16le"] if fmt == "wav" else ["-c:a", "libmp3lame", "-q:a", "2"]
+    tmp = f"{path}.tmp.{fmt}"
+    # atempo lands within a few ms of the target; pad/cut the remainder so the
+    # length — and so the scale — is exact.
+    _run(["ffmpeg", "-y", "-i", path, "-vn",
+          "-af", f"{_atempo_chain(current / target_seconds)},apad=whole_dur={target_seconds:.6f}",
+          "-t", f"{target_seconds:.6f}"] + codec + [tmp])
+    os.replace(tmp, path)
+    return target_seconds / current
+
+
+# The NumPy mixer works on 16-bit PCM at this rate / channel count, and reads
+# the music in blocks of _MIX_BLOCK frames.
+MIX_RATE, MIX_CHANNELS = 44100, 2
+_MIX_BLOCK = MIX_RATE
 
 
 def mix_music(speech_path: str, music_path: Optional[str], out_path: str, music_db: float) -> None:
-    """Overlay (optional) background music under the narration."""
+    """Overlay (optional) background music under the narration; ``out_path``
+    is written in the format its extension names (mp3 or wav).
+
+    With NumPy installed the music is streamed in blocks and looped by ffmpeg
+    (:func:`_mix_numpy`), so memory stays at about one narration-length buffer
+    however long the music source is; otherwise pydub does it in memory.
+    """
+    if not music_path and _audio_format(speech_path) == _audio_format(out_path):
+        shutil.copyfile(speech_path, out_path)
+        return
+    try:
+        import numpy as np
+    except ImportError:
+        _mix_pydub(speech_path, music_path, out_path, music_db)
+        return
+    _mix_numpy(np, speech_path, music_path, out_path, music_db)
+
+
+def _mix_pydub(speech_path: str, music_path: Optional[str], out_path: str, music_db: float) -> None:
     from pydub import AudioSegment
     speech = AudioSegment.from_file(speech_path)
+    fmt = _audio_format(out_path)
     if not music_path:
-        speech.export(out_path, format="mp3")
+        speech.export(out_path, format=fmt)
         return
     music = AudioSegment.from_file(music_path)
     if len(music) < len(speech):
         music *= (len(speech) // len(music) + 1)
     music = music[:len(speech)] - abs(music_db)
-    speech.overlay(music).export(out_path, format="mp3")
+    speech.overlay(music).export(out_path, format=fmt)
+
+
+def _pcm_reader(path: str, loop: bool = False) -> subprocess.Popen:
+    """ffmpeg decoding ``path`` (forever, with ``loop``) to MIX_RATE s16le PCM on stdout."""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"] + (["-stream_loop", "-1"] if loop else [])
+    cmd += ["-i", path, "-vn", "-f", "s16le", "-ac", str(MIX_CHANNELS), "-ar", str(MIX_RATE), "-"]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+
+def _mix_numpy(np, speech_path: str, music_path: Optional[str], out_path: str, music_db: float) -> None:
+    """Decode the narration into one float buffer, add the gained music into
+    it block by block, and stream the clipped result to the encoder."""
+    reader = _pcm_reader(speech_path)
+    raw = reader.stdout.read()   # type: ignore[union-attr]
+    if reader.wait() != 0 or not raw:
+        raise RuntimeError(f"could not decode {os.path.basename(speech_path)}")
+    mix = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    del raw
+
+    if music_path:
+        gain = np.float32(10 ** (-abs(music_db) / 20))
+        block = _MIX_BLOCK * MIX_CHANNELS
+        music = _pcm_reader(music_path, loop=True)
+        try:
+            pos = 0
+            while pos < len(mix):
+                chunk = music.stdout.read(2 * min(block, len(mix) - pos))   # type: ignore[union-attr]
+                chunk = chunk[:len(chunk) // 2 * 2]
+                if not chunk:
+                    break
+                samples = np.frombuffer(chunk, dtype=np.int16)
+                mix[pos:pos + len(samples)] += samples * gain
+                pos += len(samples)
+        finally:
+            music.kill()
+            music.wait()
+        if pos == 0:
+            raise RuntimeError(f"could not decode {os.path.basename(music_path)}")
+
+    np.clip(mix, -32768, 32767, out=mix)
+    fmt = _audio_format(out_path)
+    codec = ["-c:a", "pcm_s16le"] if fmt == "wav" else ["-c:a", "libmp3lame", "-q:a", "2"]
+    writer = subprocess.Popen(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-f", "s16le",
+         "-ac", str(MIX_CHANNELS), "-ar", str(MIX_RATE), "-i", "-"] + codec + [out_path],
+        stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    step = _MIX_BLOCK * MIX_CHANNELS
+    try:
+        for i in range(0, len(mix), step):
+            writer.stdin.write(mix[i:i + step].astype(np.int16).tobytes())   # type: ignore[union-attr]
+    except BrokenPipeError:
+        pass
+    _, err = writer.communicate()
+    if writer.returncode != 0:
+        raise RuntimeError((err or b"").decode("utf-8", "replace").strip()[-500:] or "ffmpeg failed")
+
+
+def build_audio(speech_path: str, music_path: Optional[str], out_path: str, scale: float,
+                duration: float, music_db: float, duck: bool = True, lufs: float = -14.0,
+                on_progress: ProgressCb = None, lo: float = 0.0, hi: float = 1.0,
+                log: Optional[Callable[[str], None]] = None) -> List[str]:
+    """The whole audio stage as one ffmpeg run: speed the narration up by
+    1 / ``scale`` (atempo, pitch kept), loop the music and bring it down by
+    ``music_db``, duck it under the voice, mix, normalize to ``lufs`` and
+    write exactly ``duration`` seconds to ``out_path`` (mp3 or wav).
+
+    ``speech_path`` is left as recorded.  Only an ffmpeg built without one of
+    the graph's filters gets the step-by-step fallback (:func:`speedup_audio`
+    on a copy, then :func:`mix_music` — no ducking, no loudness normalization);
+    that is reported to ``log`` and the missing filters are returned.  Any
+    other ffmpeg failure is raised.
+    """
+    fmt = _audio_format(out_path)
+    tempo = f"{_atempo_chain(1.0 / scale)}," if scale < 1.0 else ""
+    fmt_in = f"aformat=sample_rates={MIX_RATE}:channel_layouts=stereo"
+    speech = f"[0:a]{tempo}{fmt_in},apad=whole_dur={duration:.6f}"
+    post = f"loudnorm=I={lufs:g}:TP=-1.5:LRA=11,aresample={MIX_RATE}" if lufs else f"aresample={MIX_RATE}"
+    inputs = ["-i", speech_path]
+    if music_path:
+        inputs += ["-stream_loop", "-1", "-i", music_path]
+        music = f"[1:a]{fmt_in},volume={-abs(music_db):g}dB"
+        if duck:
+            graph = (f"{speech},asplit=2[sp][key];{music}[m];"
+                     f"[m][key]sidechaincompress=threshold=0.03:ratio=6:attack=20:release=400[bg];")
+        else:
+            graph = f"{speech}[sp];{music}[bg];"
+        # amix halves both inputs; loudnorm makes up for that, else undo it.
+        graph += (f"[sp][bg]amix=inputs=2:duration=first:dropout_transition=0,"
+                  f"{'' if lufs else 'volume=2,'}{post}[out]")
+    else:
+        graph = f"{speech},{post}[out]"
+    codec = ["-c:a", "pcm_s16le"] if fmt == "wav" else ["-c:a", "libmp3lame", "-q:a", "2"]
+    cmd = inputs + ["-filter_complex", graph, "-map", "[out]", "-t", f"{duration:.6f}"] + codec + [out_path]
+    available = ffmpeg_filters()
+    needed = {"aformat", "apad", "aresample", "atempo" if tempo else "",
+              "loudnorm" if lufs else "", "volume" if music_path else "",
+              "amix" if music_path else "", "asplit" if music_path and duck else "",
+              "sidechaincompress" if music_path and duck else ""} - {""}
+    missing = sorted(needed - available) if available else []   # unknown: just try it
+    if not missing:
+        _run_progress(cmd, duration, on_progress, lo, hi)
+        return []
+    message = (f"ffmpeg lacks the {', '.join(missing)} filter{'s' if len(missing) > 1 else ''}; "
+               f"mixing step by step (no ducking or loudness normalization)")
+    _log.warning(message)
+    if log:
+        log(message)
+    fitted = f"{out_path}.fit.{_audio_format(speech_path)}"
+    shutil.copyfile(speech_path, fitted)
+    try:
+        if scale < 1.0:
+            speedup_audio(fitted, duration)
+        mix_music(fitted, music_path, out_path, music_db)
+    finally:
+        try:
+            os.remove(fitted)
+        except OSError:
+            pass
+    return missing
+
+
+def mp3_preview(src: str, out_path: str) -> None:
+    """A small mp3 of ``src`` for the studio's audio players."""
+    _run(["ffmpeg", "-y", "-i", src, "-c:a", "libmp3lame", "-b:a", "128k", out_path])
 
 
 # --------------------------------------------------------------------------- #
@@ -495,8 +704,8 @@ def _base_filter(vis: "config.VisualStyle") -> str:
 
 def _stylize_base(src: str, out: str, start: float, duration: float,
                   vis: "config.VisualStyle", use_gpu: bool, cb: ProgressCb,
-                  lo: float, hi: float) -> None:
-    cmd = ["-ss", str(start), "-i", src, "-t", str(duration),
+                  lo: float, hi: float, loop: bool = False) -> None:
+    cmd = (["-stream_loop", "-1"] if loop else []) + ["-ss", str(start), "-i", src, "-t", str(duration),
            "-vf", _base_filter(vis), "-an",
            "-c:v", _codec(use_gpu), "-pix_fmt", "yuv420p", out]
     _run_progress(cmd, duration, cb, lo, hi)
@@ -557,7 +766,7 @@ def _captions_pass(base_video: str, audio: str, out: str,
         "-filter_complex", vchain,
         "-map", "[vout]", "-map", "1:a:0",
         "-c:v", _codec(use_gpu), "-pix_fmt", "yuv420p",
-        "-c:a", "aac", "-b:a", "192k", "-shortest", out,
+        "-c:a", "aac", "-b:a", "192k", "-t", f"{duration:.3f}", "-shortest", out,
     ]
     _run_progress(cmd, duration, cb, lo, hi, cwd=cwd)
 
@@ -567,7 +776,7 @@ def _upscale(src: str, out: str, use_gpu: bool, duration: float,
     cmd = ["-i", src, "-vf", f"scale={FINAL_W}:{FINAL_H}:flags=lanczos",
            "-c:v", _codec(use_gpu), "-b:v", "45M", "-maxrate", "55M",
            "-bufsize", "90M", "-pix_fmt", "yuv420p",
-           "-c:a", "aac", "-b:a", "256k", "-movflags", "+faststart", out]
+           "-c:a", "copy", "-movflags", "+faststart", out]   # audio was encoded by the captions pass
     _run_progress(cmd, duration, cb, lo, hi)
 
 
@@ -575,7 +784,8 @@ def _basic_render(src: str, audio: str, srt_path: str, out: str,
                   start: float, duration: float, use_gpu: bool) -> None:
     """Dependable fallback: crop, mux audio, burn plain SRT, upscale-ish."""
     base = out.replace(".mp4", "_b.mp4")
-    _run(["ffmpeg", "-y", "-ss", str(start), "-i", src, "-t", str(duration),
+    loop = ["-stream_loop", "-1"] if probe_duration(src) - start + 0.05 < duration else []
+    _run(["ffmpeg", "-y"] + loop + ["-ss", str(start), "-i", src, "-t", str(duration),
           "-vf", f"scale={RENDER_W}:{RENDER_H}:force_original_aspect_ratio=increase,"
                  f"crop={RENDER_W}:{RENDER_H}", "-an",
           "-c:v", _codec(use_gpu), "-pix_fmt", "yuv420p", base])
@@ -592,16 +802,49 @@ def _basic_render(src: str, audio: str, srt_path: str, out: str,
 # --------------------------------------------------------------------------- #
 # Orchestration
 # --------------------------------------------------------------------------- #
+def stylize_background(project: str, background, duration: float, use_gpu: bool,
+                       on_progress: ProgressCb = None) -> str:
+    """First render pass: crop/grade ``background`` into the project's ``base.mp4``,
+    ``duration`` seconds long — a background shorter than that is looped."""
+    base = os.path.join(config.project_dir(project), "base.mp4")
+    duration = duration or background.duration
+    loop = background.duration + 0.05 < duration
+    if loop:
+        _log.warning("background %s is %.1fs, looping it to %.1fs",
+                     background.name, background.duration, duration)
+    if on_progress:
+        on_progress(0.02, f"Styling background ({background.name})")
+    _stylize_base(background.path, base, background.start, duration,
+                  config.settings.visuals, use_gpu, on_progress, 0.02, 0.30, loop=loop)
+    return base
+
+
+def _loop_base(base: str, duration: float) -> None:
+    """Loop an already styled ``base`` (stream copy) until it lasts ``duration``."""
+    tmp = base.replace(".mp4", "_loop.mp4")
+    _run(["ffmpeg", "-y", "-stream_loop", "-1", "-i", base, "-t", f"{duration:.3f}",
+          "-c", "copy", tmp])
+    os.replace(tmp, base)
+
+
 def render_video(project: str, words, background, audio_path: str,
                  srt_path: str, use_gpu: bool, on_progress: ProgressCb = None,
-                 chat=None, chat_intervals=None) -> str:
-    """Produce ``video_final.mp4`` for ``project`` and return its path."""
+                 chat=None, chat_intervals=None, duration: Optional[float] = None,
+                 base: Optional[str] = None) -> str:
+    """Produce ``video_final.mp4`` for ``project`` and return its path.
+
+    ``duration`` is the narration length and always wins: the background may
+    have been fetched longer (before the voice existed) and is cut down to it,
+    or shorter, and is then looped — the narration is never cut.  Pass an already
+    styled ``base`` (see :func:`stylize_background`) to skip the first pass —
+    ``background`` may then be None.
+    """
     pdir = config.project_dir(project)
     vis = config.settings.visuals
-    base = os.path.join(pdir, "base.mp4")
     styled = os.path.join(pdir, "video_styled.mp4")
     final = os.path.join(pdir, "video_final.mp4")
-    duration = background.duration
+    if background is not None and not duration:
+        duration = background.duration
     has_chat = bool(chat)
     chat_intervals = chat_intervals or []
 
@@ -612,10 +855,16 @@ def render_video(project: str, words, background, audio_path: str,
             build_overlay_ass(words, chat or [], duration, os.path.join(pdir, "overlay.ass"),
                               font_family_name(config.settings.chat_font_path()))
 
-        if on_progress:
-            on_progress(0.02, f"Styling background ({background.name})")
-        _stylize_base(background.path, base, background.start, duration, vis,
-                      use_gpu, on_progress, 0.02, 0.30)
+        if base and probe_duration(base) + 0.05 < duration:
+            # The speculative base came up short of the real narration.
+            if background is not None and os.path.exists(background.path):
+                _log.info("styled base shorter than %.1fs; styling it again", duration)
+                base = None
+            else:
+                _log.info("styled base shorter than %.1fs; looping it", duration)
+                _loop_base(base, duration)
+        if not base:
+            base = stylize_background(project, background, duration, use_gpu, on_progress)
 
         # Degrade gracefully: full stream look → drop bar → captions only.
         if on_progress:
@@ -649,9 +898,14 @@ def render_video(project: str, words, background, audio_path: str,
         _log.exception("fancy render failed; using basic fallback")
         if on_progress:
             on_progress(0.5, f"Fancy render failed ({str(exc)[:80]}); using fallback")
+        # The fetched background may already be gone on a resumed run; the
+        # styled base is then the best source we have.
+        if background is not None and os.path.exists(background.path):
+            src, start = background.path, background.start
+        else:
+            src, start = base or os.path.join(pdir, "base.mp4"), 0.0
         try:
-            _basic_render(background.path, audio_path, srt_path, final,
-                          background.start, duration, use_gpu)
+            _basic_render(src, audio_path, srt_path, final, start, duration, use_gpu)
         except Exception:
             _log.exception("basic fallback render ALSO failed")
             raise
@@ -5,17 +5,50 @@ the previous OpenAI TTS).  If no ElevenLabs key is configured, or the request
 fails, it transparently falls back to OpenAI TTS so a run never dies on the
 voice step.  The ElevenLabs call is streamed so the UI can show real download
 progress.
+
+With ``voice_stream`` on, :class:`VoiceStream` starts recording sentence by
+sentence while the script is still being written.  Every clip goes through a
+disk cache keyed by engine, voice, model, voice settings and text, so a line
+that was already recorded (a recurring interjection, a retried run) costs no
+request.
+
+With ``audio_wav`` on, both engines are asked for raw PCM and every file up to
+the final mux is a WAV (``speech.wav``), so the narration is only encoded once,
+by the video render.
 """
 
 from __future__ import annotations
 
+import contextvars
+import io
 import os
-from typing import Callable, Optional
+import shutil
+import subprocess
+import threading
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from . import config
+from . import cache, config, metrics
 
 ProgressCb = Optional[Callable[[float, str], None]]
 
+OPENAI_TTS_MODEL = "tts-1-hd"
+# Raw PCM (16-bit mono) sample rates asked for in audio_wav mode.
+ELEVENLABS_PCM_RATE = 44100
+OPENAI_PCM_RATE = 24000   # the only rate OpenAI's "pcm" format comes in
+
+
+def audio_ext() -> str:
+    """Extension of the narration files: ``.wav`` in audio_wav mode, else ``.mp3``."""
+    return ".wav" if config.settings.audio_wav else ".mp3"
+
+
+def speech_file() -> str:
+    """File name of the project's narration (``speech.mp3`` / ``speech.wav``)."""
+    return "speech" + audio_ext()
+
 
 def list_voices() -> list:
     """List the voices on the configured ElevenLabs account (name + id).
@@ -28,7 +61,7 @@ def list_voices() -> list:
         return []
     try:
         import requests
-        r = requests.get("https://api.elevenlabs.io/v1/voices",
+        r = requests.get(f"{s.elevenlabs_base_url}/v1/voices",
                          headers={"xi-api-key": s.elevenlabs_key}, timeout=15)
         if r.status_code != 200:
             return []
@@ -40,14 +73,14 @@ def list_voices() -> list:
 
 
 def synthesize(text: str, project: str, on_progress: ProgressCb = None) -> dict:
-    """Create ``speech.mp3``. Uses a second voice for {chat: ...} interjections
+    """Create the project's :func:`speech_file`. Uses a second voice for {chat: ...} interjections
     when ``chat_voice`` is on, falling back to a single voice on any issue.
 
     Performance tags ([excited], [whispers], ...) are kept only for ElevenLabs v3
     (which performs them); otherwise they are stripped so they're never read.
     """
     from . import llm
-    out_path = os.path.join(config.project_dir(project), "speech.mp3")
+    out_path = os.path.join(config.project_dir(project), speech_file())
     s = config.settings
     tags_ok = s.voice_tags and "v3" in (s.elevenlabs_model or "")
 
@@ -80,46 +113,327 @@ def _synth_one(text: str, out_path: str, speaker: str, tags_ok: bool,
                 settings = {"stability": s.chat_voice_stability, "similarity_boost": s.voice_similarity,
                             "style": s.chat_voice_style, "use_speaker_boost": False}
             else:
-                vid, settings = s.elevenlabs_voice_id, None
-            _elevenlabs(text if tags_ok else llm.strip_tags(text), out_path, on_progress, vid, settings)
+                vid = s.elevenlabs_voice_id
+                settings = {"stability": s.voice_stability, "similarity_boost": s.voice_similarity,
+                            "style": s.voice_style, "use_speaker_boost": s.voice_speaker_boost}
+            say = text if tags_ok else llm.strip_tags(text)
+            _cached(("elevenlabs", vid, s.elevenlabs_model, settings, say), out_path, on_progress,
+                    lambda: _elevenlabs(say, out_path, on_progress, vid, settings))
             return "elevenlabs"
         except Exception as exc:
             if on_progress:
                 on_progress(0.0, f"ElevenLabs failed ({exc}); OpenAI fallback")
     voice = s.openai_chat_tts_voice if speaker == "chat" else s.openai_tts_voice
-    _openai_tts(llm.strip_tags(text), out_path, on_progress, voice)
+    say = llm.strip_tags(text)
+    _cached(("openai", voice, OPENAI_TTS_MODEL, None, say), out_path, on_progress,
+            lambda: _openai_tts(say, out_path, on_progress, voice))
     return "openai"
 
 
+# --------------------------------------------------------------------------- #
+# Clip cache
+# --------------------------------------------------------------------------- #
+_tts_caches: Dict[str, cache.DiskCache] = {}
+
+
+def _get_cache(ext: str) -> cache.DiskCache:
+    """The clip cache for ``.mp3`` clips (``cache/tts``) or ``.wav`` ones (``cache/tts_wav``)."""
+    budget = int(config.settings.tts_cache_mb * 1024 * 1024)
+    store = _tts_caches.get(ext)
+    if store is None or store.max_bytes != budget:
+        store = _tts_caches[ext] = cache.DiskCache("tts" if ext == ".mp3" else "tts_wav", budget, suffix=ext)
+    return store
+
+
+def _cached(request: tuple, out_path: str, on_progress: ProgressCb, record: Callable[[], None]) -> None:
+    """Write the clip for ``request`` — (engine, voice, model, voice settings,
+    text) — to ``out_path`` from the cache, or ``record()`` it and keep a copy."""
+    if not config.settings.tts_cache:
+        record()
+        return
+    engine, voice, model, settings, text = request
+    key = cache.digest(engine, voice, model, settings, " ".join(text.split()))
+    store = _get_cache(os.path.splitext(out_path)[1])
+    hit = store.get_path(key)
+    if hit is not None:
+        try:
+            shutil.copyfile(hit, out_path)
+        except OSError:
+            pass
+        else:
+            metrics.count("tts_cache_hits")
+            if on_progress:
+                on_progress(1.0, "Voice ready (cached)")
+            return
+    metrics.count("tts_cache_misses")
+    record()
+    if os.path.getsize(out_path) > 0:
+        store.put_file(key, out_path)
+
+
 def _synth_segments(segments, out_path: str, tags_ok: bool, on_progress: ProgressCb):
-    """Synthesize each segment with its speaker's voice and stitch them together.
+    """Synthesize every segment with its speaker's voice, ``tts_concurrency`` at
+    a time, and stitch them together in script order.
 
     Returns (engine, chat_intervals) where chat_intervals are [start, end] seconds
     of each chat interjection in the combined audio (for the avatar swap).
     """
-    from pydub import AudioSegment
-    combined = AudioSegment.silent(duration=0)
-    intervals, cur, engine, n = [], 0.0, "elevenlabs", len(segments)
-    for i, (sp, seg_text) in enumerate(segments):
-        seg_file = f"{out_path}.seg{i}.mp3"
-        engine = _synth_one(seg_text, seg_file, sp, tags_ok, None)
-        clip = AudioSegment.from_file(seg_file)
-        dur = len(clip) / 1000.0
+    n = len(segments)
+    ext = os.path.splitext(out_path)[1]
+    paths = [f"{out_path}.seg{i}{ext}" for i in range(n)]
+    pool = ThreadPoolExecutor(max_workers=max(1, min(n, config.settings.tts_concurrency)),
+                              thread_name_prefix="k100dra-tts")
+    try:
+        jobs = [pool.submit(contextvars.copy_context().run, _synth_one, seg_text, path, sp, tags_ok, None)
+                for (sp, seg_text), path in zip(segments, paths)]
+        for done, job in enumerate(as_completed(jobs), 1):
+            job.result()   # the first failure stops the lot (the caller goes single-voice)
+            if on_progress:
+                on_progress(done / n, f"Recording voices… ({done}/{n})")
+        engine = "/".join(sorted({job.result() for job in jobs}))
+        intervals = _stitch([(sp, path) for (sp, _), path in zip(segments, paths)], out_path)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        _remove(paths)
+    return f"{engine}+chat", intervals
+
+
+def _stitch(clips, out_path: str) -> list:
+    """Join (speaker, mp3 path) clips in order into ``out_path``; returns the
+    [start, end] seconds of every chat clip.
+
+    Nothing is decoded: clip lengths come from their MP3 frame headers, the
+    pauses are generated silent frames in the clips' own format, and ffmpeg's
+    concat demuxer joins the lot — copying the frames through when every clip
+    shares one format, otherwise encoding the result once.  WAV clips are
+    joined in memory instead (:func:`_stitch_wav`).
+    """
+    if out_path.endswith(".wav"):
+        return _stitch_wav(clips, out_path)
+    from . import mp3
+    parts, pauses, formats = [], [], set()
+    intervals, cur = [], 0.0
+    try:
+        for i, (sp, path) in enumerate(clips):
+            with open(path, "rb") as fh:
+                data = fh.read()
+            fmt = mp3.stream_format(data)
+            if fmt is None:
+                raise RuntimeError(f"not an MP3 clip: {os.path.basename(path)}")
+            formats.add(fmt)
+            dur = mp3.duration(data)
+            if sp == "chat":
+                intervals.append([round(cur, 2), round(cur + dur, 2)])
+            pause = mp3.silence(_gap_after(clips, i), *fmt)
+            pause_path = f"{out_path}.gap{i}.mp3"
+            with open(pause_path, "wb") as fh:
+                fh.write(pause)
+            pauses.append(pause_path)
+            parts += [path, pause_path]
+            cur += dur + mp3.duration(pause)
+        listing = f"{out_path}.concat.txt"
+        with open(listing, "w", encoding="utf-8") as fh:
+            for path in parts:
+                fh.write("file '{}'\n".format(os.path.abspath(path).replace("'", "'\\''")))
+        codec = ["-c", "copy"] if len(formats) == 1 else ["-c:a", "libmp3lame", "-b:a", "128k"]
+        proc = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                               "-f", "concat", "-safe", "0", "-i", listing] + codec + [out_path],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError((proc.stderr or "").strip()[-300:] or "ffmpeg concat failed")
+    finally:
+        _remove(pauses + [f"{out_path}.concat.txt"])
+    return intervals
+
+
+def _gap_after(clips, i: int) -> float:
+    """Seconds of silence after clip ``i``: a tight cut-in before an
+    interjection so it feels like an interruption, a beat after one."""
+    sp = clips[i][0]
+    nxt = clips[i + 1][0] if i + 1 < len(clips) else None
+    return 0.04 if nxt == "chat" else (0.18 if sp == "chat" else 0.08)
+
+
+def _stitch_wav(clips, out_path: str) -> list:
+    """:func:`_stitch` for WAV clips: their samples and the pauses are copied
+    into one preallocated buffer and written once.  A clip in another format
+    (an OpenAI fallback at 24 kHz) is converted to the first clip's first."""
+    pcm = []
+    for sp, path in clips:
+        with wave.open(path, "rb") as w:
+            params = (w.getframerate(), w.getnchannels(), w.getsampwidth())
+            frames = w.readframes(w.getnframes())
+        if pcm and params != pcm[0][1]:
+            from pydub import AudioSegment
+            rate, channels, width = pcm[0][1]
+            seg = AudioSegment.from_wav(io.BytesIO(_wav_bytes(frames, *params)))
+            frames = seg.set_frame_rate(rate).set_channels(channels).set_sample_width(width).raw_data
+            params = pcm[0][1]
+        pcm.append((frames, params))
+    rate, channels, width = pcm[0][1]
+    frame = channels * width
+    gaps = [int(round(_gap_after(clips, i) * rate)) * frame for i in range(len(clips))]
+    buf = bytearray(sum(len(f) for f, _ in pcm) + sum(gaps))   # zeros = the pauses
+    intervals, pos = [], 0
+    for (sp, _), (frames, _), gap in zip(clips, pcm, gaps):
+        buf[pos:pos + len(frames)] = frames
         if sp == "chat":
-            intervals.append([round(cur, 2), round(cur + dur, 2)])
-        # Tight cut-in before an interjection so it feels like an interruption.
-        nxt = segments[i + 1][0] if i + 1 < n else None
-        gap = 0.04 if nxt == "chat" else (0.18 if sp == "chat" else 0.08)
-        combined += clip + AudioSegment.silent(duration=int(gap * 1000))
-        cur += dur + gap
+            intervals.append([round(pos / frame / rate, 2), round((pos + len(frames)) / frame / rate, 2)])
+        pos += len(frames) + gap
+    with wave.open(out_path, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(bytes(buf))
+    return intervals
+
+
+def _wav_bytes(frames: bytes, rate: int, channels: int, width: int) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(frames)
+    return out.getvalue()
+
+
+@contextmanager
+def _audio_out(out_path: str, pcm_rate: int) -> Iterator[Callable[[bytes], None]]:
+    """A writer for streamed audio bytes: straight to ``out_path``, or — for a
+    ``.wav`` path — raw 16-bit mono PCM at ``pcm_rate`` under a WAV header."""
+    if not out_path.endswith(".wav"):
+        with open(out_path, "wb") as fh:
+            yield fh.write
+        return
+    w = wave.open(out_path, "wb")
+    try:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(pcm_rate)
+        yield w.writeframesraw
+    finally:
+        w.close()
+
+
+def _remove(paths) -> None:
+    for path in paths:
         try:
-            os.remove(seg_file)
+            os.remove(path)
         except Exception:
             pass
-        if on_progress:
-            on_progress((i + 1) / n, f"Recording voices… ({i + 1}/{n})")
-    combined.export(out_path, format="mp3")
-    return f"{engine}+chat", intervals
+
+
+class VoiceStream:
+    """Record the voiceover while the script is still being written.
+
+    :meth:`feed` takes the script's token deltas; each speech unit that is
+    complete (one of her sentences or a {chat: ...} interjection, see
+    :func:`llm.speech_units`) goes to TTS straight away, ``tts_concurrency`` at
+    a time.  :meth:`finish` takes the final script, records whatever the stream
+    did not cover (the last sentence, or a unit that reads differently once the
+    whole text is humanized) and stitches the clips in script order — so the
+    audio always matches the text :func:`llm.storyfy` returned.
+    """
+
+    def __init__(self, project: str, on_progress: ProgressCb = None) -> None:
+        from . import llm
+        s = config.settings
+        self.project = project
+        self.out_path = os.path.join(config.project_dir(project), speech_file())
+        self.tags_ok = s.voice_tags and "v3" in (s.elevenlabs_model or "")
+        self.on_progress = on_progress
+        self._prefix = llm.PrefixStream()   # where the finished units end
+        self._cut = 0
+        self._jobs: Dict[Tuple[str, str], Future] = {}
+        self._paths: List[str] = []   # every clip handed out, reset or not
+        self._done = 0
+        self._round = 0               # bumped by reset(); older jobs stop reporting
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, s.tts_concurrency),
+                                        thread_name_prefix="k100dra-tts")
+
+    def feed(self, delta: str) -> None:
+        """Add streamed script text; send any newly completed units to TTS."""
+        from . import llm
+        cut = self._prefix.feed(delta)
+        if cut > self._cut:
+            # Only the newly completed text: a cut never falls inside a unit.
+            # Same clean-up storyfy applies to the whole text (minus the closing quote).
+            text = self._prefix.text[self._cut:cut]
+            text = llm.humanize(text.lstrip().lstrip('"') if self._cut == 0 else text)
+            self._cut = cut
+            for unit in llm.speech_units(text, config.settings.chat_voice):
+                self._submit(unit)
+
+    def _submit(self, unit: Tuple[str, str]) -> None:
+        with self._lock:
+            if unit in self._jobs:
+                return
+            path = f"{self.out_path}.u{len(self._paths)}{audio_ext()}"
+            self._paths.append(path)
+            ctx = contextvars.copy_context()   # run log + metrics follow the job
+            self._jobs[unit] = self._pool.submit(ctx.run, self._record, unit, path, self._round)
+
+    def _record(self, unit: Tuple[str, str], path: str, round_: int) -> Tuple[str, str]:
+        metrics.set_stage("voice")
+        speaker, text = unit
+        engine = _synth_one(text, path, speaker, self.tags_ok, None)
+        with self._lock:
+            if round_ != self._round:   # recorded for a script that was thrown away
+                return engine, path
+            self._done += 1
+            done, total = self._done, len(self._jobs)
+        if self.on_progress:
+            self.on_progress(min(0.95, done / max(1, total)), f"Recording as she writes… ({done}/{total})")
+        return engine, path
+
+    def finish(self, text: str) -> dict:
+        """Wait for the clips of the final script ``text`` and write the narration
+        (falling back to :func:`synthesize` if any unit failed)."""
+        from . import llm
+        s = config.settings
+        try:
+            units = llm.speech_units(text, s.chat_voice)
+            for unit in units:
+                self._submit(unit)
+            results = [self._jobs[unit].result() for unit in units]
+            if self.on_progress:
+                self.on_progress(0.97, "Stitching the voiceover…")
+            intervals = _stitch([(sp, path) for (sp, _), (_, path) in zip(units, results)],
+                                self.out_path)
+        except Exception as exc:
+            if self.on_progress:
+                self.on_progress(0.0, f"streamed voice failed ({exc}); recording in one go")
+            return synthesize(text, self.project, self.on_progress)
+        finally:
+            self.close()
+        engine = "/".join(sorted({e for e, _ in results}))
+        info = {"engine": engine, "voice": s.elevenlabs_voice_id, "tags": self.tags_ok,
+                "path": self.out_path, "streamed_units": len(units)}
+        if intervals:
+            info.update(engine=f"{engine}+chat", two_voice=True, chat_intervals=intervals)
+        return info
+
+    def reset(self) -> None:
+        """Forget the script so far (the model failed and another one starts
+        over): queued units are cancelled, so they are never paid for, and the
+        next :meth:`feed` begins a new script."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()   # one already recording finishes; close() removes its clip
+            self._jobs = {}
+            self._done = 0
+            self._round += 1
+        self._prefix.reset()
+        self._cut = 0
+
+    def close(self) -> None:
+        """Drop queued units and remove the clip files (idempotent)."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            paths = list(self._paths)
+        _remove(paths)
 
 
 # --------------------------------------------------------------------------- #
@@ -129,11 +443,12 @@ def _elevenlabs(text: str, out_path: str, on_progress: ProgressCb,
 
     s = config.settings
     vid = voice_id or s.elevenlabs_voice_id
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{vid}/stream"
+    url = f"{s.elevenlabs_base_url}/v1/text-to-speech/{vid}/stream"
+    wav = out_path.endswith(".wav")
     headers = {
         "xi-api-key": s.elevenlabs_key,
         "Content-Type": "application/json",
-        "Accept": "audio/mpeg",
+        "Accept": "audio/pcm" if wav else "audio/mpeg",
     }
     payload = {
         "text": text,
@@ -145,22 +460,25 @@ def _elevenlabs(text: str, out_path: str, on_progress: ProgressCb,
             "use_speaker_boost": s.voice_speaker_boost,
         },
     }
-    params = {"output_format": "mp3_44100_128"}
+    params = {"output_format": f"pcm_{ELEVENLABS_PCM_RATE}" if wav else "mp3_44100_128"}
 
     if on_progress:
         on_progress(0.05, "Contacting ElevenLabs…")
 
-    with requests.post(url, headers=headers, json=payload, params=params,
-                       stream=True, timeout=120) as resp:
+    with metrics.call("tts", "elevenlabs", s.elevenlabs_model) as call, \
+            requests.post(url, headers=headers, json=payload, params=params,
+                          stream=True, timeout=120) as resp:
         if resp.status_code != 200:
             raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        call.usage(len(text))   # ElevenLabs bills by character
         total = int(resp.headers.get("content-length", 0))
         written = 0
-        with open(out_path, "wb") as fh:
+        with _audio_out(out_path, ELEVENLABS_PCM_RATE) as write:
             for chunk in resp.iter_content(chunk_size=16384):
                 if not chunk:
                     continue
-                fh.write(chunk)
+                call.first()
+                write(chunk)
                 written += len(chunk)
                 if on_progress:
                     if total:
@@ -180,10 +498,15 @@ def _openai_tts(text: str, out_path: str, on_progress: ProgressCb, voice: str =
         raise RuntimeError("No ElevenLabs key and no OpenAI key — cannot generate voice.")
     if on_progress:
         on_progress(0.2, "Generating voice with OpenAI TTS…")
-    client = openai.OpenAI(api_key=s.openai_key)
-    with client.audio.speech.with_streaming_response.create(
-        model="tts-1-hd", voice=voice or s.openai_tts_voice, input=text,
-    ) as response:
-        response.stream_to_file(out_path)
+    client = openai.OpenAI(api_key=s.openai_key, base_url=s.openai_base_url)
+    with metrics.call("tts", "openai", OPENAI_TTS_MODEL) as call, \
+            client.audio.speech.with_streaming_response.create(
+                model=OPENAI_TTS_MODEL, voice=voice or s.openai_tts_voice, input=text,
+                response_format="pcm" if out_path.endswith(".wav") else "mp3",
+            ) as response, _audio_out(out_path, OPENAI_PCM_RATE) as write:
+        call.usage(len(text))
+        for chunk in response.iter_bytes():
+            call.first()
+            write(chunk)
     if on_progress:
         on_progress(1.0, "Voice ready")
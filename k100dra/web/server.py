@@ -11,14 +11,16 @@ from __future__ import annotations
 import asyncio
 import os
 import threading
+import time
 import uuid
-from typing import Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from .. import config, demo as demo_mod, pipeline
+from .. import checkpoint, config, demo as demo_mod, pipeline
 from ..events import ProgressReporter, RunState
 from ..persona import persona
 
@@ -26,67 +28,165 @@ HERE = os.path.dirname(os.path.abspath(__file__))
 STATIC = os.path.join(HERE, "static")
 
 
-class RunManager:
-    """Owns the current run and the latest snapshot pushed to clients."""
+class RunHandle:
+    """One run in the pool: its reporter plus the latest snapshot for clients."""
 
-    def __init__(self) -> None:
+    def __init__(self, demo: bool, upload: Optional[bool], mode: Optional[str],
+                 resume: Optional[str] = None) -> None:
+        self.run_id = uuid.uuid4().hex[:8]
+        self.demo = demo
+        self.upload = upload
+        self.mode = mode
+        self.resume = resume
+        self.project: Optional[str] = resume
         self.reporter: Optional[ProgressReporter] = None
-        self.thread: Optional[threading.Thread] = None
-        self._latest: dict = {}
-        self._seq = 0
-        self._stop_all = False
-        self.clients: Set[WebSocket] = set()
-
-    # sink called from the pipeline thread -------------------------------- #
-    def _sink(self, _event_type: str, state: dict) -> None:
-        self._latest = state
-        self._seq += 1
+        self.cancelled = False
+        self.queued_at = time.time()
+        self.latest: dict = {"run_id": self.run_id, "status": "queued", "demo": demo}
+        self.seq = 0
+        # (seq, snapshot, text deltas since it), swapped in one assignment so
+        # the broadcaster always reads a consistent trio.
+        self.view: tuple = (0, self.latest, [])
+
+    def sink(self, event_type: str, state: dict) -> None:
+        if event_type == "delta":
+            self.view[2].append(state)
+            return
+        self.latest = state
+        self.seq += 1
+        self.view = (self.seq, state, [])
 
     @property
-    def latest(self) -> dict:
-        return self._latest
+    def status(self) -> str:
+        return self.latest.get("status", "queued")
+
+    def summary(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "project": self.project,
+            "demo": self.demo,
+            "status": self.status,
+            "overall": self.latest.get("overall", 0),
+            "title": (self.latest.get("summary") or {}).get("title"),
+        }
+
+
+class RunManager:
+    """Runs up to ``max_parallel_runs`` pipelines at once, each with its own
+    :class:`RunState` / :class:`ProgressReporter` and snapshot stream.
+
+    Extra runs wait in the pool's queue; inside a run, :mod:`k100dra.limits`
+    caps how many renders and API-bound steps happen at once across all runs.
+    """
+
+    KEEP_FINISHED = 30
+
+    def __init__(self) -> None:
+        self.runs: Dict[str, RunHandle] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._version = 0   # bumps when the run list changes; also keeps pruned runs' seq
+        self.clients: Dict[WebSocket, Optional[str]] = {}   # socket → run id (None = follow)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=max(1, config.settings.max_parallel_runs),
+                                            thread_name_prefix="k100dra-run")
+        return self._pool
+
+    # lookups ------------------------------------------------------------- #
+    def get(self, run_id: Optional[str] = None) -> Optional[RunHandle]:
+        """The requested run, or the one the dashboard should follow: the most
+        recently started run that is still going, else the newest one."""
+        if run_id:
+            return self.runs.get(run_id)
+        handles = list(self.runs.values())
+        live = [h for h in handles if h.status == "running"]
+        started = [h for h in handles if h.status != "queued"]
+        for group in (live, started, handles):
+            if group:
+                return group[-1]
+        return None
+
+    def latest(self, run_id: Optional[str] = None) -> dict:
+        handle = self.get(run_id)
+        return handle.latest if handle else {}
+
+    def run_list(self) -> List[dict]:
+        return [h.summary() for h in self.runs.values()]
 
     @property
-    def seq(self) -> int:
-        return self._seq
+    def version(self) -> int:
+        """Grows with every change to any run (never goes back, even as runs
+        are pruned), so a client can wait for a higher one."""
+        return self._version + sum(h.seq for h in self.runs.values())
 
     def is_running(self) -> bool:
-        return bool(self.thread and self.thread.is_alive())
+        return any(h.status in ("queued", "running") for h in self.runs.values())
 
+    # control ------------------------------------------------------------- #
     def start(self, demo: bool = False, upload: Optional[bool] = None, count: int = 1,
-              mode: Optional[str] = None) -> dict:
-        if self.is_running():
-            return {"ok": False, "error": "A run is already in progress."}
-        self._stop_all = False
-        self.thread = threading.Thread(
-            target=self._worker, args=(demo, upload, max(1, count), mode), daemon=True)
-        self.thread.start()
-        return {"ok": True}
-
-    def stop(self) -> dict:
-        self._stop_all = True
-        if self.reporter:
-            self.reporter.request_stop()
-        return {"ok": True}
-
-    def _worker(self, demo: bool, upload: Optional[bool], count: int,
-                mode: Optional[str] = None) -> None:
-        for _ in range(count):
-            if self._stop_all:
-                break
-            project = "demo" if demo else pipeline.new_project_id()
-            state = RunState(run_id=uuid.uuid4().hex[:8], project=project, demo=demo)
-            self.reporter = ProgressReporter(state, sink=self._sink)
-            self._sink("state", state.to_dict())
-            try:
-                if demo:
-                    demo_mod.run(self.reporter)
-                else:
-                    pipeline.run(self.reporter, project, upload=upload, mode=mode)
-            except Exception as exc:  # pragma: no cover - defensive
-                self.reporter.log(f"Run crashed: {exc}", level="error")
-            if self.reporter and self.reporter.stop_requested:
-                break
+              mode: Optional[str] = None, resume: Optional[str] = None) -> dict:
+        if resume:
+            if not self._resumable(resume):
+                return {"ok": False, "error": f"no checkpoints for {resume!r}"}
+            if any(h.project == resume and h.status in ("queued", "running") for h in self.runs.values()):
+                return {"ok": False, "error": f"{resume} is already running"}
+            handles = [RunHandle(False, upload, mode, resume=resume)]
+        else:
+            handles = [RunHandle(demo, upload, mode) for _ in range(max(1, count))]
+        with self._lock:
+            for handle in handles:
+                self.runs[handle.run_id] = handle
+            self._prune()
+            self._version += 1
+        for handle in handles:
+            self._executor().submit(self._worker, handle)
+        return {"ok": True, "runs": [h.run_id for h in handles]}
+
+    def stop(self, run_id: Optional[str] = None) -> dict:
+        targets = [self.runs[run_id]] if run_id in self.runs else (
+            [] if run_id else list(self.runs.values()))
+        for handle in targets:
+            handle.cancelled = True
+            if handle.reporter:
+                handle.reporter.request_stop()
+            elif handle.status == "queued":
+                handle.sink("state", {**handle.latest, "status": "cancelled"})
+        return {"ok": True, "stopped": [h.run_id for h in targets]}
+
+    @staticmethod
+    def _resumable(project: str) -> bool:
+        path = os.path.normpath(os.path.join(config.PROJECTS_DIR, project, checkpoint.MANIFEST))
+        return (os.path.dirname(os.path.dirname(path)) == os.path.abspath(config.PROJECTS_DIR)
+                and os.path.exists(path))
+
+    def _prune(self) -> None:
+        finished = [rid for rid, h in self.runs.items() if h.status not in ("queued", "running")]
+        for rid in finished[:max(0, len(finished) - self.KEEP_FINISHED)]:
+            self._version += self.runs[rid].seq + 1   # before the pop: a reader never sees less
+            del self.runs[rid]
+
+    def _worker(self, handle: RunHandle) -> None:
+        if handle.cancelled:
+            return
+        if not handle.resume:
+            # Demo runs can overlap too, so each gets its own folder (and run.log).
+            handle.project = f"demo-{handle.run_id}" if handle.demo else pipeline.new_project_id()
+        state = RunState(run_id=handle.run_id, project=handle.project, demo=handle.demo)
+        handle.reporter = ProgressReporter(state, sink=handle.sink)
+        if handle.cancelled:   # stop() came in before there was a reporter to tell
+            handle.reporter.request_stop()
+        handle.sink("state", state.to_dict())
+        try:
+            if handle.demo:
+                demo_mod.run(handle.reporter)
+            else:
+                pipeline.run(handle.reporter, handle.project, upload=handle.upload, mode=handle.mode,
+                             resume=bool(handle.resume))
+        except Exception as exc:  # pragma: no cover - defensive
+            handle.reporter.log(f"Run crashed: {exc}", level="error")
+        self._version += 1
 
 
 manager = RunManager()
@@ -99,24 +199,61 @@ async def _startup() -> None:
     asyncio.create_task(_broadcaster())
 
 
+def _merge_deltas(deltas: List[dict]) -> List[dict]:
+    """Join consecutive pieces of the same streamed artifact (a piece that
+    replaces the text drops the ones before it)."""
+    merged: List[dict] = []
+    for d in deltas:
+        if merged and (merged[-1]["stage"], merged[-1]["key"]) == (d["stage"], d["key"]):
+            if d.get("replace"):
+                merged[-1] = dict(d)
+            else:
+                merged[-1]["text"] += d["text"]
+        else:
+            merged.append(dict(d))
+    return merged
+
+
 async def _broadcaster() -> None:
-    """Coalesce rapid updates and fan them out to every connected client."""
-    last_seq = -1
+    """Coalesce rapid updates and fan each run out to the clients watching it.
+
+    A client gets a full snapshot when the run's state changed, and otherwise
+    only the streamed text added since what it was last sent."""
+    sent: Dict[WebSocket, tuple] = {}
+    last_list = -1
     while True:
         await asyncio.sleep(0.06)
-        if manager.seq == last_seq or not manager.clients:
-            last_seq = manager.seq
+        if not manager.clients:
+            sent.clear()
             continue
-        last_seq = manager.seq
-        payload = {"type": "state", "state": manager.latest}
+        version = manager.version
+        runs = manager.run_list() if version != last_list else None
+        last_list = version
         dead = []
-        for ws in list(manager.clients):
+        for ws, run_id in list(manager.clients.items()):
+            handle = manager.get(run_id)
             try:
-                await ws.send_json(payload)
+                if handle is not None:
+                    seq, latest, deltas = handle.view
+                    key, count = (handle.run_id, seq), len(deltas)
+                    prev = sent.get(ws)
+                    if prev is None or prev[0] != key:
+                        sent[ws] = (key, count)
+                        await ws.send_json({"type": "state", "state": latest})
+                        start = 0
+                    else:
+                        start = prev[1]
+                    if count > start:
+                        sent[ws] = (key, count)
+                        await ws.send_json({"type": "delta", "run_id": handle.run_id,
+                                            "deltas": _merge_deltas(deltas[start:count])})
+                if runs is not None:
+                    await ws.send_json({"type": "runs", "runs": runs})
             except Exception:
                 dead.append(ws)
         for ws in dead:
-            manager.clients.discard(ws)
+            manager.clients.pop(ws, None)
+            sent.pop(ws, None)
 
 
 @app.get("/")
@@ -133,8 +270,13 @@ async def readiness() -> JSONResponse:
 
 
 @app.get("/api/state")
-async def state() -> JSONResponse:
-    return JSONResponse(manager.latest or {})
+async def state(run: Optional[str] = None) -> JSONResponse:
+    return JSONResponse(manager.latest(run))
+
+
+@app.get("/api/runs")
+async def runs() -> JSONResponse:
+    return JSONResponse({"runs": manager.run_list()})
 
 
 @app.post("/api/run")
@@ -145,12 +287,19 @@ async def run_real(payload: dict | None = None) -> JSONResponse:
         upload=payload.get("upload"),
         count=int(payload.get("count", 1)),
         mode=payload.get("mode"),
+        resume=payload.get("resume") or None,
     ))
 
 
+@app.get("/api/projects")
+async def projects() -> JSONResponse:
+    """Recent projects with checkpoints (for the Resume picker)."""
+    return JSONResponse({"projects": checkpoint.resumable()})
+
+
 @app.post("/api/stop")
-async def stop() -> JSONResponse:
-    return JSONResponse(manager.stop())
+async def stop(payload: dict | None = None) -> JSONResponse:
+    return JSONResponse(manager.stop((payload or {}).get("run")))
 
 
 @app.get("/artifacts/{project}/{filename}")
@@ -239,10 +388,14 @@ def install_ytdlp() -> JSONResponse:   # sync → runs in a threadpool, won't bl
 
 
 @app.get("/api/log")
-async def get_log():
-    if not os.path.exists(config.LATEST_LOG):
+async def get_log(run: Optional[str] = None):
+    handle = manager.get(run) if run else None
+    path = config.LATEST_LOG
+    if handle and handle.project:
+        path = os.path.join(config.PROJECTS_DIR, handle.project, "run.log")
+    if not os.path.exists(path):
         return JSONResponse({"error": "no log yet — start a run first"}, status_code=404)
-    return FileResponse(config.LATEST_LOG, media_type="text/plain")
+    return FileResponse(path, media_type="text/plain")
 
 
 @app.post("/api/avatar")
@@ -273,11 +426,14 @@ async def set_avatar(payload: dict | None = None) -> JSONResponse:
 
 @app.websocket("/ws")
 async def ws_endpoint(websocket: WebSocket) -> None:
+    """Live snapshots of one run (``?run=<id>``), or of whichever run is current."""
     await websocket.accept()
-    manager.clients.add(websocket)
+    run_id = websocket.query_params.get("run") or None
+    manager.clients[websocket] = run_id
     try:
-        if manager.latest:
-            await websocket.send_json({"type": "state", "state": manager.latest})
+        await websocket.send_json({"type": "runs", "runs": manager.run_list()})
+        if manager.latest(run_id):
+            await websocket.send_json({"type": "state", "state": manager.latest(run_id)})
         while True:
             await websocket.receive_text()  # keep the socket open
     except WebSocketDisconnect:
@@ -285,7 +441,7 @@ async def ws_endpoint(websocket: WebSocket) -> None:
     except Exception:
         pass
     finally:
-        manager.clients.discard(websocket)
+        manager.clients.pop(websocket, None)
 
 
 def serve(host: str = "127.0.0.1", port: int = 8000) -> None:
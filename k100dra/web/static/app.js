@@ -5,6 +5,10 @@ const STAGE_ORDER = ["story", "voice", "audio", "subtitles", "video", "publish"]
 let stageEls = {};
 let lastAudio = null;
 let lastVideo = null;
+let selectedRun = null;   // null = follow whichever run is current
+let shownRun = null;      // run id of the state on screen
+let socket = null;
+let switching = false;    // socket closed on purpose to follow another run
 
 // ---- helpers ------------------------------------------------------------- //
 function fmtTime(secs) {
@@ -43,6 +47,9 @@ function buildStages(stages) {
 // ---- main render --------------------------------------------------------- //
 function render(state) {
   if (!state || !state.stages) return;
+  const newRun = state.run_id !== shownRun;
+  shownRun = state.run_id;
+  $("log-link").href = `/api/log?run=${encodeURIComponent(state.run_id)}`;
   if (Object.keys(stageEls).length !== state.stages.length) buildStages(state.stages);
 
   // overall
@@ -67,8 +74,7 @@ function render(state) {
     $("overall-eta").textContent = state.elapsed ? `took ${fmtTime(state.elapsed)}` : "";
   }
   $("btn-stop").disabled = !running;
-  $("btn-start").disabled = running;
-  $("btn-demo").disabled = running;
+  renderMetrics(state.metrics || {});
 
   // stages
   const byId = {};
@@ -86,13 +92,17 @@ function render(state) {
   const story = byId.story || {};
   const text = (story.artifacts && story.artifacts.text) || "";
   const scriptEl = $("script-text");
+  // "streaming" means deltas append to what is shown: only while this run's
+  // script is being written.
+  if (newRun || story.status !== "running") scriptEl.classList.remove("streaming");
   if (text) {
     scriptEl.textContent = text;
     scriptEl.classList.toggle("streaming", story.status === "running");
     scriptEl.scrollTop = scriptEl.scrollHeight;
   } else if (story.status === "pending") {
     scriptEl.textContent = "Waiting for the next story…";
-    scriptEl.classList.remove("streaming");
+  } else if (newRun) {
+    scriptEl.textContent = "";
   }
   const sm = story.artifacts || {};
   $("story-meta").textContent = sm.title
@@ -144,6 +154,33 @@ function render(state) {
   $("logs").scrollTop = $("logs").scrollHeight;
 }
 
+// Streamed text (the script while it is written) arrives as pieces to append.
+function applyDeltas(msg) {
+  if (msg.run_id !== shownRun) return;
+  msg.deltas.forEach((d) => {
+    if (d.stage !== "story" || d.key !== "text") return;
+    const scriptEl = $("script-text");
+    if (d.replace || !scriptEl.classList.contains("streaming")) {
+      scriptEl.textContent = "";
+      scriptEl.classList.add("streaming");
+    }
+    scriptEl.append(d.text);
+    scriptEl.scrollTop = scriptEl.scrollHeight;
+  });
+}
+
+// Run-wide counters published by the pipeline (see k100dra/metrics.py).
+function renderMetrics(m) {
+  const parts = [];
+  const hits = m.llm_cache_hits || 0, misses = m.llm_cache_misses || 0;
+  if (hits + misses) parts.push(`LLM cache ${hits}/${hits + misses} hits`);
+  const ttsHits = m.tts_cache_hits || 0, ttsMisses = m.tts_cache_misses || 0;
+  if (ttsHits + ttsMisses) parts.push(`TTS cache ${ttsHits}/${ttsHits + ttsMisses} hits`);
+  if (m.calls) parts.push(`${m.calls} API calls`);
+  if (m.cost_usd) parts.push(`≈ $${m.cost_usd.toFixed(3)}`);
+  $("run-metrics").textContent = parts.join(" · ");
+}
+
 function toggleMedia(elId, emptyId, url, demo, apply) {
   const el = $(elId), empty = $(emptyId);
   if (url && !demo) {
@@ -184,18 +221,50 @@ async function loadReadiness() {
   } catch (e) { /* ignore */ }
 }
 
+// ---- run switcher -------------------------------------------------------- //
+function renderRuns(runs) {
+  const wrap = $("runs");
+  if (!runs || runs.length < 2) { wrap.innerHTML = ""; return; }
+  wrap.innerHTML = "";
+  const follow = document.createElement("button");
+  follow.className = "chip run-chip" + (selectedRun ? "" : " sel");
+  follow.textContent = "follow current";
+  follow.onclick = () => selectRun(null);
+  wrap.appendChild(follow);
+  runs.slice(-12).forEach((r) => {
+    const chip = document.createElement("button");
+    chip.className = `chip run-chip ${r.status}` + (r.run_id === selectedRun ? " sel" : "");
+    const pct = r.status === "running" ? ` ${Math.round((r.overall || 0) * 100)}%` : "";
+    chip.textContent = `${r.demo ? "demo " : ""}${r.project || r.run_id}${pct}`;
+    chip.title = r.title || r.status;
+    chip.onclick = () => selectRun(r.run_id);
+    wrap.appendChild(chip);
+  });
+}
+
+function selectRun(runId) {
+  selectedRun = runId;
+  switching = true;
+  if (socket) socket.close();   // onclose reconnects with the new ?run=
+}
+
 // ---- websocket ----------------------------------------------------------- //
 function connect() {
   const proto = location.protocol === "https:" ? "wss" : "ws";
-  const ws = new WebSocket(`${proto}://${location.host}/ws`);
+  const query = selectedRun ? `?run=${encodeURIComponent(selectedRun)}` : "";
+  const ws = new WebSocket(`${proto}://${location.host}/ws${query}`);
+  socket = ws;
   ws.onopen = () => { $("live").className = "live on"; $("live-state").textContent = "connected"; };
   ws.onmessage = (ev) => {
     const msg = JSON.parse(ev.data);
     if (msg.type === "state") render(msg.state);
+    else if (msg.type === "delta") applyDeltas(msg);
+    else if (msg.type === "runs") renderRuns(msg.runs);
   };
   ws.onclose = () => {
     $("live").className = "live"; $("live-state").textContent = "reconnecting…";
-    setTimeout(connect, 1500);
+    setTimeout(connect, switching ? 0 : 1500);
+    switching = false;
   };
   ws.onerror = () => ws.close();
 }
@@ -217,7 +286,30 @@ $("btn-start").onclick = async () => {
   if (!res.ok) alert(res.error || "Could not start");
 };
 $("btn-demo").onclick = () => post("/api/run", { demo: true });
-$("btn-stop").onclick = () => post("/api/stop", {});
+$("btn-resume").onclick = async () => {
+  const project = $("resume-project").value;
+  if (!project) return;
+  const res = await post("/api/run", { resume: project, mode: $("mode").value });
+  if (!res.ok) alert(res.error || "Could not resume");
+};
+$("resume-project").onchange = () => { $("btn-resume").disabled = !$("resume-project").value; };
+$("resume-project").onfocus = loadProjects;
+
+// Projects with checkpoints — a resumed run skips the steps that still check out.
+async function loadProjects() {
+  try {
+    const { projects } = await (await fetch("/api/projects")).json();
+    const current = $("resume-project").value;
+    $("resume-project").innerHTML = `<option value="">— earlier project —</option>` +
+      projects.filter((p) => !p.published).map((p) =>
+        `<option value="${escapeHtml(p.project)}"${p.project === current ? " selected" : ""}>` +
+        `${escapeHtml(p.project)}${p.title ? " — " + escapeHtml(p.title.slice(0, 40)) : ""}` +
+        ` (${p.steps.length} steps)</option>`).join("");
+    $("btn-resume").disabled = !$("resume-project").value;
+  } catch (e) { /* studio still usable without it */ }
+}
+loadProjects();
+$("btn-stop").onclick = () => post("/api/stop", selectedRun ? { run: shownRun } : {});
 
 // ---- tabs + sources management ------------------------------------------- //
 const LINK_UI = {
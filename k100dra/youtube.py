@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 from datetime import datetime, timedelta, timezone
 from typing import Callable, List, Optional, Tuple
 
@@ -20,8 +21,15 @@ UPLOAD_TIMES = [10, 16]
 
 ProgressCb = Optional[Callable[[float, str], None]]
 
+_schedule_lock = threading.Lock()   # concurrent runs must not share a slot
+
 
 def get_scheduled_time() -> str:
+    with _schedule_lock:
+        return _next_scheduled_time()
+
+
+def _next_scheduled_time() -> str:
     now = datetime.now()
     last_time = None
     if os.path.exists(config.UPLOAD_TIME_FILE):
@@ -47,6 +55,11 @@ def get_scheduled_time() -> str:
     return next_time.astimezone(tz=timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+def available() -> bool:
+    """Whether uploads can be attempted (an OAuth client, or a stand-in endpoint)."""
+    return os.path.exists(CREDENTIALS_PATH) or bool(config.settings.youtube_base_url)
+
+
 def _authenticated_service():
     import google.auth.transport.requests
     from google.oauth2.credentials import Credentials
@@ -54,6 +67,12 @@ def _authenticated_service():
     from googleapiclient.discovery import build
     from google.auth.exceptions import RefreshError
 
+    endpoint = config.settings.youtube_base_url
+    if endpoint:
+        # A stand-in (standin.py) takes any token; no OAuth round trip.
+        return build("youtube", "v3", credentials=Credentials(token="standin"),
+                     client_options={"api_endpoint": endpoint})
+
     creds = None
     if os.path.exists(TOKEN_PATH):
         creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
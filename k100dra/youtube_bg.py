@@ -14,6 +14,7 @@ from __future__ import annotations
 import glob
 import os
 import re
+import uuid
 from typing import Optional
 
 from . import config
@@ -59,8 +60,10 @@ def fetch_segment(url: str, start: float, duration: float, out_dir: Optional[str
     """
     import yt_dlp
     out_dir = out_dir or cache_dir()
-    vid = short_id(url)
-    out_tmpl = os.path.join(out_dir, f"bg_{vid}.%(ext)s")
+    # A per-fetch suffix so concurrent runs using the same link never clobber
+    # (or clean up) each other's segment.
+    name = f"bg_{short_id(url)}_{uuid.uuid4().hex[:6]}"
+    out_tmpl = os.path.join(out_dir, f"{name}.%(ext)s")
 
     opts = {
         # Prefer a compact H.264 mp4 ≤1080p; fall back gracefully.
@@ -80,7 +83,7 @@ def fetch_segment(url: str, start: float, duration: float, out_dir: Optional[str
     if path and os.path.exists(path):
         return path
     # yt-dlp may have chosen a different extension — locate it.
-    matches = [p for p in glob.glob(os.path.join(out_dir, f"bg_{vid}.*"))
+    matches = [p for p in glob.glob(os.path.join(out_dir, f"{name}.*"))
                if not p.endswith(".part")]
     if matches:
         return matches[0]
@@ -95,8 +98,8 @@ def fetch_audio(url: str, start: float, duration: float, out_dir: Optional[str]
     """
     import yt_dlp
     out_dir = out_dir or cache_dir()
-    vid = short_id(url)
-    out_tmpl = os.path.join(out_dir, f"mus_{vid}.%(ext)s")
+    name = f"mus_{short_id(url)}_{uuid.uuid4().hex[:6]}"
+    out_tmpl = os.path.join(out_dir, f"{name}.%(ext)s")
 
     opts = {
         "format": "bestaudio/best",
@@ -112,10 +115,10 @@ def fetch_audio(url: str, start: float, duration: float, out_dir: Optional[str]
     with yt_dlp.YoutubeDL(opts) as ydl:
         ydl.extract_info(url, download=True)
 
-    target = os.path.join(out_dir, f"mus_{vid}.mp3")
+    target = os.path.join(out_dir, f"{name}.mp3")
     if os.path.exists(target):
         return target
-    matches = [p for p in glob.glob(os.path.join(out_dir, f"mus_{vid}.*"))
+    matches = [p for p in glob.glob(os.path.join(out_dir, f"{name}.*"))
                if not p.endswith(".part")]
     if matches:
         return matches[0]
@@ -8,13 +8,20 @@ the same pipeline from the terminal — handy for cron jobs and batch generation
     python main.py -n 5            # make five
     python main.py --no-upload     # render but don't upload
     python main.py --demo          # simulate a run (no keys / ffmpeg needed)
+    python main.py -n 8 --pipeline # render video k while video k+1 is gathered
+    python main.py --resume 2026-01-31_18-04-12   # finish a failed project
+    python main.py --standin -n 3  # the real pipeline against local fake APIs
 """
 
 from __future__ import annotations
 
 import argparse
 import datetime
+import os
+import threading
 import time
+from collections import deque
+from typing import List, Optional
 
 from k100dra import config, demo as demo_mod, pipeline
 from k100dra.console import ConsoleReporter
@@ -22,13 +29,109 @@ from k100dra.events import ProgressReporter, RunState
 from k100dra.persona import persona
 
 
-def run_once(demo: bool, upload: bool) -> dict:
-    project = "demo" if demo else pipeline.new_project_id()
+def run_once(demo: bool, upload: bool, resume: Optional[str] = None) -> dict:
+    project = resume or ("demo" if demo else pipeline.new_project_id())
     state = RunState(run_id=project, project=project, demo=demo)
     reporter = ProgressReporter(state, sink=ConsoleReporter().sink)
     if demo:
         return demo_mod.run(reporter)
-    return pipeline.run(reporter, project, upload=upload)
+    return pipeline.run(reporter, project, upload=upload, resume=bool(resume))
+
+
+class TimedQueue:
+    """A bounded FIFO that keeps count of how long it sat empty and full —
+    i.e. how long the consumer and the producer were starved of work."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._since = time.time()
+        self.empty_s = 0.0
+        self.full_s = 0.0
+
+    def _tick(self) -> None:
+        now = time.time()
+        if not self._items:
+            self.empty_s += now - self._since
+        elif len(self._items) >= self.maxsize:
+            self.full_s += now - self._since
+        self._since = now
+
+    def put(self, item) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._items) < self.maxsize)
+            self._tick()
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self):
+        with self._cond:
+            self._cond.wait_for(lambda: bool(self._items))
+            self._tick()
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._tick()
+
+
+def run_pipelined(count: int, upload: bool, depth: int) -> List[dict]:
+    """Make ``count`` videos with the network-bound half of each run (story,
+    voice, Whisper, downloads) feeding a render/publish half through a bounded
+    queue, so the next video is gathered while the current one renders."""
+    ready = TimedQueue(maxsize=max(1, depth))
+    results: List[dict] = []
+    done = object()
+    failed: List[BaseException] = []   # what stopped the producer, re-raised here
+
+    def gather() -> None:
+        try:
+            for i in range(1, count + 1):
+                project = pipeline.new_project_id()
+                state = RunState(run_id=project, project=project)
+                reporter = ProgressReporter(state, sink=ConsoleReporter(f"[{i}/{count}]", bar=False).sink)
+                result = pipeline.run(reporter, project, upload=upload, half="gather")
+                if "handoff" in result:
+                    ready.put((i, reporter, result))
+                else:
+                    results.append(result)
+                    print(f"  ✖ [{i}/{count}] {result.get('error', 'cancelled')}")
+        except BaseException as exc:
+            failed.append(exc)
+        finally:
+            ready.put(done)   # always, or the renderer waits forever
+
+    producer = threading.Thread(target=gather, name="k100dra-gather", daemon=True)
+    producer.start()
+    while True:
+        item = ready.get()
+        if item is done:
+            break
+        i, reporter, gathered = item
+        result = pipeline.run(reporter, gathered["project"], upload=upload,
+                              half="render", handoff=gathered["handoff"])
+        results.append(result)
+        _print_result(result, f"[{i}/{count}] ")
+    producer.join()
+    ready.close()
+    print(f"\n  Queue: empty {ready.empty_s:.0f}s (renderer idle) · "
+          f"full {ready.full_s:.0f}s (gatherer idle)")
+    if failed:
+        raise failed[0]
+    return results
+
+
+def _print_result(result: dict, label: str = "") -> None:
+    if "error" not in result and "cancelled" not in result:
+        if result.get("youtube_url"):
+            print(f"  ✅ {label}{result['youtube_url']}")
+        elif result.get("video"):
+            print(f"  ✅ {label}{result['video']}")
+    else:
+        print(f"  ✖ {label}{result.get('error', 'cancelled')}")
 
 
 def main() -> None:
@@ -37,10 +140,30 @@ def main() -> None:
     parser.add_argument("--no-upload", action="store_true", help="Render but skip YouTube upload.")
     parser.add_argument("--demo", action="store_true", help="Run a simulated pipeline (no keys/ffmpeg).")
     parser.add_argument("--cpu", action="store_true", help="Force CPU encoding.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap each video's render with the next one's story/voice work.")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="With --pipeline: gathered videos allowed to wait for the renderer.")
+    parser.add_argument("--resume", metavar="PROJECT",
+                        help="Finish an earlier project, reusing its checkpointed steps.")
+    parser.add_argument("--standin", action="store_true",
+                        help="Send every API call to local stand-ins (no network, no keys).")
+    parser.add_argument("--standin-latency", type=float, default=0.0, metavar="SECONDS",
+                        help="With --standin: delay before every stand-in reply.")
     args = parser.parse_args()
+    if args.resume:
+        if not os.path.isdir(os.path.join(config.PROJECTS_DIR, args.resume)):
+            parser.error(f"no such project: {args.resume}")
+        args.count, args.demo = 1, False
+    if args.pipeline and args.demo:
+        parser.error("--pipeline makes real videos; drop --demo")
 
     if args.cpu:
         config.settings.use_gpu = False
+    if args.standin:
+        from k100dra import standin
+        faults = {name: standin.Faults(latency=args.standin_latency) for name in standin.SERVICES}
+        print(f"  Stand-in APIs on {standin.start(faults=faults).url}")
 
     print(f"\n  🎬  {persona.name} — {persona.tagline}")
     ready = config.readiness()
@@ -49,21 +172,20 @@ def main() -> None:
         print(f"  ⚠  Missing setup: {', '.join(missing)}.  Use --demo to preview the pipeline.\n")
 
     start = time.time()
-    successes = 0
-    for i in range(1, args.count + 1):
-        print(f"\n  ── run {i}/{args.count} ──")
-        result = run_once(demo=args.demo, upload=not args.no_upload)
-        if "error" not in result and "cancelled" not in result:
-            successes += 1
-            if result.get("youtube_url"):
-                print(f"  ✅ {result['youtube_url']}")
-            elif result.get("video"):
-                print(f"  ✅ {result['video']}")
-        else:
-            print(f"  ✖ {result.get('error', 'cancelled')}")
-
-    elapsed = datetime.timedelta(seconds=int(time.time() - start))
-    print(f"\n  Done: {successes}/{args.count} succeeded in {elapsed}\n")
+    if args.pipeline and not args.resume:
+        results = run_pipelined(args.count, upload=not args.no_upload, depth=args.depth)
+    else:
+        results = []
+        for i in range(1, args.count + 1):
+            print(f"\n  ── run {i}/{args.count} ──")
+            results.append(run_once(demo=args.demo, upload=not args.no_upload, resume=args.resume))
+            _print_result(results[-1])
+    successes = sum(1 for r in results if "error" not in r and "cancelled" not in r)
+
+    seconds = time.time() - start
+    elapsed = datetime.timedelta(seconds=int(seconds))
+    rate = successes * 3600 / seconds if seconds > 0 else 0.0
+    print(f"\n  Done: {successes}/{args.count} succeeded in {elapsed} ({rate:.1f} videos/hour)\n")
 
 
 if __name__ == "__main__":